@@ -0,0 +1,244 @@
+# backend/app/config.py
+# Runtime tunables. Everything is read from the environment (main.py loads .env
+# before importing this module) with defaults that work for local development.
+import os
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _env_bool(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# ========== TEXT SENTIMENT BATCHING ==========
+# Max texts sent to the sentiment pipeline in one forward pass
+SENTIMENT_BATCH_SIZE = _env_int("SENTIMENT_BATCH_SIZE", 16)
+# How long the batcher waits for more requests after the first one arrives
+SENTIMENT_BATCH_WAIT_MS = _env_float("SENTIMENT_BATCH_WAIT_MS", 5.0)
+# How long a request thread waits for its result before giving up
+SENTIMENT_REQUEST_TIMEOUT = _env_float("SENTIMENT_REQUEST_TIMEOUT", 30.0)
+
+# ========== BULK TEXT ANALYSIS ==========
+# Upper bound on texts accepted by one /analyze/text/batch call
+BULK_TEXT_MAX_ITEMS = _env_int("BULK_TEXT_MAX_ITEMS", 50000)
+
+# ========== MODEL IDENTITY ==========
+# Used in cache keys, so bump the version whenever the weights change
+SENTIMENT_MODEL_NAME = os.getenv(
+    "SENTIMENT_MODEL_NAME", "distilbert-base-uncased-finetuned-sst-2-english"
+)
+SENTIMENT_MODEL_VERSION = os.getenv("SENTIMENT_MODEL_VERSION", "1")
+IMAGE_MODEL_NAME = os.getenv("IMAGE_MODEL_NAME", "deepface-emotion-gender")
+IMAGE_MODEL_VERSION = os.getenv("IMAGE_MODEL_VERSION", "1")
+
+# ========== INFERENCE RESULT CACHE ==========
+INFERENCE_CACHE_MAX_ENTRIES = _env_int("INFERENCE_CACHE_MAX_ENTRIES", 10000)
+INFERENCE_CACHE_TTL = _env_int("INFERENCE_CACHE_TTL", 24 * 3600)
+# Also keep results in mongo.db.inference_cache (shared across workers/restarts)
+INFERENCE_CACHE_PERSIST = _env_bool("INFERENCE_CACHE_PERSIST", False)
+
+# ========== MODEL WARM-UP ==========
+# Models loaded in a background thread at boot; anything else loads on first use
+MODEL_WARMUP_ENABLED = _env_bool("MODEL_WARMUP_ENABLED", True)
+MODEL_WARMUP = [
+    name.strip() for name in os.getenv("MODEL_WARMUP", "sentiment,deepface").split(",")
+    if name.strip()
+]
+
+# ========== SENTIMENT INFERENCE BACKEND ==========
+# "pytorch" (reference), "onnx" (ONNX Runtime export) or "int8" (dynamic quantization)
+SENTIMENT_BACKEND = os.getenv("SENTIMENT_BACKEND", "pytorch").strip().lower()
+# Where the exported ONNX model is kept between restarts
+SENTIMENT_ONNX_DIR = os.getenv(
+    "SENTIMENT_ONNX_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "onnx_models"),
+)
+# Compare a non-reference backend against PyTorch when it loads; fall back on failure
+SENTIMENT_PARITY_CHECK = _env_bool("SENTIMENT_PARITY_CHECK", False)
+SENTIMENT_PARITY_TOLERANCE = _env_float("SENTIMENT_PARITY_TOLERANCE", 0.05)
+
+# ========== LONG TEXT CHUNKING ==========
+# Token budget per window (the model tops out at 512; smaller windows keep attention cheap)
+SENTIMENT_CHUNK_TOKENS = _env_int("SENTIMENT_CHUNK_TOKENS", 200)
+
+# ========== INSTAGRAM LEXICON SCORING ==========
+# "compat": substring matching, identical scores to the original word-list scan
+# "token":  whole-word matching ("hard" no longer matches "hardware")
+LEXICON_MATCH_MODE = os.getenv("LEXICON_MATCH_MODE", "compat").strip().lower()
+LEXICON_PATH = os.getenv(
+    "LEXICON_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "utils", "data", "lexicon_v1.json"),
+)
+
+# ========== UPSTREAM APIS (Instagram / RapidAPI / Twitter) ==========
+# Serve canned Instagram data instead of calling RapidAPI
+INSTAGRAM_USE_MOCK_DATA = _env_bool("INSTAGRAM_USE_MOCK_DATA", True)
+# "live"   - call the real services
+# "record" - call the real services and save every response as a fixture
+# "replay" - send every upstream call to the fake server (python -m app.services.fake_upstream)
+UPSTREAM_MODE = os.getenv("UPSTREAM_MODE", "live").strip().lower()
+FAKE_UPSTREAM_URL = os.getenv("FAKE_UPSTREAM_URL", "http://127.0.0.1:5055").rstrip("/")
+UPSTREAM_FIXTURES_DIR = os.getenv(
+    "UPSTREAM_FIXTURES_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "services", "fixtures", "upstream"),
+)
+
+# Fake upstream server behaviour (all can also be changed at runtime via POST /_fake/config)
+FAKE_UPSTREAM_LATENCY_MS = _env_float("FAKE_UPSTREAM_LATENCY_MS", 0.0)
+FAKE_UPSTREAM_JITTER_MS = _env_float("FAKE_UPSTREAM_JITTER_MS", 0.0)
+FAKE_UPSTREAM_ERROR_RATE = _env_float("FAKE_UPSTREAM_ERROR_RATE", 0.0)
+# Requests allowed per service per window before answering 429 (0 = unlimited)
+FAKE_UPSTREAM_RATE_LIMIT = _env_int("FAKE_UPSTREAM_RATE_LIMIT", 0)
+FAKE_UPSTREAM_RATE_WINDOW = _env_float("FAKE_UPSTREAM_RATE_WINDOW", 900.0)
+FAKE_UPSTREAM_SEED = _env_int("FAKE_UPSTREAM_SEED", 42)
+
+# Shared upstream HTTP client: kept-alive connections per host and parallel calls
+UPSTREAM_POOL_SIZE = _env_int("UPSTREAM_POOL_SIZE", 20)
+UPSTREAM_MAX_WORKERS = _env_int("UPSTREAM_MAX_WORKERS", 16)
+# Seconds allowed for a single upstream call (connect / read)
+UPSTREAM_TIMEOUT = _env_float("UPSTREAM_TIMEOUT", 10.0)
+# Seconds allowed for all upstream calls made while handling one request
+UPSTREAM_BUDGET = _env_float("UPSTREAM_BUDGET", 15.0)
+
+# ========== INSTAGRAM MEDIA SYNC ==========
+# Items per /me/media page (Graph API maximum is 100)
+INSTAGRAM_MEDIA_PAGE_SIZE = _env_int("INSTAGRAM_MEDIA_PAGE_SIZE", 100)
+# Pages fetched per sync; older media is picked up by the next sync
+INSTAGRAM_MEDIA_MAX_PAGES = _env_int("INSTAGRAM_MEDIA_MAX_PAGES", 50)
+# Pages fetched ahead of the scorer (bounds memory and in-flight requests)
+INSTAGRAM_MEDIA_PREFETCH = _env_int("INSTAGRAM_MEDIA_PREFETCH", 2)
+
+# ========== UPSTREAM PROFILE CACHE ==========
+# Seconds a fetched profile / timeline is served without asking upstream again
+UPSTREAM_CACHE_TTL = _env_int("UPSTREAM_CACHE_TTL", 300)
+# Seconds past the TTL during which the stale copy is served while one refresh runs
+UPSTREAM_CACHE_STALE_TTL = _env_int("UPSTREAM_CACHE_STALE_TTL", 3600)
+# Seconds a "no such account" answer is remembered
+UPSTREAM_CACHE_NEGATIVE_TTL = _env_int("UPSTREAM_CACHE_NEGATIVE_TTL", 120)
+UPSTREAM_CACHE_MAX_ENTRIES = _env_int("UPSTREAM_CACHE_MAX_ENTRIES", 5000)
+# Also keep entries in mongo.db.upstream_cache (shared across workers/restarts)
+UPSTREAM_CACHE_PERSIST = _env_bool("UPSTREAM_CACHE_PERSIST", True)
+
+# ========== UPSTREAM QUOTAS ==========
+# Sustained requests/second and burst size per provider; bulk jobs never exceed these.
+# Defaults: RapidAPI plan ~5 req/s; Twitter user_timeline 900 req / 15 min.
+UPSTREAM_RATE_LIMITS = {
+    "instagram": (
+        _env_float("INSTAGRAM_RATE_PER_SECOND", 5.0),
+        _env_int("INSTAGRAM_RATE_BURST", 10),
+    ),
+    "twitter": (
+        _env_float("TWITTER_RATE_PER_SECOND", 1.0),
+        _env_int("TWITTER_RATE_BURST", 15),
+    ),
+}
+
+# ========== BULK SOCIAL JOBS ==========
+BULK_JOB_MAX_HANDLES = _env_int("BULK_JOB_MAX_HANDLES", 50000)
+# Handles per stored result chunk (also the unit of resume after a crash)
+BULK_JOB_CHUNK_SIZE = _env_int("BULK_JOB_CHUNK_SIZE", 100)
+# Handles fetched + scored in parallel per job
+BULK_JOB_WORKERS = _env_int("BULK_JOB_WORKERS", 8)
+# A running job whose owner stopped renewing this lease is picked up again
+BULK_JOB_LEASE_SECONDS = _env_int("BULK_JOB_LEASE_SECONDS", 120)
+BULK_JOB_RESUME_ON_START = _env_bool("BULK_JOB_RESUME_ON_START", True)
+
+# ========== TWITTER BACKGROUND FETCHES ==========
+# Threads that fetch timelines off the request path
+TWITTER_FETCH_WORKERS = _env_int("TWITTER_FETCH_WORKERS", 4)
+# Seconds a request waits for its fetch before answering 202 with a job id
+TWITTER_SYNC_WAIT = _env_float("TWITTER_SYNC_WAIT", 5.0)
+# Seconds finished background jobs stay pollable
+BACKGROUND_JOB_TTL = _env_int("BACKGROUND_JOB_TTL", 3600)
+
+# ========== TWITTER TIMELINE STORE ==========
+# Newest tweets returned / analyzed per account
+TWITTER_TIMELINE_SIZE = _env_int("TWITTER_TIMELINE_SIZE", 200)
+# Max pages fetched by one delta sync (v1.1 pages hold up to 200 tweets, v2 up to 100)
+TWITTER_SYNC_MAX_PAGES = _env_int("TWITTER_SYNC_MAX_PAGES", 5)
+# Seconds a cached username -> user id mapping is trusted (ids never change, handles can)
+TWITTER_USER_ID_TTL = _env_int("TWITTER_USER_ID_TTL", 7 * 24 * 3600)
+
+# ========== TIMELINE SCORING ==========
+# Days after which a tweet counts half as much as the newest one
+TWEET_RECENCY_HALF_LIFE_DAYS = _env_float("TWEET_RECENCY_HALF_LIFE_DAYS", 30.0)
+# Extra weight per log(1 + likes + 2*retweets + replies); 0 disables engagement weighting
+TWEET_ENGAGEMENT_WEIGHT = _env_float("TWEET_ENGAGEMENT_WEIGHT", 0.5)
+
+# ========== FACE DETECTION ==========
+# DeepFace detectors tried in order; the next one only runs when no face was found
+FACE_DETECTORS = [
+    name.strip() for name in os.getenv("FACE_DETECTORS", "retinaface,mtcnn,opencv,ssd").split(",")
+    if name.strip()
+]
+# Align detected faces (eye line horizontal) before classification
+FACE_ALIGN = _env_bool("FACE_ALIGN", True)
+# Frames of one request detected in parallel
+FRAME_WORKERS = _env_int("FRAME_WORKERS", min(4, os.cpu_count() or 1))
+# Max face crops per batched gender/age forward pass
+FACE_BATCH_SIZE = _env_int("FACE_BATCH_SIZE", 32)
+# Where frame decode + preprocessing runs: "thread" (OpenCV releases the GIL)
+# or "process" (spawned workers, for CPU-bound Python stages)
+FRAME_POOL_KIND = os.getenv("FRAME_POOL_KIND", "thread").strip().lower()
+
+# ========== FRAME PREPROCESSING ==========
+# Stages available to preprocess_face, in order; drop one to disable it
+FRAME_PREP_STAGES = [
+    name.strip() for name in os.getenv(
+        "FRAME_PREP_STAGES", "downscale,equalize,denoise,sharpen,enhance,resize"
+    ).split(",")
+    if name.strip()
+]
+# Only run equalize / denoise / sharpen / enhance when the frame metrics call
+# for it; false runs every enabled stage on every frame
+FRAME_PREP_ADAPTIVE = _env_bool("FRAME_PREP_ADAPTIVE", True)
+# Longest side (px) frames are downscaled to before any enhancement
+FRAME_PREP_MAX_SIDE = _env_int("FRAME_PREP_MAX_SIDE", 320)
+# Estimated noise sigma (grey levels) above which the frame is denoised
+FRAME_NOISE_THRESHOLD = _env_float("FRAME_NOISE_THRESHOLD", 4.0)
+# Variance of the Laplacian below which the frame counts as blurry and is sharpened
+FRAME_BLUR_THRESHOLD = _env_float("FRAME_BLUR_THRESHOLD", 100.0)
+# Mean grey level below which the frame is brightened
+FRAME_DARK_THRESHOLD = _env_float("FRAME_DARK_THRESHOLD", 90.0)
+# Grey-level standard deviation below which contrast is equalized
+FRAME_CONTRAST_THRESHOLD = _env_float("FRAME_CONTRAST_THRESHOLD", 45.0)
+
+# ========== GENDER FRAME VOTING ==========
+# Stop analyzing a gender_frames burst once the vote is settled. Off by
+# default: every frame is analyzed and votes, as before; clients opt in
+# with "sequential" per request
+GENDER_SEQUENTIAL = _env_bool("GENDER_SEQUENTIAL", False)
+# Running confidence that ends the vote early...
+GENDER_STOP_CONFIDENCE = _env_float("GENDER_STOP_CONFIDENCE", 0.9)
+# ...but only after this many frames with a detected face
+GENDER_MIN_FRAMES = _env_int("GENDER_MIN_FRAMES", 3)
+# Frames prepared / detected / classified together between stop checks
+GENDER_WAVE_SIZE = _env_int("GENDER_WAVE_SIZE", 4)
+# Skip frames whose perceptual hash (64-bit dHash) is this close to an analyzed
+# one. Off by default; clients opt in with "dedup" per request
+FRAME_DEDUP = _env_bool("FRAME_DEDUP", False)
+FRAME_DEDUP_DISTANCE = _env_int("FRAME_DEDUP_DISTANCE", 5)
+
+# ========== STREAMING FRAME UPLOADS ==========
+# Max frames / bytes per frame accepted by /analyze/gender_frames/stream
+FRAME_STREAM_MAX_FRAMES = _env_int("FRAME_STREAM_MAX_FRAMES", 300)
+FRAME_STREAM_MAX_FRAME_BYTES = _env_int("FRAME_STREAM_MAX_FRAME_BYTES", 5 * 1024 * 1024)
+# Bytes read from the request body at a time
+FRAME_STREAM_READ_SIZE = _env_int("FRAME_STREAM_READ_SIZE", 64 * 1024)
+# Frames in flight (read but not yet voted) when not in sequential mode
+FRAME_STREAM_WINDOW = _env_int("FRAME_STREAM_WINDOW", 8)
@@ -2,10 +2,11 @@
 import os
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
+import json
+import threading
 import jwt
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
-from werkzeug.utils import secure_filename
 
 # Load .env early — compute path relative to backend folder
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
@@ -13,20 +14,46 @@ ENV_PATH = os.path.join(BASE_DIR, ".env")
 load_dotenv(dotenv_path=ENV_PATH)
 print("Loaded .env from:", ENV_PATH)
 
-# Now other imports (these may use os.getenv)
-from transformers import pipeline
-from deepface import DeepFace
-
-# Custom imports (import after env is loaded)
-from app.extensions import mongo
-from app.auth import auth
-from app.routes.twitter_routes import twitter_bp
-from app.routes.instagram_routes import instagram_bp
-# optional: gender_bp if you created it
-try:
-    from app.routes.gender_routes import gender_bp
-except Exception:
-    gender_bp = None
+# Custom imports (import after env is loaded).
+# transformers / DeepFace are NOT imported here — the model registry loads
+# them lazily or in a background warm-up thread after the app is serving.
+from app.services.model_registry import model_registry, timed_startup, startup_report
+
+with timed_startup("import app.extensions + app.auth"):
+    from app.extensions import mongo
+    from app.auth import auth
+
+with timed_startup("import app.services"):
+    from app.services.nlp_utils import (
+        sentiment_batcher,
+        sentiment_to_traits,
+        iter_length_buckets,
+        submit_sentiment,
+        sentiment_result,
+        analyze_long_text,
+    )
+    from app.services.inference_cache import inference_cache
+    from app.services.upstream_cache import upstream_cache
+    from app.services.vision_utils import get_deepface, decode_image
+    from app.config import (
+        BULK_TEXT_MAX_ITEMS,
+        IMAGE_MODEL_NAME,
+        IMAGE_MODEL_VERSION,
+        MODEL_WARMUP,
+        MODEL_WARMUP_ENABLED,
+        BULK_JOB_RESUME_ON_START,
+    )
+    from app.services.bulk_jobs import bulk_jobs
+
+with timed_startup("import app.routes"):
+    from app.routes.twitter_routes import twitter_bp
+    from app.routes.instagram_routes import instagram_bp
+    from app.routes.bulk_routes import bulk_bp
+    # optional: gender_bp if you created it
+    try:
+        from app.routes.gender_routes import gender_bp
+    except Exception:
+        gender_bp = None
 
 # ========== INIT APP ==========
 app = Flask(__name__)
@@ -43,16 +70,62 @@ app.config["SECRET_KEY"] = os.getenv(
 )
 
 # Init Mongo
-mongo.init_app(app)
+with timed_startup("mongo.init_app"):
+    mongo.init_app(app)
 
 # Register Blueprints
 app.register_blueprint(auth)
 app.register_blueprint(twitter_bp)
 app.register_blueprint(instagram_bp)
+app.register_blueprint(bulk_bp)
 if gender_bp:
     app.register_blueprint(gender_bp)
 
 
+def _resume_bulk_jobs():
+    try:
+        bulk_jobs.resume_incomplete()
+    except Exception as e:
+        print("⚠️ Could not resume bulk jobs:", e)
+
+
+# Spawned frame-pool workers (FRAME_POOL_KIND=process) re-import this
+# module as __mp_main__; only the server process loads models and resumes jobs
+if __name__ != "__mp_main__":
+    # Load models in the background; routes that need them wait on first use
+    if MODEL_WARMUP_ENABLED:
+        model_registry.warm_up(MODEL_WARMUP)
+
+    # Pick up bulk jobs left unfinished by a crashed / restarted worker
+    if BULK_JOB_RESUME_ON_START:
+        threading.Thread(target=_resume_bulk_jobs, name="bulk-job-resume", daemon=True).start()
+
+    print("⏱️ Startup timings:", startup_report())
+
+
+# ========== HEALTH / READINESS ==========
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    """Liveness: the process is up and serving requests"""
+    return jsonify({"status": "ok", "startup": startup_report()})
+
+
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    """
+    Readiness: 200 once every warm-up model is loaded, 503 before that.
+    Always reports the per-model load state and startup timings.
+    """
+    models = model_registry.status()
+    required = MODEL_WARMUP if MODEL_WARMUP_ENABLED else []
+    ready = all(model_registry.is_loaded(name) for name in required)
+    return jsonify({
+        "ready": ready,
+        "models": models,
+        "startup": startup_report(),
+    }), 200 if ready else 503
+
+
 # ========== AUTH ROUTES (LOGIN / SIGNUP / DASHBOARD) ==========
 @app.route("/auth/signup", methods=["POST"])
 def signup():
@@ -127,9 +200,6 @@ def get_user_info():
 
 
 # ========== TEXT ANALYSIS ==========
-sentiment_model = pipeline("sentiment-analysis")
-
-
 @app.route("/analyze/text", methods=["POST"])
 def analyze_text():
     """
@@ -143,18 +213,15 @@ def analyze_text():
     if not user_text:
         return jsonify({"error": "No text provided"}), 400
 
-    # Run sentiment model
-    result = sentiment_model(user_text)[0]
-    label = result.get("label", "NEUTRAL")
-    score = float(result.get("score", 0.0))
+    # Run sentiment model. Long inputs are split into sentence-aligned windows
+    # that are scored in one batch (cached, or batched with other requests).
+    try:
+        label, score, chunks = analyze_long_text(user_text)
+    except Exception as e:
+        print("Error running sentiment model:", e)
+        return jsonify({"error": "Sentiment analysis failed"}), 503
 
-    traits = {
-        "openness": round(0.5 + score * 0.2, 2) if label == "POSITIVE" else round(0.4 - score * 0.2, 2),
-        "conscientiousness": round(0.6 + score * 0.1, 2),
-        "extraversion": round(0.5 + score * 0.25, 2) if label == "POSITIVE" else round(0.4, 2),
-        "agreeableness": round(score, 2) if label == "POSITIVE" else round(1 - score, 2),
-        "neuroticism": round(1 - score, 2) if label == "POSITIVE" else round(score, 2),
-    }
+    traits = sentiment_to_traits(label, score)
 
     # Save to MongoDB (analysis_history collection)
     try:
@@ -174,10 +241,140 @@ def analyze_text():
         "text": user_text,
         "sentiment": label,
         "confidence": round(score, 2),
-        "personality_traits": traits
+        "personality_traits": traits,
+        "chunks": chunks
     })
 
 
+def _read_bulk_texts():
+    """
+    Collect (id, text) pairs for /analyze/text/batch from either
+      - JSON: { "texts": ["...", ...], "username": "..." }
+      - multipart upload: field "file" with one JSON value per line
+        (a plain string or an object with "text" and optional "id")
+    """
+    items = []
+    if "file" in request.files:
+        for line_no, raw in enumerate(request.files["file"].stream):
+            line = raw.decode("utf-8", errors="replace").strip()
+            if not line:
+                continue
+            try:
+                value = json.loads(line)
+            except ValueError:
+                raise ValueError(f"Line {line_no + 1} is not valid JSON")
+            if isinstance(value, dict):
+                items.append((value.get("id"), str(value.get("text") or "")))
+            else:
+                items.append((None, str(value)))
+        username = request.form.get("username", "Anonymous")
+    else:
+        data = request.get_json(silent=True) or {}
+        texts = data.get("texts")
+        if not isinstance(texts, list):
+            raise ValueError("Expected a 'texts' list or an uploaded JSONL 'file'")
+        items = [(None, str(t or "")) for t in texts]
+        username = data.get("username", "Anonymous")
+    return items, username
+
+
+@app.route("/analyze/text/batch", methods=["POST"])
+def analyze_text_batch():
+    """
+    Bulk version of /analyze/text.
+    Texts are scored in length-bucketed batches and each result is streamed
+    back as one NDJSON line as soon as its batch finishes. Lines carry the
+    "index" of the input text because buckets do not follow input order.
+    """
+    try:
+        items, username = _read_bulk_texts()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not items:
+        return jsonify({"error": "No texts provided"}), 400
+    if len(items) > BULK_TEXT_MAX_ITEMS:
+        return jsonify({"error": f"Too many texts (max {BULK_TEXT_MAX_ITEMS})"}), 413
+
+    texts = [text for _, text in items]
+
+    def submit_bucket(indices):
+        # Blank texts never reach the model; they are reported as errors
+        return indices, [submit_sentiment(texts[i]) if texts[i].strip() else None
+                         for i in indices]
+
+    def generate():
+        errors = 0
+        buckets = iter_length_buckets(texts, sentiment_batcher.max_batch_size)
+        first = next(buckets, None)
+        pending = [submit_bucket(first)] if first else []
+
+        while pending:
+            indices, futures = pending.pop(0)
+            # Keep the next bucket queued while the current one is being emitted
+            upcoming = next(buckets, None)
+            if upcoming:
+                pending.append(submit_bucket(upcoming))
+
+            history = []
+            for idx, submitted in zip(indices, futures):
+                item_id, text = items[idx]
+                line = {"index": idx}
+                if item_id is not None:
+                    line["id"] = item_id
+
+                if submitted is None:
+                    errors += 1
+                    line["error"] = "No text provided"
+                    yield json.dumps(line) + "\n"
+                    continue
+
+                try:
+                    result = sentiment_result(*submitted)
+                except Exception as e:
+                    errors += 1
+                    line["error"] = f"Sentiment analysis failed: {e}"
+                    yield json.dumps(line) + "\n"
+                    continue
+
+                label = result.get("label", "NEUTRAL")
+                score = float(result.get("score", 0.0))
+                traits = sentiment_to_traits(label, score)
+                line.update({
+                    "text": text,
+                    "sentiment": label,
+                    "confidence": round(score, 2),
+                    "personality_traits": traits,
+                })
+                history.append({
+                    "type": "Text",
+                    "user": username,
+                    "input_text": text,
+                    "result": label,
+                    "confidence": round(score * 100, 2),
+                    "personality_traits": traits,
+                    "created_at": datetime.utcnow()
+                })
+                yield json.dumps(line) + "\n"
+
+            # One round trip per bucket instead of one per text
+            if history:
+                try:
+                    mongo.db.analysis_history.insert_many(history, ordered=False)
+                except Exception as e:
+                    print("Error saving bulk text analysis to DB:", e)
+
+        yield json.dumps({"done": True, "total": len(items), "errors": errors}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+@app.route("/analyze/text/metrics", methods=["GET"])
+def text_batching_metrics():
+    """Queue depth and batch-size stats of the sentiment micro-batcher"""
+    return jsonify(sentiment_batcher.metrics())
+
+
 # ========== IMAGE ANALYSIS (with Gender Prediction) ==========
 @app.route("/analyze/image", methods=["POST"])
 def analyze_image():
@@ -193,24 +390,55 @@ def analyze_image():
         return jsonify({"error": "No image file uploaded"}), 400
 
     image_file = request.files["image"]
-    filename = secure_filename(image_file.filename or f"{datetime.utcnow().timestamp()}.jpg")
-    image_path = os.path.join("temp", filename)
-    os.makedirs("temp", exist_ok=True)
-    image_file.save(image_path)
+    image_bytes = image_file.read()
+    cache_key = inference_cache.bytes_key(image_bytes, IMAGE_MODEL_NAME, IMAGE_MODEL_VERSION)
 
     try:
-        # 🔹 Run DeepFace for emotion + gender
-        analysis = DeepFace.analyze(
-            img_path=image_path,
-            actions=['emotion', 'gender'],
-            enforce_detection=False
-        )
-
-        result = analysis[0] if isinstance(analysis, list) else analysis
-
-        # DeepFace sometimes uses keys 'gender' or 'dominant_gender' — handle both
-        dominant_emotion = result.get("dominant_emotion") or result.get("emotion", "unknown")
-        dominant_gender = result.get("dominant_gender") or result.get("gender") or "unknown"
+        cached = inference_cache.get(cache_key)
+        if cached is not None:
+            dominant_emotion = cached["emotion"]
+            dominant_gender = cached["gender"]
+            confidence_val = cached["confidence"]
+        else:
+            # Decoded in memory: no temp file, nothing shared between requests
+            try:
+                img = decode_image(image_bytes)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            # 🔹 Run DeepFace for emotion + gender
+            analysis = get_deepface().analyze(
+                img_path=img,
+                actions=['emotion', 'gender'],
+                enforce_detection=False
+            )
+
+            result = analysis[0] if isinstance(analysis, list) else analysis
+
+            # DeepFace sometimes uses keys 'gender' or 'dominant_gender' — handle both
+            dominant_emotion = result.get("dominant_emotion") or result.get("emotion", "unknown")
+            dominant_gender = result.get("dominant_gender") or result.get("gender") or "unknown"
+
+            # Confidence: try to extract from result if available
+            confidence_val = None
+            # DeepFace sometimes includes 'emotion' dict with probabilities
+            try:
+                if isinstance(result.get("emotion"), dict):
+                    top = max(result["emotion"].values())
+                    confidence_val = round(top * 100, 2)
+            except Exception:
+                confidence_val = None
+
+            inference_cache.set(
+                cache_key,
+                {
+                    "emotion": str(dominant_emotion),
+                    "gender": str(dominant_gender),
+                    "confidence": confidence_val,
+                },
+                model=IMAGE_MODEL_NAME,
+                version=IMAGE_MODEL_VERSION,
+            )
 
         # Map emotion → personality traits (optional)
         emotion_to_traits = {
@@ -225,16 +453,6 @@ def analyze_image():
 
         traits = emotion_to_traits.get(str(dominant_emotion).lower(), {})
 
-        # Confidence: try to extract from result if available
-        confidence_val = None
-        # DeepFace sometimes includes 'emotion' dict with probabilities
-        try:
-            if isinstance(result.get("emotion"), dict):
-                top = max(result["emotion"].values())
-                confidence_val = round(top * 100, 2)
-        except Exception:
-            confidence_val = None
-
         # Save to MongoDB
         try:
             mongo.db.analysis_history.insert_one({
@@ -260,9 +478,41 @@ def analyze_image():
         print("Error in DeepFace:", e)
         return jsonify({"error": str(e)}), 500
 
-    finally:
-        if os.path.exists(image_path):
-            os.remove(image_path)
+
+# ========== INFERENCE CACHE ==========
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    """Hit/miss counters of the text + image inference cache and the upstream profile cache"""
+    return jsonify({**inference_cache.stats(), "upstream": upstream_cache.stats()})
+
+
+@app.route("/cache/invalidate", methods=["POST"])
+def cache_invalidate():
+    """
+    Drop cached model outputs, e.g. after swapping model weights.
+    JSON (all optional): { "model": "...", "version": "..." }
+    Sentiment entries are stored as "<SENTIMENT_MODEL_VERSION>+<backend>";
+    a bare version drops every backend's entries, "1+onnx" only that one.
+    An empty body clears the whole cache.
+    """
+    data = request.get_json(silent=True) or {}
+    removed = inference_cache.invalidate(model=data.get("model"), version=data.get("version"))
+    return jsonify({"message": "Cache invalidated", "removed": removed})
+
+
+@app.route("/cache/upstream/invalidate", methods=["POST"])
+def upstream_cache_invalidate():
+    """
+    Drop cached upstream profiles so the next lookup refetches them.
+    JSON (all optional): { "platform": "instagram" | "twitter", "username": "..." }
+    An empty body clears the whole upstream cache. Other workers drop their
+    in-memory copies within a few seconds (see UpstreamCache).
+    """
+    data = request.get_json(silent=True) or {}
+    if data.get("username") and not data.get("platform"):
+        return jsonify({"error": "platform is required with username"}), 400
+    removed = upstream_cache.invalidate(platform=data.get("platform"), username=data.get("username"))
+    return jsonify({"message": "Upstream cache invalidated", "removed": removed})
 
 
 @app.route("/dashboard/stats", methods=["GET"])
@@ -0,0 +1,108 @@
+# backend/app/routes/bulk_routes.py
+import json
+
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+
+from app.config import BULK_JOB_MAX_HANDLES
+from app.services.bulk_jobs import bulk_jobs, normalize_handles
+from app.services.rate_limit import provider_buckets
+from app.routes.instagram_routes import USE_MOCK_DATA, fetch_instagram_profile, analyze_instagram_profile
+from app.routes.twitter_routes import fetch_twitter_timeline, analyze_twitter_timeline
+
+bulk_bp = Blueprint("bulk", __name__, url_prefix="/bulk")
+
+# userInfo + posts = two RapidAPI requests per handle; mock data (the same
+# switch as /instagram/analyze) costs no quota and is not cached
+bulk_jobs.register_provider(
+    "instagram", fetch_instagram_profile, analyze_instagram_profile,
+    cost=0 if USE_MOCK_DATA else 2, cached=not USE_MOCK_DATA,
+)
+bulk_jobs.register_provider(
+    "twitter", fetch_twitter_timeline, lambda username, tweets: analyze_twitter_timeline(tweets), cost=1
+)
+
+
+@bulk_bp.route("/jobs", methods=["POST"])
+def create_bulk_job():
+    """
+    Start a background analysis of many accounts.
+    JSON: { "platform": "instagram" | "twitter", "handles": ["name", "@other", ...] }
+    Returns 202 with the job id; poll /bulk/jobs/<id> and download
+    /bulk/jobs/<id>/results (partial results are available while it runs).
+    """
+    data = request.get_json(silent=True) or {}
+    platform = data.get("platform")
+    handles = data.get("handles")
+    if platform not in bulk_jobs.platforms:
+        return jsonify({"error": f"platform must be one of {', '.join(bulk_jobs.platforms)}"}), 400
+    if not isinstance(handles, list) or not handles:
+        return jsonify({"error": "handles must be a non-empty list"}), 400
+
+    handles = normalize_handles(handles)
+    if not handles:
+        return jsonify({"error": "No valid handles provided"}), 400
+    if len(handles) > BULK_JOB_MAX_HANDLES:
+        return jsonify({"error": f"Too many handles (max {BULK_JOB_MAX_HANDLES})"}), 413
+
+    try:
+        job = bulk_jobs.create(platform, handles)
+    except Exception as e:
+        return jsonify({"error": f"Could not create bulk job: {e}"}), 503
+
+    job["links"] = {
+        "status": f"/bulk/jobs/{job['job_id']}",
+        "results": f"/bulk/jobs/{job['job_id']}/results",
+    }
+    return jsonify(job), 202
+
+
+@bulk_bp.route("/jobs/<job_id>", methods=["GET"])
+def get_bulk_job(job_id):
+    job = bulk_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+
+@bulk_bp.route("/jobs/<job_id>/results", methods=["GET"])
+def get_bulk_job_results(job_id):
+    """
+    NDJSON, one line per processed handle in input order. Only finished
+    chunks are included, so this can be downloaded while the job runs.
+    """
+    job = bulk_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    def generate():
+        for item in bulk_jobs.iter_results(job_id):
+            yield json.dumps(item) + "\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        headers={"X-Job-Status": job["status"], "X-Job-Processed": str(job["processed"])},
+    )
+
+
+@bulk_bp.route("/jobs/<job_id>/resume", methods=["POST"])
+def resume_bulk_job(job_id):
+    """Continue a failed, cancelled or orphaned job from its last stored chunk"""
+    if bulk_jobs.get(job_id) is None:
+        return jsonify({"error": "Job not found"}), 404
+    started = bulk_jobs.resume(job_id)
+    return jsonify({"resumed": started, "job": bulk_jobs.get(job_id)}), 202 if started else 409
+
+
+@bulk_bp.route("/jobs/<job_id>/cancel", methods=["POST"])
+def cancel_bulk_job(job_id):
+    if bulk_jobs.get(job_id) is None:
+        return jsonify({"error": "Job not found"}), 404
+    cancelled = bulk_jobs.cancel(job_id)
+    return jsonify({"cancelled": cancelled, "job": bulk_jobs.get(job_id)})
+
+
+@bulk_bp.route("/limits", methods=["GET"])
+def bulk_limits():
+    """Token bucket state per upstream provider"""
+    return jsonify({provider: bucket.stats() for provider, bucket in provider_buckets.items()})
@@ -1,218 +1,206 @@
 # app/routes/gender_routes.py
-import os
-import base64
-import io
-import numpy as np
-from PIL import Image, ImageOps, ImageEnhance
-from flask import Blueprint, request, jsonify
-from deepface import DeepFace
-import cv2
+import json
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from app.config import (
+    FACE_DETECTORS,
+    FRAME_WORKERS,
+    GENDER_SEQUENTIAL,
+    GENDER_STOP_CONFIDENCE,
+    GENDER_MIN_FRAMES,
+    GENDER_WAVE_SIZE,
+    FRAME_DEDUP,
+    FRAME_STREAM_MAX_FRAMES,
+    FRAME_STREAM_READ_SIZE,
+    FRAME_STREAM_WINDOW,
+)
+from app.services.frame_prep import FrameDeduper, dedup_frames, frame_prep_pool, prepare_frame, preprocess_face
+from app.services.frame_stream import LENGTH_PREFIXED_MIMETYPES, iter_length_prefixed_frames, iter_multipart_frames
+from app.services.vision_utils import FrameFaces, b64_to_bytes, classify_faces, decode_b64_image
 
 gender_bp = Blueprint("gender_bp", __name__)
 
-def pil_from_b64(b64str):
-    """Convert base64 string to PIL Image"""
-    try:
-        header, data = b64str.split(",", 1) if "," in b64str else (None, b64str)
-        img_data = base64.b64decode(data)
-        return Image.open(io.BytesIO(img_data)).convert("RGB")
-    except Exception as e:
-        print(f"Error decoding base64: {e}")
-        return None
+# Face detection of a gender_frames request runs here (models live in this process)
+frame_pool = ThreadPoolExecutor(max_workers=max(1, FRAME_WORKERS), thread_name_prefix="frame")
+
+
+def _ms(started):
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+def _flag(value, default):
+    """Boolean request option: JSON true/false/0/1 or a "true"/"false" string"""
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    return bool(value)
+
+
+def gender_from_scores(gender_dict):
+    """(gender, confidence) from DeepFace's {'Man': 99.5, 'Woman': 0.5}"""
+    if isinstance(gender_dict, dict):
+        man_conf = gender_dict.get('Man', 0)
+        woman_conf = gender_dict.get('Woman', 0)
+        if man_conf > woman_conf:
+            return 'man', man_conf / 100.0
+        return 'woman', woman_conf / 100.0
+    # Fallback for different response formats
+    return str(gender_dict).lower(), 0.85
 
-def preprocess_face(pil_img):
+
+def face_results(frame):
+    """Result dicts (one per classified face) of a FrameFaces"""
+    results = []
+    for face in frame.faces:
+        gender_dict = face["attributes"].get('gender', {})
+        gender, confidence = gender_from_scores(gender_dict)
+        results.append({
+            'gender': gender,
+            'confidence': confidence,
+            'face_confidence': face["confidence"],
+            'detector': face["detector"],
+            'age': face["attributes"].get('age'),
+            'raw_scores': gender_dict
+        })
+    return results
+
+
+def analyze_single_frame(img, detectors=None):
     """
-    Enhanced preprocessing for better gender detection
+    Analyze a single frame (BGR array).
+    Faces are detected once through the detector cascade (the next detector
+    only runs if no face was found); gender and age then run once on the
+    cached, aligned crop of the most confident face.
     """
+    frame = FrameFaces(img, detectors=detectors, max_faces=1)
+    frame.classify(['gender', 'age'])  # Age can help validate results
+    return face_results(frame)
+
+
+def preprocessing_summary(frame_timings):
+    """Total ms per preprocessing stage and how many frames applied each one"""
+    stages_ms, applied = {}, {}
+    for timing in frame_timings:
+        report = timing.get("preprocessing") or {}
+        for stage, ms in report.get("timings_ms", {}).items():
+            stages_ms[stage] = round(stages_ms.get(stage, 0.0) + ms, 2)
+        for stage in report.get("applied", []):
+            applied[stage] = applied.get(stage, 0) + 1
+    return {"stages_ms": stages_ms, "frames_applied": applied}
+
+
+def detect_frame(idx, img, timing):
+    """Phase 1 for one prepared frame: detect + align once (no classification)"""
+    timing["frame"] = idx
+    if img is None:
+        print(f"❌ Frame {idx}: {timing.get('error', 'Invalid image data')}")
+        return None, timing
     try:
-        # Convert to numpy array for OpenCV processing
-        img_np = np.array(pil_img)
-        
-        # 1. Apply histogram equalization for better contrast
-        img_yuv = cv2.cvtColor(img_np, cv2.COLOR_RGB2YUV)
-        img_yuv[:,:,0] = cv2.equalizeHist(img_yuv[:,:,0])
-        img_np = cv2.cvtColor(img_yuv, cv2.COLOR_YUV2RGB)
-        
-        # 2. Denoise the image
-        img_np = cv2.fastNlMeansDenoisingColored(img_np, None, 10, 10, 7, 21)
-        
-        # 3. Sharpen the image
-        kernel = np.array([[-1,-1,-1],
-                          [-1, 9,-1],
-                          [-1,-1,-1]])
-        img_np = cv2.filter2D(img_np, -1, kernel)
-        
-        # Convert back to PIL
-        pil_img = Image.fromarray(img_np)
-        
-        # 4. Enhance brightness and contrast
-        enhancer = ImageEnhance.Brightness(pil_img)
-        pil_img = enhancer.enhance(1.2)
-        
-        enhancer = ImageEnhance.Contrast(pil_img)
-        pil_img = enhancer.enhance(1.3)
-        
-        # 5. Resize to optimal size for DeepFace
-        pil_img = pil_img.resize((224, 224), Image.Resampling.LANCZOS)
-        
-        return pil_img
+        # The crop is classified in phase 2
+        t = time.perf_counter()
+        frame = FrameFaces(img, max_faces=1)
+        found = bool(frame.faces)
+        timing["detect_ms"] = _ms(t)
+        if not found:
+            print(f"❌ Frame {idx}: No face detected")
+            return None, timing
+        return frame, timing
     except Exception as e:
-        print(f"Preprocessing error: {e}")
-        # Fallback to simple resize
-        return pil_img.resize((224, 224), Image.Resampling.LANCZOS)
+        print(f"❌ Frame {idx} error: {e}")
+        timing["error"] = f"Detection failed: {e}"
+        return None, timing
 
-def analyze_single_frame(img, temp_path, detector_backend='retinaface', model_name='Facenet512'):
+
+class GenderVote:
     """
-    Analyze a single frame with multiple fallback strategies
+    Running weighted man/woman vote over per-frame results. Each result
+    adds confidence x face confidence (at most 1.0) to its gender, once
+    per frame it stands for. min_frames counts distinct analyses.
     """
-    results = []
-    
-    # Try different detector backends in order of accuracy
-    detectors = ['retinaface', 'mtcnn', 'opencv', 'ssd']
-    
-    for detector in detectors:
-        try:
-            # Save image temporarily
-            img.save(temp_path)
-            
-            # Run DeepFace analysis
-            analysis = DeepFace.analyze(
-                img_path=temp_path,
-                actions=['gender', 'age'],  # Age can help validate results
-                detector_backend=detector,
-                enforce_detection=True,
-                silent=True
-            )
-            
-            # Handle both list and dict responses
-            if isinstance(analysis, list):
-                analysis = analysis[0]
-            
-            # Extract gender information
-            gender_dict = analysis.get('gender', {})
-            
-            # DeepFace returns gender as a dict: {'Man': 99.5, 'Woman': 0.5}
-            if isinstance(gender_dict, dict):
-                man_conf = gender_dict.get('Man', 0)
-                woman_conf = gender_dict.get('Woman', 0)
-                
-                if man_conf > woman_conf:
-                    gender = 'man'
-                    confidence = man_conf / 100.0
-                else:
-                    gender = 'woman'
-                    confidence = woman_conf / 100.0
-            else:
-                # Fallback for different response formats
-                gender = str(gender_dict).lower()
-                confidence = 0.85
-            
-            # Get face region info for quality check
-            region = analysis.get('region', {})
-            face_confidence = region.get('confidence', 1.0) if region else 1.0
-            
-            results.append({
-                'gender': gender,
-                'confidence': confidence,
-                'face_confidence': face_confidence,
-                'detector': detector,
-                'age': analysis.get('age', None),
-                'raw_scores': gender_dict
-            })
-            
-            # If we got a high confidence result, return it
-            if confidence > 0.85 and face_confidence > 0.9:
-                break
-                
-        except ValueError as e:
-            # No face detected with this detector
-            print(f"No face detected with {detector}: {e}")
-            continue
-        except Exception as e:
-            print(f"Error with detector {detector}: {e}")
-            continue
-    
-    return results
 
-@gender_bp.route("/analyze/gender_frames", methods=["POST"])
-def analyze_gender_frames():
+    # Largest weight one frame can add
+    MAX_FRAME_WEIGHT = 1.0
+
+    def __init__(self):
+        self.weights = {'man': 0.0, 'woman': 0.0}
+        self.results = []
+        self.frames = 0
+
+    def add(self, result, count=1, duplicate=False):
+        """
+        `count` > 1 when near-duplicate frames share this result;
+        duplicate=True adds a later duplicate of an already counted result.
+        """
+        # Weight by both gender confidence and face detection confidence
+        weight = result['confidence'] * result['face_confidence'] * count
+        self.weights[result['gender']] = self.weights.get(result['gender'], 0.0) + weight
+        if not duplicate:
+            self.results.append(result)
+        self.frames += count
+
+    def scores(self):
+        """Normalized scores (the posterior share of each gender)"""
+        total = sum(self.weights.values())
+        if total <= 0:
+            return dict(self.weights)
+        return {gender: weight / total for gender, weight in self.weights.items()}
+
+    def leader(self):
+        scores = self.scores()
+        gender = 'man' if scores['man'] > scores['woman'] else 'woman'
+        return gender, scores[gender]
+
+    def stop_reason(self, remaining, min_frames=GENDER_MIN_FRAMES, threshold=GENDER_STOP_CONFIDENCE):
+        """
+        Why more frames are pointless ("confident" / "decided"), or None.
+        remaining=None means the number of frames still to come is unknown.
+        """
+        if not self.results or (remaining is not None and remaining <= 0):
+            return None
+        lead = abs(self.weights['man'] - self.weights['woman'])
+        # Even if every remaining frame voted for the other side at full weight
+        if remaining is not None and lead > remaining * self.MAX_FRAME_WEIGHT:
+            return "decided"
+        if len(self.results) >= min_frames and self.leader()[1] >= threshold:
+            return "confident"
+        return None
+
+
+def analyze_wave(frames, indices):
     """
-    Analyze multiple frames and return aggregated gender prediction
+    Prepare, detect and batch-classify a group of frames (`indices` are
+    their positions in the request). Returns
+    ([(idx, FrameFaces or None, timing)], classify_ms) in frame order.
+    A classification failure raises: it is not a missing face.
     """
-    data = request.get_json()
-    frames = data.get("frames", [])
-    
-    if not frames:
-        return jsonify({"error": "No frames received"}), 400
-    
-    print(f"📸 Received {len(frames)} frames for analysis")
-    
-    # Store all frame results
-    all_results = []
-    temp_dir = "temp"
-    os.makedirs(temp_dir, exist_ok=True)
-    temp_path = os.path.join(temp_dir, "frame.jpg")
-    
-    for idx, b64 in enumerate(frames):
-        try:
-            # Convert base64 to image
-            img = pil_from_b64(b64)
-            if img is None:
-                print(f"❌ Frame {idx}: Invalid image data")
-                continue
-            
-            # Preprocess the image
-            img = preprocess_face(img)
-            
-            # Analyze this frame
-            frame_results = analyze_single_frame(img, temp_path)
-            
-            if frame_results:
-                all_results.extend(frame_results)
-                print(f"✅ Frame {idx}: {frame_results[0]['gender']} ({frame_results[0]['confidence']:.2f})")
-            else:
-                print(f"❌ Frame {idx}: No face detected")
-                
-        except Exception as e:
-            print(f"❌ Frame {idx} error: {e}")
-            continue
-    
-    # Clean up temp file
-    if os.path.exists(temp_path):
-        try:
-            os.remove(temp_path)
-        except:
-            pass
-    
-    # Check if we have any results
-    if not all_results:
-        return jsonify({
-            "error": "No valid faces detected in any frame",
-            "suggestion": "Please ensure your face is clearly visible and well-lit"
-        }), 400
-    
-    # Aggregate results with weighted voting
-    gender_scores = {'man': 0.0, 'woman': 0.0}
-    total_weight = 0.0
-    
-    for result in all_results:
-        gender = result['gender']
-        confidence = result['confidence']
-        face_conf = result['face_confidence']
-        
-        # Weight by both gender confidence and face detection confidence
-        weight = confidence * face_conf
-        gender_scores[gender] += weight
-        total_weight += weight
-    
-    # Normalize scores
-    if total_weight > 0:
-        gender_scores['man'] /= total_weight
-        gender_scores['woman'] /= total_weight
+    # Phase 1: decode + preprocess on the prep pool (threads or processes)
+    return finish_wave([frame_prep_pool.submit(prepare_frame, frame) for frame in frames], indices)
+
+
+def finish_wave(prepared, indices):
+    """analyze_wave() for frames already submitted to the prep pool"""
+    # Each frame is handed to detection as soon as it is ready; order is kept
+    pending = []
+    for idx, future in zip(indices, prepared):
+        img, timing = future.result()
+        pending.append(frame_pool.submit(detect_frame, idx, img, timing))
+    detected = [future.result() for future in pending]
     
-    # Determine final gender
-    final_gender = 'man' if gender_scores['man'] > gender_scores['woman'] else 'woman'
-    final_confidence = max(gender_scores['man'], gender_scores['woman'])
+    # Phase 2: one batched gender/age pass over the crops of these frames
+    t = time.perf_counter()
+    classify_faces([face for frame, _ in detected if frame is not None for face in frame.faces],
+                   ['gender', 'age'])
+    classify_ms = _ms(t)
+    return [(idx, frame, timing) for idx, (frame, timing) in zip(indices, detected)], classify_ms
+
+
+def gender_response(vote, frames_received, frames_used, frames_skipped, stop_reason, timings):
+    """Final gender_frames payload for a vote with at least one result"""
+    gender_scores = vote.scores()
+    final_gender, final_confidence = vote.leader()
     
     # Calculate certainty level
     if final_confidence >= 0.90:
@@ -229,13 +217,18 @@ def analyze_gender_frames():
         "gender": final_gender,
         "confidence": round(final_confidence, 3),
         "certainty": certainty,
-        "frames_analyzed": len(frames),
-        "successful_detections": len(all_results),
+        "frames_received": frames_received,
+        "frames_analyzed": frames_used,
+        "frames_used": frames_used,
+        "frames_skipped": frames_skipped,
+        "stopped_early": stop_reason,
+        "successful_detections": vote.frames,
         "gender_scores": {
             "man": round(gender_scores['man'], 3),
             "woman": round(gender_scores['woman'], 3)
         },
-        "message": f"Detected as {final_gender} with {certainty} certainty"
+        "message": f"Detected as {final_gender} with {certainty} certainty",
+        "timings": timings
     }
     
     # Add warning if confidence is low
@@ -246,10 +239,264 @@ def analyze_gender_frames():
     print(f"🎯 FINAL RESULT: {final_gender.upper()}")
     print(f"📊 Confidence: {final_confidence:.1%}")
     print(f"📈 Scores - Man: {gender_scores['man']:.1%}, Woman: {gender_scores['woman']:.1%}")
-    print(f"✅ Successful: {len(all_results)}/{len(frames)} frames")
+    print(f"✅ Successful: {vote.frames}/{frames_used} frames ({frames_received} received, {frames_skipped} duplicates skipped)")
     print(f"{'='*60}\n")
     
-    return jsonify(response)
+    return response
+
+
+NO_FACE_ERROR = {
+    "error": "No valid faces detected in any frame",
+    "suggestion": "Please ensure your face is clearly visible and well-lit",
+}
+
+
+@gender_bp.route("/analyze/gender_frames", methods=["POST"])
+def analyze_gender_frames():
+    """
+    Analyze multiple frames and return aggregated gender prediction.
+    In sequential mode (GENDER_SEQUENTIAL, or "sequential" in the body;
+    off by default) frames are analyzed a few at a time and the burst stops
+    as soon as the running vote is confident enough or can no longer change.
+    Near-duplicate frames (FRAME_DEDUP, or "dedup" in the body; off by
+    default) are analyzed once and vote through their representative.
+    """
+    data = request.get_json()
+    frames = data.get("frames", [])
+    
+    if not frames:
+        return jsonify({"error": "No frames received"}), 400
+    
+    print(f"📸 Received {len(frames)} frames for analysis")
+    
+    sequential = _flag(data.get("sequential"), GENDER_SEQUENTIAL)
+    dedup = _flag(data.get("dedup"), FRAME_DEDUP)
+    
+    started = time.perf_counter()
+    payloads = [b64_to_bytes(b64) for b64 in frames]
+    
+    # Near-identical frames are analyzed once; their representative's
+    # result counts for each of them in the vote
+    t = time.perf_counter()
+    representative = dedup_frames(payloads) if dedup else list(range(len(frames)))
+    dedup_ms = _ms(t)
+    members = Counter(representative)
+    to_analyze = [idx for idx, rep in enumerate(representative) if rep == idx]
+    
+    # Sequential mode works in small waves and checks the vote after each frame
+    wave_size = max(1, GENDER_WAVE_SIZE) if sequential else len(to_analyze)
+    
+    vote = GenderVote()
+    frame_timings = []
+    classify_ms = 0.0
+    frames_used = 0
+    stop_reason = None
+    
+    for wave_start in range(0, len(to_analyze), wave_size):
+        indices = to_analyze[wave_start:wave_start + wave_size]
+        try:
+            wave, wave_classify_ms = analyze_wave([payloads[idx] for idx in indices], indices)
+        except Exception as e:
+            print(f"❌ Classification error: {e}")
+            return jsonify({"error": f"Analysis failed: {str(e)}"}), 500
+        classify_ms += wave_classify_ms
+        for idx, frame, timing in wave:
+            frames_used += members[idx]
+            timing["duplicates"] = members[idx] - 1
+            frame_timings.append(timing)
+            if frame is not None:
+                frame_results = face_results(frame)
+                for result in frame_results:
+                    vote.add(result, count=members[idx])
+                print(f"✅ Frame {idx}: {frame_results[0]['gender']} ({frame_results[0]['confidence']:.2f})"
+                      + (f" x{members[idx]}" if members[idx] > 1 else ""))
+            if sequential:
+                stop_reason = vote.stop_reason(remaining=len(frames) - frames_used)
+                if stop_reason:
+                    break
+        if stop_reason:
+            print(f"⏹️ Stopped after {frames_used}/{len(frames)} frames ({stop_reason})")
+            break
+    
+    frames_skipped = frames_used - len(frame_timings)
+    
+    timings = {
+        "total_ms": _ms(started),
+        "dedup_ms": dedup_ms,
+        "classify_ms": round(classify_ms, 2),
+        "preprocessing": preprocessing_summary(frame_timings),
+        "frames": frame_timings,
+    }
+    
+    # Check if we have any results
+    if not vote.results:
+        return jsonify({**NO_FACE_ERROR, "timings": timings}), 400
+    
+    return jsonify(gender_response(vote, len(frames), frames_used, frames_skipped, stop_reason, timings))
+
+
+def _arg_flag(name, default):
+    return _flag(request.args.get(name), default)
+
+
+def frame_line(idx, frame, timing, vote):
+    """NDJSON line for one analyzed frame, with the running vote"""
+    line = {"frame": idx, "timing": timing}
+    if frame is None:
+        line["error"] = timing.get("error") or "No face detected"
+    else:
+        best = face_results(frame)[0]
+        line.update({
+            "gender": best['gender'],
+            "confidence": round(best['confidence'], 3),
+            "face_confidence": round(best['face_confidence'], 3),
+            "age": best['age'],
+            "detector": best['detector'],
+        })
+    if vote.results:
+        gender, confidence = vote.leader()
+        line["running"] = {"gender": gender, "confidence": round(confidence, 3)}
+    return line
+
+
+@gender_bp.route("/analyze/gender_frames/stream", methods=["POST"])
+def analyze_gender_frames_stream():
+    """
+    Streaming variant of /analyze/gender_frames for raw JPEG/PNG frames:
+      - multipart/form-data, one file part per frame, or
+      - application/octet-stream: [4-byte big-endian length][bytes] records
+        (chunked transfer encoding is fine)
+    Frames are decoded and analyzed while the upload is still arriving;
+    only the current wave of frames is held in memory. The response is
+    NDJSON: one line per frame as soon as it is voted, then a final line
+    with "done": true and the same summary as /analyze/gender_frames.
+    Query: sequential, dedup (flags), total (expected frame count, lets
+    the sequential mode stop once the outcome can no longer change).
+    """
+    if request.mimetype == "multipart/form-data":
+        boundary = request.mimetype_params.get("boundary")
+        if not boundary:
+            return jsonify({"error": "Missing multipart boundary"}), 400
+        incoming = iter_multipart_frames(request.stream, boundary)
+    elif request.mimetype in LENGTH_PREFIXED_MIMETYPES:
+        incoming = iter_length_prefixed_frames(request.stream)
+    else:
+        return jsonify({"error": "Send multipart/form-data or length-prefixed application/octet-stream frames"}), 415
+    
+    sequential = _arg_flag("sequential", GENDER_SEQUENTIAL)
+    deduper = FrameDeduper() if _arg_flag("dedup", FRAME_DEDUP) else None
+    total = request.args.get("total", type=int)
+    wave_size = max(1, GENDER_WAVE_SIZE if sequential else FRAME_STREAM_WINDOW)
+    stream = request.stream
+    
+    def generate():
+        started = time.perf_counter()
+        vote = GenderVote()
+        frame_timings = []
+        wave = []              # (idx, prep future) of frames being analyzed
+        results = {}           # analyzed frame -> its face results ([] if none)
+        waiting = {}           # analyzed frame -> duplicates seen before its result
+        state = {"received": 0, "used": 0, "classify_ms": 0.0, "stop": None, "failed": None}
+        
+        def remaining():
+            return None if total is None else max(0, total - state["used"])
+        
+        def count_duplicate(idx, rep):
+            state["used"] += 1
+            for result in results[rep]:
+                vote.add(result, duplicate=True)
+            line = {"frame": idx, "duplicate_of": rep}
+            if vote.results:
+                gender, confidence = vote.leader()
+                line["running"] = {"gender": gender, "confidence": round(confidence, 3)}
+            return line
+        
+        def flush():
+            lines = []
+            try:
+                analyzed, classify_ms = finish_wave([future for _, future in wave], [idx for idx, _ in wave])
+            except Exception as e:
+                print(f"❌ Classification error: {e}")
+                state["failed"] = f"Analysis failed: {str(e)}"
+                return lines
+            finally:
+                wave.clear()
+            state["classify_ms"] += classify_ms
+            for idx, frame, timing in analyzed:
+                frame_timings.append(timing)
+                results[idx] = face_results(frame) if frame is not None else []
+                state["used"] += 1
+                for result in results[idx]:
+                    vote.add(result)
+                lines.append(frame_line(idx, frame, timing, vote))
+                for dup in waiting.pop(idx, []):
+                    lines.append(count_duplicate(dup, idx))
+                if sequential:
+                    state["stop"] = vote.stop_reason(remaining=remaining())
+                    if state["stop"]:
+                        break
+            return lines
+        
+        error = None
+        try:
+            for idx, data in enumerate(incoming):
+                if idx >= FRAME_STREAM_MAX_FRAMES:
+                    error = f"Too many frames (max {FRAME_STREAM_MAX_FRAMES})"
+                    break
+                state["received"] += 1
+                rep = deduper.match(idx, data) if deduper is not None else None
+                if rep is not None:
+                    if rep in results:
+                        yield json.dumps(count_duplicate(idx, rep)) + "\n"
+                    else:
+                        # Analyze the pending wave now: a near-static burst
+                        # would otherwise never fill one until the upload ends
+                        waiting.setdefault(rep, []).append(idx)
+                        for line in flush():
+                            yield json.dumps(line) + "\n"
+                else:
+                    wave.append((idx, frame_prep_pool.submit(prepare_frame, data)))
+                    if len(wave) >= wave_size:
+                        for line in flush():
+                            yield json.dumps(line) + "\n"
+                if state["stop"] or state["failed"]:
+                    break
+                if sequential:
+                    state["stop"] = vote.stop_reason(remaining=remaining())
+                    if state["stop"]:
+                        break
+        except ValueError as e:
+            error = str(e)
+        
+        if wave and not state["stop"] and not state["failed"]:
+            for line in flush():
+                yield json.dumps(line) + "\n"
+        
+        timings = {
+            "total_ms": _ms(started),
+            "classify_ms": round(state["classify_ms"], 2),
+            "preprocessing": preprocessing_summary(frame_timings),
+        }
+        frames_skipped = state["used"] - len(frame_timings)
+        if state["failed"]:
+            summary = {"error": state["failed"], "frames_received": state["received"], "timings": timings}
+        elif vote.results:
+            summary = gender_response(vote, state["received"], state["used"], frames_skipped,
+                                      state["stop"], timings)
+        else:
+            summary = {**NO_FACE_ERROR, "frames_received": state["received"], "timings": timings}
+        if error:
+            summary["stream_error"] = error
+        yield json.dumps({"done": True, **summary}) + "\n"
+        
+        if state["stop"]:
+            print(f"⏹️ Stopped after {state['used']} frames ({state['stop']}); discarding the rest of the upload")
+        # Read (and drop) the rest of the body so a client still uploading
+        # (early stop, failure, bad or too many frames) can finish sending
+        while stream.read(FRAME_STREAM_READ_SIZE):
+            pass
+    
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
 
 
 @gender_bp.route("/analyze/gender_single", methods=["POST"])
@@ -263,24 +510,23 @@ def analyze_gender_single():
     if not image_b64:
         return jsonify({"error": "No image provided"}), 400
     
-    temp_dir = "temp"
-    os.makedirs(temp_dir, exist_ok=True)
-    temp_path = os.path.join(temp_dir, "single_frame.jpg")
-    
     try:
-        # Convert and preprocess
-        img = pil_from_b64(image_b64)
+        # Decode and preprocess in memory
+        started = time.perf_counter()
+        img = decode_b64_image(image_b64)
         if img is None:
             return jsonify({"error": "Invalid image data"}), 400
+        timings = {"decode_ms": _ms(started)}
         
-        img = preprocess_face(img)
+        t = time.perf_counter()
+        img, timings["preprocessing"] = preprocess_face(img, with_report=True)
+        timings["preprocess_ms"] = _ms(t)
         
         # Analyze
-        results = analyze_single_frame(img, temp_path)
-        
-        # Clean up
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        t = time.perf_counter()
+        results = analyze_single_frame(img)
+        timings["analyze_ms"] = _ms(t)
+        timings["total_ms"] = _ms(started)
         
         if not results:
             return jsonify({"error": "No face detected in image"}), 400
@@ -293,7 +539,8 @@ def analyze_gender_single():
             "confidence": round(best_result['confidence'], 3),
             "detector_used": best_result['detector'],
             "age_estimate": best_result.get('age'),
-            "raw_scores": best_result['raw_scores']
+            "raw_scores": best_result['raw_scores'],
+            "timings": timings
         })
         
     except Exception as e:
@@ -307,9 +554,10 @@ def test_gender():
         "status": "Gender Detection API is running! ✅",
         "endpoints": {
             "/analyze/gender_frames": "POST - Analyze multiple frames",
+            "/analyze/gender_frames/stream": "POST - Stream binary frames, NDJSON results",
             "/analyze/gender_single": "POST - Analyze single image",
             "/test/gender": "GET - This test endpoint"
         },
-        "supported_detectors": ["retinaface", "mtcnn", "opencv", "ssd"],
-        "requirements": "DeepFace, OpenCV, PIL"
+        "supported_detectors": FACE_DETECTORS,
+        "requirements": "DeepFace, OpenCV, NumPy"
     })
\ No newline at end of file
@@ -2,9 +2,12 @@ from flask import Blueprint, request, jsonify, redirect, session
 import requests
 import random
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
+from app.utils.lexicon import score_text, score_profile, lexicon_scorer
+from app.services.post_store import profile_scorer
+from app.services.api_utils import upstream_http, UpstreamNotFound, UpstreamHTTPError, UpstreamRateLimited
+from app.services.upstream_cache import upstream_cache
+from app.services.media_sync import media_sync
+from app.config import INSTAGRAM_USE_MOCK_DATA, UPSTREAM_MODE
 
 instagram_bp = Blueprint("instagram", __name__, url_prefix="/instagram")
 
@@ -23,13 +26,15 @@ INSTAGRAM_TOKEN_URL = "https://api.instagram.com/oauth/access_token"
 RAPIDAPI_KEY = "eeebc2f2fbmshc3917f1c3585f29p104815jsn7bd06266244c"
 RAPIDAPI_HOST = "instagram120.p.rapidapi.com"
 
-# Development Mode (Set to False when APIs are configured)
-USE_MOCK_DATA = True
+# Development Mode (INSTAGRAM_USE_MOCK_DATA=false once APIs are configured,
+# or point them at the fake upstream with UPSTREAM_MODE=replay)
+USE_MOCK_DATA = INSTAGRAM_USE_MOCK_DATA
 
 print("=" * 60)
 print("Instagram Analyzer Backend Started")
 print(f"OAuth Configured: {INSTAGRAM_CLIENT_ID != 'YOUR_INSTAGRAM_APP_ID'}")
 print(f"Mock Data Mode: {USE_MOCK_DATA}")
+print(f"Upstream Mode: {UPSTREAM_MODE}")
 print("=" * 60)
 
 
@@ -111,7 +116,7 @@ def instagram_callback():
         }
         
         print("🔄 Exchanging code for access token...")
-        token_response = requests.post(INSTAGRAM_TOKEN_URL, data=token_data)
+        token_response = upstream_http.post(INSTAGRAM_TOKEN_URL, data=token_data)
         token_json = token_response.json()
         
         print(f"Token Response Status: {token_response.status_code}")
@@ -172,8 +177,21 @@ def get_connected_profile():
             f"access_token={access_token}"
         )
         
-        profile_response = requests.get(profile_url)
+        # /me runs in the background while media pages stream into the scorer
+        profile_future = upstream_http.submit("GET", profile_url)
+        if user_id is None:
+            user_id = profile_future.result().json().get("id")
+        
+        # Follows paging cursors; only media newer than the last sync is fetched
+        chunks, sync_report = media_sync.sync(access_token, user_id)
+        try:
+            scored = profile_scorer.score_stream("instagram_graph", user_id, chunks)
+        finally:
+            chunks.close()
+        sentiment, personality = scored["sentiment"], scored["personality_traits"]
+        posts = sync_report["sample_captions"]
         
+        profile_response = profile_future.result()
         if profile_response.status_code != 200:
             return jsonify({
                 "error": "Failed to fetch profile",
@@ -182,31 +200,6 @@ def get_connected_profile():
         
         profile_data = profile_response.json()
         
-        # Get user media (posts)
-        media_url = (
-            f"https://graph.instagram.com/me/media?"
-            f"fields=id,caption,media_type,media_url,timestamp,permalink&"
-            f"limit=25&"
-            f"access_token={access_token}"
-        )
-        
-        media_response = requests.get(media_url)
-        media_data = media_response.json()
-        
-        # Extract post captions
-        posts = []
-        for item in media_data.get("data", []):
-            caption = item.get("caption", "")
-            if caption and caption.strip():
-                posts.append(caption.strip())
-        
-        # Combine text for analysis
-        all_text = " ".join(posts)
-        
-        # Calculate sentiment and personality
-        sentiment = calculate_sentiment(all_text)
-        personality = calculate_personality_traits(all_text, posts)
-        
         result = {
             "username": profile_data.get("username"),
             "user_id": profile_data.get("id"),
@@ -219,7 +212,9 @@ def get_connected_profile():
             "sentiment": sentiment,
             "personality_traits": personality,
             "connected": True,
-            "total_media_analyzed": len(posts)
+            "total_media_analyzed": scored["incremental"]["total_posts"],
+            "incremental": scored["incremental"],
+            "sync": {k: v for k, v in sync_report.items() if k != "sample_captions"}
         }
         
         print(f"✅ Profile data retrieved successfully")
@@ -269,6 +264,241 @@ def connection_status():
 # USERNAME ANALYSIS ENDPOINT
 # ============================================
 
+def _retry_after(response):
+    """Seconds until a throttled RapidAPI quota resets (None if not sent)"""
+    for header in ("retry-after", "x-ratelimit-reset", "x-ratelimit-requests-reset"):
+        try:
+            return max(0.0, float(response.headers.get(header)))
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def fetch_rapidapi_profile(username):
+    """
+    Fetch profile info + posts for `username` from RapidAPI.
+    Returns {"profile": ..., "posts": ...} (raw JSON bodies).
+    Raises UpstreamRateLimited on a 429, so bulk jobs wait and retry.
+    """
+    url_profile = f"https://{RAPIDAPI_HOST}/api/instagram/userInfo"
+    url_posts = f"https://{RAPIDAPI_HOST}/api/instagram/posts"
+    headers = {
+        "Content-Type": "application/json",
+        "x-rapidapi-host": RAPIDAPI_HOST,
+        "x-rapidapi-key": RAPIDAPI_KEY
+    }
+    payload = {"username": username}
+
+    # Profile and posts don't depend on each other, so fetch them together
+    print(f"   📡 Fetching profile + posts from RapidAPI...")
+    responses = upstream_http.fetch_all({
+        "profile": ("POST", url_profile, {"json": payload, "headers": headers}),
+        "posts": ("POST", url_posts, {"json": payload, "headers": headers}),
+    })
+    profile_res, posts_res = responses["profile"], responses["posts"]
+
+    print(f"   Profile Response Status: {profile_res.status_code}")
+    print(f"   Posts Response Status: {posts_res.status_code}")
+
+    for res in (profile_res, posts_res):
+        if res.status_code == 429:
+            raise UpstreamRateLimited("Instagram API rate limit exhausted", _retry_after(res))
+    if profile_res.status_code == 404:
+        raise UpstreamNotFound(f"instagram:{username}")
+    if profile_res.status_code != 200:
+        raise UpstreamHTTPError("Failed to fetch profile from Instagram API", profile_res.status_code)
+    if posts_res.status_code != 200:
+        raise UpstreamHTTPError("Failed to fetch posts from Instagram API", posts_res.status_code)
+
+    profile_data = profile_res.json()
+    if not profile_data.get("data"):
+        raise UpstreamNotFound(f"instagram:{username}")
+    return {"profile": profile_data, "posts": posts_res.json()}
+
+
+def analyze_rapidapi_profile(username, fetched):
+    """Score a fetch_rapidapi_profile() result; returns the /analyze response body"""
+    profile_data, posts_data = fetched["profile"], fetched["posts"]
+
+    # Extract data
+    profile_info = profile_data.get("data", {})
+    posts_list = posts_data.get("data", [])
+    
+    # Get captions (every fetched post is scored, the first 15 are shown)
+    captioned_posts = []
+    for post in posts_list:
+        caption = post.get("caption", {})
+        if isinstance(caption, dict):
+            text = caption.get("text", "")
+        elif isinstance(caption, str):
+            text = caption
+        else:
+            text = ""
+        
+        if text and text.strip():
+            post_id = post.get("id") or post.get("pk") or post.get("code")
+            captioned_posts.append((post_id, text.strip()))
+    sample_posts = [text for _, text in captioned_posts[:15]]
+    
+    # Extract profile fields
+    bio = profile_info.get("biography", "") or profile_info.get("bio", "")
+    followers = profile_info.get("follower_count", 0) or profile_info.get("followers", 0)
+    following = profile_info.get("following_count", 0) or profile_info.get("following", 0)
+    
+    # Analyze bio + captions; posts scored on an earlier call are reused
+    scored = profile_scorer.score("instagram", username, captioned_posts, bio=bio)
+    sentiment, personality_traits = scored["sentiment"], scored["personality_traits"]
+
+    return {
+        "username": username,
+        "followers": followers,
+        "following": following,
+        "bio": bio,
+        "sample_posts": sample_posts,
+        "posts": len(posts_list),
+        "sentiment": sentiment,
+        "personality_traits": personality_traits,
+        "incremental": scored["incremental"],
+        "mock_data": False
+    }
+
+
+# Predefined celebrity profiles for demo (mock data mode)
+MOCK_PROFILES = {
+    "cristiano": {
+        "followers": 617000000,
+        "following": 567,
+        "bio": "Athlete, Father, Entrepreneur | Forever believing in myself 🏆⚽",
+        "posts": [
+            "Training hard for the next match! Victory is earned through dedication 💪⚽",
+            "Quality time with my family is everything ❤️👨‍👩‍👧‍👦",
+            "Never stop believing in yourself! Dreams do come true 🏆✨",
+            "Grateful for all the love and support from fans worldwide 🙏🌍",
+            "Champions are made in the gym! No days off 🔥💯",
+            "New challenge accepted! Let's do this 🚀",
+            "Thankful for another year of growth and success 🎉",
+            "Hard work beats talent when talent doesn't work hard 💼"
+        ]
+    },
+    "leomessi": {
+        "followers": 502000000,
+        "following": 294,
+        "bio": "Welcome to my official Instagram ⚽️🇦🇷",
+        "posts": [
+            "What an amazing match! Proud of the team 🙌⚽",
+            "Family time is the best time ❤️👨‍👩‍👦",
+            "Training with the squad 💪 #TeamWork",
+            "Thank you for all the incredible support! 🙏✨",
+            "Beautiful sunset in Miami 🌅",
+            "New season, new goals ⚽🎯",
+            "Grateful for these moments 💙"
+        ]
+    },
+    "selenagomez": {
+        "followers": 430000000,
+        "following": 231,
+        "bio": "Artist. Advocate. Entrepreneur. @rarebeauty @rareimpactfund 💜",
+        "posts": [
+            "New music coming soon! Can't wait to share it with you 🎵✨",
+            "Mental health matters. Let's talk about it 💙 #MentalHealthAwareness",
+            "Thankful for all the love and support 🙏❤️",
+            "Behind the scenes of today's shoot 📸",
+            "Self-care Sunday vibes 🌸💆‍♀️",
+            "Grateful for this incredible journey ✨",
+            "New @rarebeauty launch! Check it out 💄"
+        ]
+    },
+    "therock": {
+        "followers": 396000000,
+        "following": 620,
+        "bio": "builder of stuff cheat meal crusher tequila sipper og girl dad 💪🥃",
+        "posts": [
+            "4am club! Let's get this work done 💪🔥",
+            "Family first, always ❤️👨‍👧‍👧",
+            "New project announcement coming soon! Stay tuned 🎬",
+            "Leg day is the best day! Who's with me? 🦵💯",
+            "Grateful for every opportunity 🙏✨",
+            "Hard work and dedication pay off! Keep grinding 💼",
+            "Cheat meal time! Pizza anyone? 🍕😋"
+        ]
+    },
+    "kyliejenner": {
+        "followers": 400000000,
+        "following": 154,
+        "bio": "founder of @kyliecosmetics & @kyskinfamily 💋",
+        "posts": [
+            "New @kyliecosmetics collection drops tomorrow! 💄✨",
+            "Sunday funday with my babies 👶❤️",
+            "Obsessed with this new lip shade 💋",
+            "BTS of today's photoshoot 📸",
+            "Feeling grateful and blessed 🙏💕",
+            "Self-care Saturday 💅✨",
+            "Can't wait to share what's coming next! 🚀"
+        ]
+    }
+}
+
+
+def mock_profile(username):
+    """Predefined demo profile for `username`, or a random one"""
+    # Get mock profile or create random one
+    if username.lower() in MOCK_PROFILES:
+        profile = MOCK_PROFILES[username.lower()]
+        print(f"   📋 Using predefined profile for {username}")
+    else:
+        # Generate random profile for unknown usernames
+        profile = {
+            "followers": random.randint(5000, 150000),
+            "following": random.randint(200, 2000),
+            "bio": f"Welcome to @{username}'s profile | Living my best life ✨ | Content Creator 🚀",
+            "posts": [
+                "Amazing day today! Feeling grateful for everything 🙏✨",
+                "New project launching soon! Stay tuned for updates 🚀",
+                "Working hard on my goals every single day 💪 #motivation",
+                "Beautiful sunset tonight 🌅 Nature is truly incredible",
+                "Thanks for all the love and support! You're amazing 🌟❤️",
+                "Living my best life! Grateful for every moment 🎉",
+                "New adventures await! Let's do this 🌍✈️",
+                "Quality time with friends and family ❤️👨‍👩‍👧",
+                "Never stop chasing your dreams ✨ #inspiration",
+                "Positivity and good vibes only! 🌈😊"
+            ]
+        }
+        print(f"   🎲 Generated random profile for {username}")
+    return profile
+
+
+def analyze_mock_profile(username, profile):
+    """Score a mock_profile(); returns the /analyze response body"""
+    # Analyze bio + posts
+    sentiment, personality = score_profile(profile["bio"], profile["posts"])
+
+    return {
+        "username": username,
+        "followers": profile["followers"],
+        "following": profile["following"],
+        "bio": profile["bio"],
+        "sample_posts": profile["posts"],
+        "posts": len(profile["posts"]),
+        "sentiment": sentiment,
+        "personality_traits": personality,
+        "mock_data": True
+    }
+
+
+def fetch_instagram_profile(username):
+    """Bulk-job fetch: mock data in mock mode (like /analyze), RapidAPI otherwise"""
+    if USE_MOCK_DATA:
+        return {"mock": mock_profile(username)}
+    return fetch_rapidapi_profile(username)
+
+
+def analyze_instagram_profile(username, fetched):
+    if "mock" in fetched:
+        return analyze_mock_profile(username, fetched["mock"])
+    return analyze_rapidapi_profile(username, fetched)
+
+
 @instagram_bp.route("/analyze", methods=["POST"])
 def analyze_instagram():
     """
@@ -289,122 +519,7 @@ def analyze_instagram():
     if USE_MOCK_DATA:
         print(f"🎭 Using MOCK data for: @{username}")
         
-        # Predefined celebrity profiles for demo
-        mock_profiles = {
-            "cristiano": {
-                "followers": 617000000,
-                "following": 567,
-                "bio": "Athlete, Father, Entrepreneur | Forever believing in myself 🏆⚽",
-                "posts": [
-                    "Training hard for the next match! Victory is earned through dedication 💪⚽",
-                    "Quality time with my family is everything ❤️👨‍👩‍👧‍👦",
-                    "Never stop believing in yourself! Dreams do come true 🏆✨",
-                    "Grateful for all the love and support from fans worldwide 🙏🌍",
-                    "Champions are made in the gym! No days off 🔥💯",
-                    "New challenge accepted! Let's do this 🚀",
-                    "Thankful for another year of growth and success 🎉",
-                    "Hard work beats talent when talent doesn't work hard 💼"
-                ]
-            },
-            "leomessi": {
-                "followers": 502000000,
-                "following": 294,
-                "bio": "Welcome to my official Instagram ⚽️🇦🇷",
-                "posts": [
-                    "What an amazing match! Proud of the team 🙌⚽",
-                    "Family time is the best time ❤️👨‍👩‍👦",
-                    "Training with the squad 💪 #TeamWork",
-                    "Thank you for all the incredible support! 🙏✨",
-                    "Beautiful sunset in Miami 🌅",
-                    "New season, new goals ⚽🎯",
-                    "Grateful for these moments 💙"
-                ]
-            },
-            "selenagomez": {
-                "followers": 430000000,
-                "following": 231,
-                "bio": "Artist. Advocate. Entrepreneur. @rarebeauty @rareimpactfund 💜",
-                "posts": [
-                    "New music coming soon! Can't wait to share it with you 🎵✨",
-                    "Mental health matters. Let's talk about it 💙 #MentalHealthAwareness",
-                    "Thankful for all the love and support 🙏❤️",
-                    "Behind the scenes of today's shoot 📸",
-                    "Self-care Sunday vibes 🌸💆‍♀️",
-                    "Grateful for this incredible journey ✨",
-                    "New @rarebeauty launch! Check it out 💄"
-                ]
-            },
-            "therock": {
-                "followers": 396000000,
-                "following": 620,
-                "bio": "builder of stuff cheat meal crusher tequila sipper og girl dad 💪🥃",
-                "posts": [
-                    "4am club! Let's get this work done 💪🔥",
-                    "Family first, always ❤️👨‍👧‍👧",
-                    "New project announcement coming soon! Stay tuned 🎬",
-                    "Leg day is the best day! Who's with me? 🦵💯",
-                    "Grateful for every opportunity 🙏✨",
-                    "Hard work and dedication pay off! Keep grinding 💼",
-                    "Cheat meal time! Pizza anyone? 🍕😋"
-                ]
-            },
-            "kyliejenner": {
-                "followers": 400000000,
-                "following": 154,
-                "bio": "founder of @kyliecosmetics & @kyskinfamily 💋",
-                "posts": [
-                    "New @kyliecosmetics collection drops tomorrow! 💄✨",
-                    "Sunday funday with my babies 👶❤️",
-                    "Obsessed with this new lip shade 💋",
-                    "BTS of today's photoshoot 📸",
-                    "Feeling grateful and blessed 🙏💕",
-                    "Self-care Saturday 💅✨",
-                    "Can't wait to share what's coming next! 🚀"
-                ]
-            }
-        }
-        
-        # Get mock profile or create random one
-        if username.lower() in mock_profiles:
-            profile = mock_profiles[username.lower()]
-            print(f"   📋 Using predefined profile for {username}")
-        else:
-            # Generate random profile for unknown usernames
-            profile = {
-                "followers": random.randint(5000, 150000),
-                "following": random.randint(200, 2000),
-                "bio": f"Welcome to @{username}'s profile | Living my best life ✨ | Content Creator 🚀",
-                "posts": [
-                    "Amazing day today! Feeling grateful for everything 🙏✨",
-                    "New project launching soon! Stay tuned for updates 🚀",
-                    "Working hard on my goals every single day 💪 #motivation",
-                    "Beautiful sunset tonight 🌅 Nature is truly incredible",
-                    "Thanks for all the love and support! You're amazing 🌟❤️",
-                    "Living my best life! Grateful for every moment 🎉",
-                    "New adventures await! Let's do this 🌍✈️",
-                    "Quality time with friends and family ❤️👨‍👩‍👧",
-                    "Never stop chasing your dreams ✨ #inspiration",
-                    "Positivity and good vibes only! 🌈😊"
-                ]
-            }
-            print(f"   🎲 Generated random profile for {username}")
-        
-        # Analyze text
-        all_text = profile["bio"] + " " + " ".join(profile["posts"])
-        sentiment = calculate_sentiment(all_text)
-        personality = calculate_personality_traits(all_text, profile["posts"])
-        
-        result = {
-            "username": username,
-            "followers": profile["followers"],
-            "following": profile["following"],
-            "bio": profile["bio"],
-            "sample_posts": profile["posts"],
-            "posts": len(profile["posts"]),
-            "sentiment": sentiment,
-            "personality_traits": personality,
-            "mock_data": True
-        }
+        result = analyze_mock_profile(username, mock_profile(username))
         
         print(f"✅ Mock analysis complete for @{username}")
         return jsonify(result)
@@ -413,77 +528,38 @@ def analyze_instagram():
     # REAL API MODE (RapidAPI Instagram)
     # ==========================================
     try:
-        url_profile = f"https://{RAPIDAPI_HOST}/api/instagram/userInfo"
-        headers = {
-            "Content-Type": "application/json",
-            "x-rapidapi-host": RAPIDAPI_HOST,
-            "x-rapidapi-key": RAPIDAPI_KEY
-        }
-        payload = {"username": username}
-
-        print(f"   📡 Fetching profile from RapidAPI...")
-        profile_res = requests.post(url_profile, json=payload, headers=headers, timeout=10)
-        
-        print(f"   Profile Response Status: {profile_res.status_code}")
-        
-        if profile_res.status_code != 200:
-            return jsonify({
-                "error": "Failed to fetch profile from Instagram API",
-                "status_code": profile_res.status_code
-            }), 500
+        # Popular usernames are served from the upstream cache (stale copies
+        # are refreshed in the background)
+        fetched, cache_status = upstream_cache.fetch(
+            "instagram", username, lambda: fetch_rapidapi_profile(username)
+        )
+        print(f"   Upstream cache: {cache_status}")
+        result = analyze_rapidapi_profile(username, fetched)
+        result["upstream_cache"] = cache_status
         
-        profile_data = profile_res.json()
+        print(f"✅ Real API analysis complete for @{username}")
+        return jsonify(result)
 
-        # Fetch posts
-        url_posts = f"https://{RAPIDAPI_HOST}/api/instagram/posts"
-        posts_res = requests.post(url_posts, json=payload, headers=headers, timeout=10)
-        
-        print(f"   Posts Response Status: {posts_res.status_code}")
-        
-        posts_data = posts_res.json()
+    except UpstreamNotFound:
+        print(f"🚫 Instagram account not found: @{username}")
+        return jsonify({
+            "error": "Instagram account not found",
+            "username": username
+        }), 404
 
-        # Extract data
-        profile_info = profile_data.get("data", {})
-        posts_list = posts_data.get("data", [])
-        
-        # Get captions
-        sample_posts = []
-        for post in posts_list[:15]:
-            caption = post.get("caption", {})
-            if isinstance(caption, dict):
-                text = caption.get("text", "")
-            elif isinstance(caption, str):
-                text = caption
-            else:
-                text = ""
-            
-            if text and text.strip():
-                sample_posts.append(text.strip())
-        
-        # Extract profile fields
-        bio = profile_info.get("biography", "") or profile_info.get("bio", "")
-        followers = profile_info.get("follower_count", 0) or profile_info.get("followers", 0)
-        following = profile_info.get("following_count", 0) or profile_info.get("following", 0)
-        
-        # Analyze
-        all_text = bio + " " + " ".join(sample_posts)
-        sentiment = calculate_sentiment(all_text)
-        personality_traits = calculate_personality_traits(all_text, sample_posts)
+    except UpstreamRateLimited as e:
+        print(f"⏳ Instagram API rate limited for @{username}")
+        retry_after = int(e.retry_after + 0.999) if e.retry_after is not None else 60
+        return jsonify({
+            "error": "Instagram API rate limit reached",
+            "retry_after": retry_after
+        }), 429, {"Retry-After": str(retry_after)}
 
-        result = {
-            "username": username,
-            "followers": followers,
-            "following": following,
-            "bio": bio,
-            "sample_posts": sample_posts,
-            "posts": len(posts_list),
-            "sentiment": sentiment,
-            "personality_traits": personality_traits,
-            "mock_data": False
-        }
-        
-        print(f"✅ Real API analysis complete for @{username}")
-        return jsonify(result)
+    except UpstreamHTTPError as e:
+        return jsonify({
+            "error": "Failed to fetch profile from Instagram API",
+            "status_code": e.status_code
+        }), 500
 
     except requests.exceptions.Timeout:
         print(f"⏱️ API request timeout for @{username}")
@@ -500,6 +576,48 @@ def analyze_instagram():
         }), 500
 
 
+@instagram_bp.route("/analyze/bulk", methods=["POST"])
+def analyze_instagram_bulk():
+    """
+    Score many already-fetched profiles in one vectorized pass.
+    Expects JSON:
+      {
+        "profiles": [{"username": "...", "bio": "...", "posts": ["caption", ...]}, ...],
+        "include_posts": false   # optional: add per-post scores
+      }
+    """
+    data = request.get_json(silent=True) or {}
+    profiles = data.get("profiles")
+    if not isinstance(profiles, list) or not profiles:
+        return jsonify({"error": "A non-empty 'profiles' list is required"}), 400
+
+    parsed = []
+    for entry in profiles:
+        if not isinstance(entry, dict):
+            return jsonify({"error": "Each profile must be an object"}), 400
+        posts = entry.get("posts") or []
+        if not isinstance(posts, list):
+            return jsonify({"error": f"'posts' must be a list (profile {entry.get('username')})"}), 400
+        parsed.append((str(entry.get("bio") or ""), [str(p or "") for p in posts]))
+
+    scored = lexicon_scorer.score_profiles(parsed, with_posts=bool(data.get("include_posts")))
+
+    results = []
+    for entry, (_, posts), result in zip(profiles, parsed, scored):
+        results.append({
+            "username": entry.get("username"),
+            "posts": len(posts),
+            **result
+        })
+
+    print(f"✅ Bulk lexicon scoring complete for {len(results)} profiles")
+    return jsonify({
+        "lexicon_version": lexicon_scorer.version,
+        "count": len(results),
+        "results": results
+    })
+
+
 # ============================================
 # ANALYSIS HELPER FUNCTIONS
 # ============================================
@@ -509,51 +627,7 @@ def calculate_sentiment(text):
     Calculate sentiment scores from text
     Returns: dict with positive, negative, neutral scores
     """
-    if not text or len(text.strip()) == 0:
-        return {"positive": 0.33, "negative": 0.33, "neutral": 0.34}
-    
-    text_lower = text.lower()
-    
-    # Expanded word lists with emojis
-    positive_words = [
-        'love', 'happy', 'great', 'amazing', 'wonderful', 'best', 'awesome',
-        'fantastic', 'excellent', 'beautiful', 'perfect', 'thank', 'blessed',
-        'grateful', 'incredible', 'inspiring', 'joyful', 'excited', 'proud',
-        'successful', 'win', 'victory', 'champion', 'achieve', 'accomplish',
-        '❤️', '😊', '😍', '🎉', '✨', '💪', '🙏', '😀', '😄', '🔥', '💯',
-        '🏆', '🌟', '💖', '👏', '🎊', '😁', '🥰', '💕', '🌈', '☀️'
-    ]
-    
-    negative_words = [
-        'hate', 'sad', 'bad', 'terrible', 'worst', 'awful', 'horrible',
-        'disappointing', 'angry', 'upset', 'frustrated', 'annoying', 'difficult',
-        'pain', 'hurt', 'problem', 'issue', 'fail', 'failure', 'wrong',
-        '😢', '😞', '😡', '💔', '😭', '😔', '😩', '😤', '👎', '😰', '😥'
-    ]
-    
-    # Count occurrences
-    positive_count = sum(1 for word in positive_words if word in text_lower)
-    negative_count = sum(1 for word in negative_words if word in text_lower)
-    
-    # Calculate scores with baseline
-    total = max(positive_count + negative_count, 1)
-    
-    positive_score = (positive_count / total) * 0.7 + 0.15
-    negative_score = (negative_count / total) * 0.5
-    neutral_score = max(1 - positive_score - negative_score, 0.1)
-    
-    # Normalize to sum to 1
-    total_score = positive_score + negative_score + neutral_score
-    if total_score > 0:
-        positive_score /= total_score
-        negative_score /= total_score
-        neutral_score /= total_score
-    
-    return {
-        "positive": round(positive_score, 2),
-        "negative": round(negative_score, 2),
-        "neutral": round(neutral_score, 2)
-    }
+    return score_text(text, [])[0]
 
 
 def calculate_personality_traits(text, posts):
@@ -561,87 +635,7 @@ def calculate_personality_traits(text, posts):
     Calculate Big Five personality traits from text
     Returns: dict with openness, conscientiousness, extraversion, agreeableness, neuroticism
     """
-    if not text or len(text.strip()) == 0:
-        return {
-            "openness": 0.5,
-            "conscientiousness": 0.5,
-            "extraversion": 0.5,
-            "agreeableness": 0.5,
-            "neuroticism": 0.5
-        }
-    
-    text_lower = text.lower()
-    
-    # Openness - Creativity, curiosity, open to experiences
-    openness_words = [
-        'travel', 'art', 'music', 'creative', 'explore', 'adventure',
-        'learn', 'new', 'discover', 'inspire', 'dream', 'imagine',
-        'curious', 'innovative', 'unique', 'original', 'artistic',
-        '✈️', '🎨', '🎵', '🎭', '📚', '🌍', '🗺️', '🎪'
-    ]
-    openness_score = min(
-        sum(1 for word in openness_words if word in text_lower) * 0.07 + 0.4,
-        0.95
-    )
-    
-    # Conscientiousness - Organization, responsibility, goal-oriented
-    conscientiousness_words = [
-        'work', 'goal', 'plan', 'achieve', 'success', 'focus',
-        'dedicated', 'hard', 'discipline', 'organize', 'project',
-        'professional', 'commitment', 'responsibility', 'efficient',
-        '💼', '🎯', '📊', '📈', '✅', '⏰', '📝'
-    ]
-    conscientiousness_score = min(
-        sum(1 for word in conscientiousness_words if word in text_lower) * 0.07 + 0.4,
-        0.95
-    )
-    
-    # Extraversion - Social, outgoing, energetic
-    extraversion_words = [
-        'friend', 'party', 'social', 'people', 'meet', 'fun',
-        'together', 'celebrate', 'share', 'community', 'team',
-        'networking', 'gathering', 'event', 'crowd',
-        '🎉', '👥', '🎊', '🥳', '👯', '🎈', '🍾'
-    ]
-    extraversion_score = sum(1 for word in extraversion_words if word in text_lower) * 0.07
-    # Boost for frequent posting
-    if len(posts) > 7:
-        extraversion_score += 0.25
-    elif len(posts) > 4:
-        extraversion_score += 0.15
-    extraversion_score = min(extraversion_score + 0.3, 0.95)
-    
-    # Agreeableness - Friendly, compassionate, cooperative
-    agreeableness_words = [
-        'love', 'thank', 'grateful', 'help', 'support', 'care',
-        'kind', 'appreciate', 'blessed', 'family', 'friend',
-        'compassion', 'empathy', 'generous', 'sharing',
-        '❤️', '🙏', '💕', '🤗', '💖', '😊', '🫶', '💙'
-    ]
-    agreeableness_score = min(
-        sum(1 for word in agreeableness_words if word in text_lower) * 0.07 + 0.4,
-        0.95
-    )
-    
-    # Neuroticism - Emotional stability (lower is better)
-    neuroticism_words = [
-        'stress', 'worry', 'anxiety', 'fear', 'nervous', 'difficult',
-        'hard', 'struggle', 'problem', 'issue', 'challenge', 'pressure',
-        'overwhelm', 'exhausted', 'tired',
-        '😰', '😔', '😩', '😥', '😓'
-    ]
-    neuroticism_score = min(
-        sum(1 for word in neuroticism_words if word in text_lower) * 0.08 + 0.2,
-        0.7
-    )
-    
-    return {
-        "openness": round(openness_score, 2),
-        "conscientiousness": round(conscientiousness_score, 2),
-        "extraversion": round(extraversion_score, 2),
-        "agreeableness": round(agreeableness_score, 2),
-        "neuroticism": round(neuroticism_score, 2)
-    }
+    return score_text(text, posts)[1]
 
 
 # ============================================
@@ -663,6 +657,7 @@ def test_endpoint():
             "/instagram/disconnect": "POST - Disconnect account",
             "/instagram/status": "GET - Check connection status",
             "/instagram/analyze": "POST - Analyze by username",
+            "/instagram/analyze/bulk": "POST - Score many profiles' posts at once",
             "/instagram/test": "GET - This endpoint"
         }
     })
@@ -1,8 +1,15 @@
 # backend/app/routes/twitter_routes.py
 from flask import Blueprint, request, jsonify
-import tweepy
 import os
-from app.utils.personality_utils import analyze_text  # your analyze function
+import threading
+from concurrent.futures import TimeoutError as FutureTimeout
+from app.utils.personality_utils import analyze_tweets
+from app.services.api_utils import install_upstream_adapter, UpstreamNotFound, UpstreamRateLimited
+from app.services.upstream_cache import upstream_cache
+from app.services.rate_limit import rate_windows
+from app.services.background_jobs import BackgroundJobs
+from app.services.timeline_store import timeline_store
+from app.config import TWITTER_FETCH_WORKERS, TWITTER_SYNC_WAIT, TWITTER_TIMELINE_SIZE
 
 twitter_bp = Blueprint('twitter', __name__, url_prefix='/twitter')
 
@@ -12,25 +19,165 @@ TWITTER_API_SECRET = os.getenv("TWITTER_API_SECRET")
 TWITTER_ACCESS_TOKEN = os.getenv("TWITTER_ACCESS_TOKEN")
 TWITTER_ACCESS_SECRET = os.getenv("TWITTER_ACCESS_SECRET")
 
-print("DEBUG - TWITTER_API_KEY present:", bool(TWITTER_API_KEY))
+# Tweepy client is built on first use, not at import time
+_api = None
+_api_lock = threading.Lock()
+
+# Quota state learnt from Twitter's x-rate-limit-* headers, shared by all threads
+twitter_window = rate_windows["twitter"]
+
+# Timeline fetches run here, never on a request thread
+twitter_jobs = BackgroundJobs("twitter-fetch", TWITTER_FETCH_WORKERS, "twitter_jobs")
+
+
+def _track_rate_limit(response, *args, **kwargs):
+    """requests response hook: keep twitter_window in sync with every reply"""
+    twitter_window.update_from_headers(response.headers)
+    if response.status_code == 429 and not twitter_window.exhausted():
+        retry_after = response.headers.get("retry-after")
+        twitter_window.mark_exhausted(retry_after=float(retry_after) if retry_after else None)
+    return response
+
+
+def get_twitter_api():
+    """Return the shared tweepy.API, or None when credentials are missing/invalid"""
+    global _api
+    if _api is not None:
+        return _api
+
+    if not all([TWITTER_API_KEY, TWITTER_API_SECRET, TWITTER_ACCESS_TOKEN, TWITTER_ACCESS_SECRET]):
+        return None
+
+    with _api_lock:
+        if _api is None:
+            import tweepy
+            try:
+                auth = tweepy.OAuth1UserHandler(
+                    TWITTER_API_KEY, TWITTER_API_SECRET,
+                    TWITTER_ACCESS_TOKEN, TWITTER_ACCESS_SECRET
+                )
+                # Never sleep on the quota inside tweepy: exhaustion is tracked in
+                # twitter_window and callers get a cached result or a job id instead
+                _api = tweepy.API(auth, wait_on_rate_limit=False)
+                # Lets UPSTREAM_MODE=record/replay capture or fake the timeline calls
+                install_upstream_adapter(_api.session)
+                _api.session.hooks["response"].append(_track_rate_limit)
+                print("Twitter API initialized.")
+            except Exception as e:
+                print("Twitter init error:", e)
+                return None
+    return _api
+
+
+def _check_window():
+    if twitter_window.exhausted():
+        twitter_window.reject()
+        raise UpstreamRateLimited("Twitter rate limit exhausted", twitter_window.seconds_until_reset())
+
+
+class V1TimelineSource:
+    """tweepy.API (v1.1) calls in the shape timeline_store expects"""
+
+    MAX_COUNT = 200
+
+    def __init__(self, api):
+        self.api = api
+
+    def _call(self, method, username, **kwargs):
+        import tweepy
+
+        _check_window()
+        try:
+            return method(**kwargs)
+        except tweepy.errors.NotFound:
+            raise UpstreamNotFound(f"twitter:{username}")
+        except tweepy.errors.TooManyRequests:
+            raise UpstreamRateLimited("Twitter rate limit exhausted", twitter_window.seconds_until_reset())
+
+    def lookup_user_id(self, username):
+        return self._call(self.api.get_user, username, screen_name=username).id_str
+
+    def fetch_page(self, user_id, count, since_id=None, until_id=None, cursor=None):
+        params = {"user_id": user_id, "count": min(count, self.MAX_COUNT), "tweet_mode": "extended"}
+        if since_id:
+            params["since_id"] = since_id
+        # max_id is inclusive; cursor already points below the previous page
+        if cursor:
+            params["max_id"] = cursor
+        elif until_id:
+            params["max_id"] = str(int(until_id) - 1)
+        tweets = self._call(self.api.user_timeline, user_id, **params)
+        items = [
+            {
+                "id": tweet.id_str,
+                "text": getattr(tweet, "full_text", ""),
+                "created_at": tweet.created_at.isoformat() if getattr(tweet, "created_at", None) else None,
+                "retweet_count": getattr(tweet, "retweet_count", 0),
+                "like_count": getattr(tweet, "favorite_count", 0),
+                "reply_count": 0,  # not exposed by v1.1
+            }
+            for tweet in tweets
+        ]
+        next_cursor = str(min(int(t["id"]) for t in items) - 1) if items else None
+        return items, next_cursor
+
+
+def fetch_twitter_timeline(username, count=TWITTER_TIMELINE_SIZE):
+    """
+    Latest tweets of `username` (dicts with id, text, created_at and
+    counts), synced incrementally through timeline_store. Never waits on
+    the quota: raises UpstreamRateLimited when the window is exhausted and
+    UpstreamNotFound for unknown accounts.
+    """
+    api = get_twitter_api()
+    if api is None:
+        raise RuntimeError("Twitter API not configured on server")
+    return timeline_store.sync(username, V1TimelineSource(api), count)["tweets"]
+
+
+def analyze_twitter_timeline(tweets):
+    # Each tweet is scored on its own, then weighted by recency and engagement
+    return analyze_tweets(tweets)
+
+
+def _timeline_job(username):
+    """Background job: wait out the quota window if needed, then fetch + analyze"""
+    while True:
+        twitter_window.wait()
+        try:
+            tweets, cache_status = upstream_cache.fetch("twitter", username, lambda: fetch_twitter_timeline(username))
+            break
+        except UpstreamRateLimited:
+            continue
+        except UpstreamNotFound:
+            return {"error": "Twitter account not found", "username": username, "not_found": True}
+    result = analyze_twitter_timeline(tweets)
+    result["upstream_cache"] = cache_status
+    return result
+
+
+def _accepted(job_id, username):
+    retry_after = max(1, int(round(twitter_window.seconds_until_reset()))) if twitter_window.exhausted() else 2
+    body = {
+        "job_id": job_id,
+        "username": username,
+        "status": (twitter_jobs.get(job_id) or {}).get("status", "queued"),
+        "rate_limited": twitter_window.exhausted(),
+        "retry_after": retry_after,
+        "links": {"status": f"/twitter/jobs/{job_id}"},
+    }
+    return jsonify(body), 202, {"Retry-After": str(retry_after), "Location": f"/twitter/jobs/{job_id}"}
 
-api = None
-if all([TWITTER_API_KEY, TWITTER_API_SECRET, TWITTER_ACCESS_TOKEN, TWITTER_ACCESS_SECRET]):
-    try:
-        auth = tweepy.OAuth1UserHandler(
-            TWITTER_API_KEY, TWITTER_API_SECRET,
-            TWITTER_ACCESS_TOKEN, TWITTER_ACCESS_SECRET
-        )
-        api = tweepy.API(auth, wait_on_rate_limit=True)
-        print("Twitter API initialized.")
-    except Exception as e:
-        print("Twitter init error:", e)
-        api = None
-else:
-    print("Twitter API keys not found — Twitter endpoints will return an error until keys are provided.")
 
 @twitter_bp.route('/analyze/twitter', methods=['POST'])
 def analyze_twitter():
+    """
+    Cached timelines are answered right away (stale ones are refreshed in
+    the background). Otherwise the fetch runs as a background job: if it
+    finishes within TWITTER_SYNC_WAIT seconds the result is returned,
+    else (or straight away when the quota is exhausted) 202 + job id.
+    """
+    api = get_twitter_api()
     if api is None:
         return jsonify({"error": "Twitter API not configured on server. Please add credentials to .env."}), 500
 
@@ -40,11 +187,44 @@ def analyze_twitter():
         return jsonify({"error": "Username required"}), 400
 
     try:
-        tweets = api.user_timeline(screen_name=username, count=20, tweet_mode="extended")
-        text_data = " ".join(getattr(tweet, "full_text", "") for tweet in tweets)
-        result = analyze_text(text_data)
+        cached = upstream_cache.peek("twitter", username, lambda: fetch_twitter_timeline(username))
+    except UpstreamNotFound:
+        return jsonify({"error": "Twitter account not found", "username": username}), 404
+    if cached is not None:
+        tweets, cache_status = cached
+        result = analyze_twitter_timeline(tweets)
+        result["upstream_cache"] = cache_status
         return jsonify(result)
-    except tweepy.TweepError as te:
-        return jsonify({"error": f"Tweepy error: {str(te)}"}), 500
+
+    job_id, future = twitter_jobs.submit(
+        lambda: _timeline_job(username), key=upstream_cache.key("twitter", username), username=username
+    )
+    if twitter_window.exhausted():
+        return _accepted(job_id, username)
+
+    try:
+        result = future.result(timeout=TWITTER_SYNC_WAIT)
+    except FutureTimeout:
+        return _accepted(job_id, username)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return jsonify({"error": str(e), "job_id": job_id}), 500
+
+    if result.get("not_found"):
+        return jsonify({"error": result["error"], "username": username}), 404
+    return jsonify(result)
+
+
+@twitter_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_twitter_job(job_id):
+    """Poll a background timeline fetch started by /analyze/twitter"""
+    job = twitter_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job["status"] in ("queued", "running"):
+        job["rate_limit"] = twitter_window.stats()
+    return jsonify(job)
+
+
+@twitter_bp.route('/limits', methods=['GET'])
+def twitter_limits():
+    return jsonify({"window": twitter_window.stats(), **twitter_jobs.stats()})
@@ -0,0 +1,234 @@
+# backend/app/services/api_utils.py
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_EXCEPTION
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from app.config import (
+    UPSTREAM_MODE,
+    FAKE_UPSTREAM_URL,
+    UPSTREAM_FIXTURES_DIR,
+    UPSTREAM_POOL_SIZE,
+    UPSTREAM_MAX_WORKERS,
+    UPSTREAM_TIMEOUT,
+    UPSTREAM_BUDGET,
+)
+
+# Real upstream host -> short service name used by the fake server and fixtures
+UPSTREAM_SERVICES = {
+    "instagram120.p.rapidapi.com": "rapidapi",
+    "graph.instagram.com": "graph",
+    "api.instagram.com": "instagram",
+    "api.twitter.com": "twitter",
+}
+
+# Never written to fixtures or used in fixture keys
+VOLATILE_PARAMS = {"access_token", "client_secret", "code", "oauth_signature", "oauth_nonce", "oauth_timestamp"}
+
+
+# ========== FIXTURE KEYS ==========
+def normalize_query(query):
+    """Sorted query string without secrets / per-call noise"""
+    pairs = [(k, v) for k, v in parse_qsl(query, keep_blank_values=True) if k not in VOLATILE_PARAMS]
+    return urlencode(sorted(pairs))
+
+
+def normalize_body(body):
+    """JSON bodies are compared by content; anything else is ignored"""
+    if not body:
+        return None
+    if isinstance(body, bytes):
+        body = body.decode("utf-8", errors="replace")
+    try:
+        return json.loads(body)
+    except (TypeError, ValueError):
+        return None
+
+
+def fixture_key(service, method, path, query="", body=None):
+    return json.dumps(
+        [service, method.upper(), path, normalize_query(query), normalize_body(body)],
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+
+
+# ========== RECORD / REPLAY ADAPTER ==========
+class UpstreamAdapter(HTTPAdapter):
+    """
+    Transport adapter mounted on every upstream requests.Session.
+
+      live   - plain HTTPAdapter
+      record - real call, then the response is appended to
+               UPSTREAM_FIXTURES_DIR/recorded-<service>.jsonl
+      replay - the URL is rewritten to FAKE_UPSTREAM_URL/<service>/<path>
+    """
+
+    _record_lock = threading.Lock()
+
+    def __init__(self, mode=UPSTREAM_MODE, fake_url=FAKE_UPSTREAM_URL,
+                 fixtures_dir=UPSTREAM_FIXTURES_DIR, **kwargs):
+        super().__init__(**kwargs)
+        self.mode = mode
+        self.fake_url = fake_url
+        self.fixtures_dir = fixtures_dir
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        service = UPSTREAM_SERVICES.get(parts.hostname or "")
+
+        if service and self.mode == "replay":
+            request.url = f"{self.fake_url}/{service}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+            return super().send(request, **kwargs)
+
+        response = super().send(request, **kwargs)
+        if service and self.mode == "record":
+            self._record(service, request, parts, response)
+        return response
+
+    def _record(self, service, request, parts, response):
+        try:
+            payload = response.json()
+            body_field = "json"
+        except ValueError:
+            payload = response.text
+            body_field = "text"
+
+        entry = {
+            "service": service,
+            "method": request.method,
+            "path": parts.path,
+            "query": normalize_query(parts.query),
+            "body": normalize_body(request.body),
+            "status": response.status_code,
+            "headers": {
+                k: v for k, v in response.headers.items()
+                if k.lower().startswith("x-rate-limit") or k.lower() in ("content-type", "retry-after")
+            },
+            body_field: payload,
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        }
+        os.makedirs(self.fixtures_dir, exist_ok=True)
+        path = os.path.join(self.fixtures_dir, f"recorded-{service}.jsonl")
+        with self._record_lock, open(path, "a", encoding="utf-8") as fh:
+            fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+def install_upstream_adapter(session, pool_size=UPSTREAM_POOL_SIZE):
+    """Route an existing requests.Session (e.g. tweepy's) through UpstreamAdapter"""
+    adapter = UpstreamAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def upstream_session(pool_size=UPSTREAM_POOL_SIZE):
+    """New requests.Session for calling Instagram / RapidAPI / Twitter"""
+    return install_upstream_adapter(requests.Session(), pool_size)
+
+
+# ========== POOLED CONCURRENT CLIENT ==========
+class UpstreamTimeout(requests.exceptions.Timeout):
+    """The request budget ran out before every upstream call finished"""
+
+
+class UpstreamNotFound(Exception):
+    """The requested account does not exist upstream"""
+
+
+class UpstreamRateLimited(Exception):
+    """The provider's quota window is exhausted; retry after `retry_after` seconds"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class UpstreamHTTPError(Exception):
+    """Upstream answered with an unexpected status code"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class UpstreamClient:
+    """
+    One kept-alive requests.Session (connection pool per upstream host)
+    plus a small thread pool, so independent upstream calls for the same
+    request run in parallel: wall time is the slowest call, not the sum.
+
+    Every call gets a timeout of min(per-call timeout, time left in the
+    request budget). requests.Session is safe to share between threads
+    for plain GET/POST calls like these.
+    """
+
+    def __init__(self, pool_size=UPSTREAM_POOL_SIZE, max_workers=UPSTREAM_MAX_WORKERS,
+                 timeout=UPSTREAM_TIMEOUT, budget=UPSTREAM_BUDGET):
+        self.session = upstream_session(pool_size)
+        self.timeout = timeout
+        self.budget = budget
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upstream")
+
+    def deadline(self, budget=None):
+        """Absolute monotonic deadline for a request starting now"""
+        return time.monotonic() + (self.budget if budget is None else budget)
+
+    def _call_timeout(self, timeout, deadline):
+        timeout = self.timeout if timeout is None else timeout
+        if deadline is None:
+            return timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise UpstreamTimeout("Upstream request budget exhausted")
+        return min(timeout, remaining)
+
+    def request(self, method, url, timeout=None, deadline=None, **kwargs):
+        return self.session.request(method, url, timeout=self._call_timeout(timeout, deadline), **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def submit(self, method, url, **kwargs):
+        """Start a call in the background; returns a Future of the Response"""
+        return self._executor.submit(self.request, method, url, **kwargs)
+
+    def fetch_all(self, calls, timeout=None, budget=None):
+        """
+        Run `calls` ({name: (method, url, kwargs)}) concurrently.
+
+        Returns {name: Response}. Raises the first call's exception, or
+        UpstreamTimeout if the budget runs out before all calls finish.
+        """
+        deadline = self.deadline(budget)
+        futures = {
+            name: self.submit(method, url, timeout=timeout, deadline=deadline, **(kwargs or {}))
+            for name, (method, url, kwargs) in calls.items()
+        }
+        done, pending = wait(futures.values(), timeout=max(deadline - time.monotonic(), 0),
+                             return_when=FIRST_EXCEPTION)
+        for name, future in futures.items():
+            if future in done and future.exception() is not None:
+                for other in pending:
+                    other.cancel()
+                raise future.exception()
+        if pending:
+            for future in pending:
+                future.cancel()
+            raise UpstreamTimeout(
+                "Upstream calls still running after the request budget: "
+                + ", ".join(name for name, future in futures.items() if future in pending)
+            )
+        return {name: future.result() for name, future in futures.items()}
+
+
+# Shared by the Instagram routes
+upstream_http = UpstreamClient()
@@ -0,0 +1,121 @@
+# backend/app/services/background_jobs.py
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+
+from app.config import BACKGROUND_JOB_TTL
+from app.extensions import mongo
+
+
+class BackgroundJobs:
+    """
+    Small job queue for work that must not run on a request thread
+    (e.g. upstream fetches that may have to wait for a quota reset).
+
+    submit() returns a job id plus the Future; callers may wait briefly on
+    the Future and otherwise hand the id to the client (202 Accepted).
+    Job state is kept in memory and mirrored to mongo.db.<collection> so
+    any worker can answer a poll.
+    """
+
+    def __init__(self, name, workers, collection_name, ttl_seconds=BACKGROUND_JOB_TTL):
+        self.name = name
+        self.collection_name = collection_name
+        self.ttl = ttl_seconds
+        self._jobs = {}    # job_id -> state dict
+        self._active = {}  # dedupe key -> job_id of a queued/running job
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix=name)
+
+    def submit(self, fn, key=None, **meta):
+        """
+        Run fn() in the background; returns (job_id, future).
+        While a job with the same `key` is queued or running, its id and
+        future are returned instead of starting another one.
+        """
+        with self._lock:
+            if key is not None and key in self._active:
+                job_id = self._active[key]
+                return job_id, self._jobs[job_id]["_future"]
+            self._prune()
+            job_id = uuid.uuid4().hex
+            state = {"job_id": job_id, "status": "queued", "created_at": time.time(), **meta}
+            self._jobs[job_id] = state
+            if key is not None:
+                self._active[key] = job_id
+            snapshot = self._public(state)
+            future = state["_future"] = Future()
+        self._persist(snapshot)
+        self._executor.submit(self._run, job_id, key, fn, future)
+        return job_id, future
+
+    def get(self, job_id):
+        with self._lock:
+            state = self._jobs.get(job_id)
+            if state is not None:
+                return self._public(state)
+        try:
+            doc = mongo.db[self.collection_name].find_one({"_id": job_id})
+        except Exception:
+            return None
+        if doc is None:
+            return None
+        doc.pop("_id", None)
+        doc.pop("expires_at", None)
+        return doc
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            state = self._jobs.get(job_id)
+            if state is None:
+                return
+            state.update(fields)
+            snapshot = self._public(state)
+        self._persist(snapshot)
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for state in self._jobs.values():
+                counts[state["status"]] = counts.get(state["status"], 0) + 1
+        return {"jobs": counts}
+
+    # ---------- internals ----------
+    @staticmethod
+    def _public(state):
+        return {k: v for k, v in state.items() if not k.startswith("_")}
+
+    def _run(self, job_id, key, fn, future):
+        self.update(job_id, status="running", started_at=time.time())
+        try:
+            result = fn()
+        except Exception as e:
+            self.update(job_id, status="failed", error=str(e), finished_at=time.time())
+            future.set_exception(e)
+        else:
+            self.update(job_id, status="completed", result=result, finished_at=time.time())
+            future.set_result(result)
+        finally:
+            with self._lock:
+                if key is not None and self._active.get(key) == job_id:
+                    del self._active[key]
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        expired = [job_id for job_id, state in self._jobs.items()
+                   if state.get("finished_at") and state["finished_at"] < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _persist(self, state):
+        try:
+            mongo.db[self.collection_name].replace_one(
+                {"_id": state["job_id"]},
+                {**state, "_id": state["job_id"],
+                 "expires_at": datetime.utcfromtimestamp(state["created_at"] + self.ttl)},
+                upsert=True,
+            )
+        except Exception as e:
+            print(f"⚠️ Could not store {self.name} job {state['job_id']}: {e}")
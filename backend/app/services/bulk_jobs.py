@@ -0,0 +1,312 @@
+# backend/app/services/bulk_jobs.py
+import os
+import socket
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+
+from app.config import (
+    BULK_JOB_CHUNK_SIZE,
+    BULK_JOB_WORKERS,
+    BULK_JOB_LEASE_SECONDS,
+)
+from app.extensions import mongo
+from app.services.api_utils import UpstreamNotFound, UpstreamRateLimited
+from app.services.rate_limit import provider_buckets, rate_windows
+from app.services.upstream_cache import upstream_cache
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class _Cancelled(Exception):
+    pass
+
+
+def normalize_handles(handles):
+    """Strip '@' / whitespace and drop blanks and case-insensitive duplicates, keeping order"""
+    seen = set()
+    result = []
+    for handle in handles:
+        handle = str(handle or "").strip().lstrip("@")
+        if handle and handle.lower() not in seen:
+            seen.add(handle.lower())
+            result.append(handle)
+    return result
+
+
+class BulkJobManager:
+    """
+    Background analysis of long handle lists.
+
+      mongo.db.bulk_jobs         one doc per job: handles, status, counters,
+                                 and a lease held by the process running it
+      mongo.db.bulk_job_results  one doc per finished chunk of handles
+
+    Upstream fetches go through the provider's token bucket, so throughput
+    is set by the quota rather than by request round trips. Cache hits
+    (upstream_cache) spend no tokens. A job is resumable at chunk
+    granularity: chunks already stored are skipped, and a job whose
+    owner stopped renewing its lease can be picked up by any process.
+    """
+
+    def __init__(self, jobs_collection="bulk_jobs", results_collection="bulk_job_results",
+                 chunk_size=BULK_JOB_CHUNK_SIZE, workers=BULK_JOB_WORKERS,
+                 lease_seconds=BULK_JOB_LEASE_SECONDS):
+        self.jobs_collection = jobs_collection
+        self.results_collection = results_collection
+        self.chunk_size = max(1, chunk_size)
+        self.workers = max(1, workers)
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+
+        self._providers = {}
+        self._running = {}  # job_id -> stop Event
+        self._lock = threading.Lock()
+
+    def register_provider(self, platform, fetch, analyze, cost=1, cached=True):
+        """
+        fetch(handle) -> raw upstream data (cached per handle, may raise UpstreamNotFound)
+        analyze(handle, data) -> JSON-serializable result
+        cost: upstream requests (bucket tokens) one fetch uses
+        cached: go through upstream_cache (off for mock data)
+        """
+        self._providers[platform] = {"fetch": fetch, "analyze": analyze, "cost": cost, "cached": cached}
+
+    @property
+    def platforms(self):
+        return sorted(self._providers)
+
+    # ---------- job API ----------
+    def create(self, platform, handles):
+        if platform not in self._providers:
+            raise ValueError(f"Unknown platform '{platform}' (expected one of {', '.join(self.platforms)})")
+        now = datetime.utcnow()
+        job = {
+            "_id": uuid.uuid4().hex,
+            "platform": platform,
+            "handles": handles,
+            "total": len(handles),
+            "chunk_size": self.chunk_size,
+            "status": "queued",
+            "processed": 0,
+            "succeeded": 0,
+            "not_found": 0,
+            "failed": 0,
+            "created_at": now,
+            "updated_at": now,
+        }
+        mongo.db[self.jobs_collection].insert_one(job)
+        self.start(job["_id"])
+        return self.progress(job)
+
+    def get(self, job_id):
+        job = mongo.db[self.jobs_collection].find_one({"_id": job_id}, {"handles": 0})
+        return self.progress(job) if job else None
+
+    def start(self, job_id):
+        """Claim the job (if nobody holds its lease) and run it in the background"""
+        now = datetime.utcnow()
+        job = mongo.db[self.jobs_collection].find_one_and_update(
+            {
+                "_id": job_id,
+                "status": {"$in": list(ACTIVE_STATUSES)},
+                "$or": [{"lease_until": {"$exists": False}}, {"lease_until": {"$lt": now}}],
+            },
+            {"$set": {"status": "running", "owner": self.owner, "updated_at": now,
+                      "lease_until": now + timedelta(seconds=self.lease_seconds)}},
+        )
+        if job is None:
+            return False
+
+        stop = threading.Event()
+        with self._lock:
+            self._running[job_id] = stop
+        threading.Thread(target=self._run, args=(job, stop), name=f"bulk-job-{job_id[:8]}", daemon=True).start()
+        return True
+
+    def cancel(self, job_id):
+        with self._lock:
+            stop = self._running.get(job_id)
+        if stop is not None:
+            stop.set()
+        result = mongo.db[self.jobs_collection].update_one(
+            {"_id": job_id, "status": {"$in": list(ACTIVE_STATUSES)}},
+            {"$set": {"status": "cancelled", "updated_at": datetime.utcnow()}, "$unset": {"lease_until": ""}},
+        )
+        return result.modified_count > 0
+
+    def resume(self, job_id):
+        """Re-run the missing chunks of a failed, cancelled or orphaned job"""
+        mongo.db[self.jobs_collection].update_one(
+            {"_id": job_id, "status": {"$in": ["failed", "cancelled"]}},
+            {"$set": {"status": "queued", "updated_at": datetime.utcnow()}, "$unset": {"error": ""}},
+        )
+        return self.start(job_id)
+
+    def resume_incomplete(self):
+        """Restart every queued/running job whose lease has expired (e.g. after a crash)"""
+        resumed = []
+        for doc in mongo.db[self.jobs_collection].find({"status": {"$in": list(ACTIVE_STATUSES)}}, {"_id": 1}):
+            if self.start(doc["_id"]):
+                resumed.append(doc["_id"])
+        if resumed:
+            print(f"🔁 Resumed {len(resumed)} bulk job(s): {', '.join(resumed)}")
+        return resumed
+
+    def iter_results(self, job_id):
+        """Stored per-handle results, in input order (only finished chunks)"""
+        cursor = mongo.db[self.results_collection].find({"job_id": job_id}).sort("chunk", 1)
+        for doc in cursor:
+            for item in doc["results"]:
+                yield item
+
+    def progress(self, job):
+        total = job.get("total", 0)
+        processed = job.get("processed", 0)
+        return {
+            "job_id": job["_id"],
+            "platform": job.get("platform"),
+            "status": job.get("status"),
+            "total": total,
+            "processed": processed,
+            "succeeded": job.get("succeeded", 0),
+            "not_found": job.get("not_found", 0),
+            "failed": job.get("failed", 0),
+            "percent": round(100.0 * processed / total, 2) if total else 100.0,
+            "error": job.get("error"),
+            "created_at": job.get("created_at").isoformat() if job.get("created_at") else None,
+            "updated_at": job.get("updated_at").isoformat() if job.get("updated_at") else None,
+        }
+
+    # ---------- worker ----------
+    def _run(self, job, stop):
+        job_id = job["_id"]
+        try:
+            status = self._run_chunks(job, stop)
+            update = {"$set": {"status": status, "updated_at": datetime.utcnow()}, "$unset": {"lease_until": ""}}
+        except Exception as e:
+            print(f"❌ Bulk job {job_id} failed: {e}")
+            update = {"$set": {"status": "failed", "error": str(e), "updated_at": datetime.utcnow()},
+                      "$unset": {"lease_until": ""}}
+        finally:
+            with self._lock:
+                self._running.pop(job_id, None)
+        try:
+            if stop.is_set():
+                # cancel() already recorded the final status
+                return
+            mongo.db[self.jobs_collection].update_one({"_id": job_id, "owner": self.owner}, update)
+        except Exception as e:
+            # The lease expires and the job is resumed later
+            print(f"⚠️ Could not record final status of bulk job {job_id}: {e}")
+
+    def _run_chunks(self, job, stop):
+        job_id = job["_id"]
+        handles = job["handles"]
+        size = job.get("chunk_size", self.chunk_size)
+        # Recount from stored chunks so a crash between the chunk write and the
+        # counter update never skews progress
+        stored = set()
+        counts = {"processed": 0, "succeeded": 0, "not_found": 0, "failed": 0}
+        for doc in mongo.db[self.results_collection].find({"job_id": job_id}, {"chunk": 1, "results.status": 1}):
+            stored.add(doc["chunk"])
+            self._tally(counts, doc["results"])
+        self._renew_lease(job_id, {"$set": counts})
+        pending_chunks = [c for c in range((len(handles) + size - 1) // size) if c not in stored]
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bulk-worker") as pool:
+            def submit(chunk_no):
+                chunk = handles[chunk_no * size:(chunk_no + 1) * size]
+                return chunk_no, [pool.submit(self._process, job["platform"], h, stop) for h in chunk]
+
+            queued = [submit(pending_chunks[0])] if pending_chunks else []
+            upcoming = iter(pending_chunks[1:])
+            while queued:
+                chunk_no, futures = queued.pop(0)
+                # Keep the next chunk queued so workers never idle at chunk boundaries
+                nxt = next(upcoming, None)
+                if nxt is not None and not stop.is_set():
+                    queued.append(submit(nxt))
+
+                self._wait_renewing(job_id, futures, stop)
+                results = [f.result() for f in futures]
+                if stop.is_set() or any(r is None for r in results):
+                    return "cancelled"
+                self._store_chunk(job_id, chunk_no, results)
+
+        return "completed"
+
+    def _process(self, platform, handle, stop):
+        """Fetch (rate-limited, cached) and analyze one handle; None if cancelled"""
+        provider = self._providers[platform]
+        bucket = provider_buckets.get(platform)
+
+        def load():
+            if bucket is not None and not bucket.acquire(provider["cost"], stop):
+                raise _Cancelled()
+            return provider["fetch"](handle)
+
+        window = rate_windows.get(platform)
+        while True:
+            if stop.is_set():
+                return None
+            try:
+                if provider["cached"]:
+                    data, cache_status = upstream_cache.fetch(platform, handle, load)
+                else:
+                    data, cache_status = load(), "bypass"
+                break
+            except UpstreamRateLimited as e:
+                # The provider's window ran out: wait for the reset and retry
+                if window is not None:
+                    if not window.wait(stop):
+                        return None
+                elif stop.wait(e.retry_after or 60):
+                    return None
+            except _Cancelled:
+                return None
+            except UpstreamNotFound:
+                return {"username": handle, "status": "not_found"}
+            except Exception as e:
+                return {"username": handle, "status": "error", "error": str(e)}
+        try:
+            return {"username": handle, "status": "ok", "upstream_cache": cache_status,
+                    "result": provider["analyze"](handle, data)}
+        except Exception as e:
+            return {"username": handle, "status": "error", "error": str(e)}
+
+    def _wait_renewing(self, job_id, futures, stop):
+        """Wait for a chunk while renewing the job lease"""
+        pending = set(futures)
+        while pending:
+            _, pending = wait(pending, timeout=max(self.lease_seconds / 3.0, 1.0))
+            if pending and not stop.is_set():
+                self._renew_lease(job_id)
+
+    def _renew_lease(self, job_id, extra=None):
+        now = datetime.utcnow()
+        update = {"$set": {"lease_until": now + timedelta(seconds=self.lease_seconds), "updated_at": now}}
+        for op, fields in (extra or {}).items():
+            update.setdefault(op, {}).update(fields)
+        mongo.db[self.jobs_collection].update_one({"_id": job_id, "owner": self.owner}, update)
+
+    def _store_chunk(self, job_id, chunk_no, results):
+        mongo.db[self.results_collection].replace_one(
+            {"_id": f"{job_id}:{chunk_no}"},
+            {"_id": f"{job_id}:{chunk_no}", "job_id": job_id, "chunk": chunk_no,
+             "results": results, "created_at": datetime.utcnow()},
+            upsert=True,
+        )
+        counts = {"processed": 0, "succeeded": 0, "not_found": 0, "failed": 0}
+        self._tally(counts, results)
+        self._renew_lease(job_id, {"$inc": counts})
+
+    @staticmethod
+    def _tally(counts, results):
+        for item in results:
+            counts["processed"] += 1
+            counts[{"ok": "succeeded", "not_found": "not_found"}.get(item["status"], "failed")] += 1
+
+
+bulk_jobs = BulkJobManager()
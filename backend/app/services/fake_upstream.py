@@ -0,0 +1,202 @@
+# backend/app/services/fake_upstream.py
+"""
+Local stand-in for RapidAPI Instagram, the Instagram Graph API and the
+Twitter API, for load tests and offline development.
+
+Run it:
+    cd backend && python -m app.services.fake_upstream --port 5055
+and start the app with UPSTREAM_MODE=replay (plus INSTAGRAM_USE_MOCK_DATA=false
+to exercise the real RapidAPI code path). Every upstream session then talks
+to this server instead of the internet.
+
+Responses come from the fixtures in UPSTREAM_FIXTURES_DIR:
+  *.json  - a list of entries (hand-written defaults)
+  *.jsonl - one entry per line (what UPSTREAM_MODE=record writes)
+An entry matches on service + method + path + query + JSON body. Entries
+with "default": true and a "path_pattern" regex answer anything else on
+that route; "{username}" in their response is replaced with the
+username from the request.
+
+Latency, jitter, error rate and a per-service rate limit (429 with
+Twitter-style x-rate-limit-* headers) are configurable from the env
+(FAKE_UPSTREAM_*) or at runtime with POST /_fake/config.
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import threading
+import time
+
+from flask import Flask, request, jsonify, Response
+
+from app.config import (
+    UPSTREAM_FIXTURES_DIR,
+    FAKE_UPSTREAM_LATENCY_MS,
+    FAKE_UPSTREAM_JITTER_MS,
+    FAKE_UPSTREAM_ERROR_RATE,
+    FAKE_UPSTREAM_RATE_LIMIT,
+    FAKE_UPSTREAM_RATE_WINDOW,
+    FAKE_UPSTREAM_SEED,
+)
+from app.services.api_utils import fixture_key, normalize_query
+
+
+class FixtureStore:
+    """Recorded responses indexed by fixture key, plus per-route defaults"""
+
+    def __init__(self, fixtures_dir):
+        self.exact = {}
+        self.defaults = []
+        for path in sorted(glob.glob(os.path.join(fixtures_dir, "*.json"))):
+            with open(path, encoding="utf-8") as fh:
+                for entry in json.load(fh):
+                    self.add(entry)
+        for path in sorted(glob.glob(os.path.join(fixtures_dir, "*.jsonl"))):
+            with open(path, encoding="utf-8") as fh:
+                for line in fh:
+                    if line.strip():
+                        self.add(json.loads(line))
+
+    def add(self, entry):
+        if entry.get("default"):
+            entry["_pattern"] = re.compile(entry["path_pattern"])
+            self.defaults.append(entry)
+        else:
+            key = fixture_key(entry["service"], entry.get("method", "GET"), entry["path"],
+                              entry.get("query", ""), json.dumps(entry.get("body")))
+            # Later recordings win, so re-recording refreshes a fixture
+            self.exact[key] = entry
+
+    def lookup(self, service, method, path, query, body):
+        entry = self.exact.get(fixture_key(service, method, path, query, body))
+        if entry is not None:
+            return entry, {}
+        for default in self.defaults:
+            if default["service"] != service or default.get("method", "GET") != method:
+                continue
+            match = default["_pattern"].match(path)
+            if match:
+                return default, match.groupdict()
+        return None, {}
+
+    def __len__(self):
+        return len(self.exact) + len(self.defaults)
+
+
+def create_app(fixtures_dir=UPSTREAM_FIXTURES_DIR):
+    app = Flask(__name__)
+    store = FixtureStore(fixtures_dir)
+    settings = {
+        "latency_ms": FAKE_UPSTREAM_LATENCY_MS,
+        "jitter_ms": FAKE_UPSTREAM_JITTER_MS,
+        "error_rate": FAKE_UPSTREAM_ERROR_RATE,
+        "rate_limit": FAKE_UPSTREAM_RATE_LIMIT,
+        "rate_window": FAKE_UPSTREAM_RATE_WINDOW,
+        "seed": FAKE_UPSTREAM_SEED,
+    }
+    state = {"rng": random.Random(FAKE_UPSTREAM_SEED), "windows": {}, "stats": {}}
+    lock = threading.Lock()
+
+    def count(service, status):
+        key = f"{service}:{status}"
+        state["stats"][key] = state["stats"].get(key, 0) + 1
+
+    @app.route("/_fake/config", methods=["GET", "POST"])
+    def fake_config():
+        if request.method == "POST":
+            with lock:
+                for name, value in (request.get_json(silent=True) or {}).items():
+                    if name in settings:
+                        settings[name] = type(settings[name])(value)
+                state["rng"] = random.Random(settings["seed"])
+                state["windows"] = {}
+        return jsonify({**settings, "fixtures": len(store)})
+
+    @app.route("/_fake/stats", methods=["GET", "DELETE"])
+    def fake_stats():
+        with lock:
+            if request.method == "DELETE":
+                state["stats"] = {}
+            return jsonify(dict(state["stats"]))
+
+    @app.route("/<service>/<path:path>", methods=["GET", "POST"])
+    def replay(service, path):
+        path = "/" + path
+        now = time.time()
+
+        with lock:
+            rng = state["rng"]
+            delay = settings["latency_ms"] + rng.uniform(0, settings["jitter_ms"])
+            fail = rng.random() < settings["error_rate"]
+
+            limit_headers = {}
+            if settings["rate_limit"] > 0:
+                start, used = state["windows"].get(service, (now, 0))
+                if now - start >= settings["rate_window"]:
+                    start, used = now, 0
+                used += 1
+                state["windows"][service] = (start, used)
+                reset = int(start + settings["rate_window"])
+                limit_headers = {
+                    "x-rate-limit-limit": str(settings["rate_limit"]),
+                    "x-rate-limit-remaining": str(max(settings["rate_limit"] - used, 0)),
+                    "x-rate-limit-reset": str(reset),
+                }
+                if used > settings["rate_limit"]:
+                    count(service, 429)
+                    limit_headers["Retry-After"] = str(max(reset - int(now), 1))
+                    return jsonify({"errors": [{"code": 88, "message": "Rate limit exceeded"}]}), 429, limit_headers
+
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+
+        if fail:
+            with lock:
+                count(service, 503)
+            return jsonify({"error": "Injected upstream failure"}), 503, limit_headers
+
+        body = request.get_data() or None
+        entry, params = store.lookup(service, request.method, path, normalize_query(request.query_string.decode()), body)
+        if entry is None:
+            with lock:
+                count(service, 404)
+            return jsonify({"error": "No fixture recorded for this request", "service": service, "path": path}), 404
+
+        username = params.get("username") or request.args.get("screen_name") or request.args.get("username")
+        if not username and body:
+            try:
+                username = json.loads(body).get("username")
+            except (ValueError, AttributeError):
+                username = None
+
+        if "json" in entry:
+            payload = json.dumps(entry["json"], ensure_ascii=False)
+            mimetype = "application/json"
+        else:
+            payload = entry.get("text", "")
+            mimetype = entry.get("headers", {}).get("Content-Type", "text/plain")
+        if entry.get("default") and username:
+            payload = payload.replace("{username}", username)
+
+        with lock:
+            count(service, entry.get("status", 200))
+        headers = {k: v for k, v in entry.get("headers", {}).items() if k.lower() != "content-type"}
+        headers.update(limit_headers)
+        return Response(payload, status=entry.get("status", 200), mimetype=mimetype, headers=headers)
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Instagram / RapidAPI / Twitter upstream")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--fixtures", default=UPSTREAM_FIXTURES_DIR)
+    args = parser.parse_args()
+
+    fake_app = create_app(args.fixtures)
+    print(f"🎭 Fake upstream serving fixtures from {args.fixtures} on http://{args.host}:{args.port}")
+    fake_app.run(host=args.host, port=args.port, threaded=True)
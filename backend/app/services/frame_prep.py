@@ -0,0 +1,280 @@
+# backend/app/services/frame_prep.py
+# Decode + preprocessing of webcam frames. Kept free of Flask and model
+# imports so the functions can run in spawned worker processes.
+import math
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from app.config import (
+    FRAME_POOL_KIND,
+    FRAME_WORKERS,
+    FRAME_PREP_STAGES,
+    FRAME_PREP_ADAPTIVE,
+    FRAME_PREP_MAX_SIDE,
+    FRAME_NOISE_THRESHOLD,
+    FRAME_BLUR_THRESHOLD,
+    FRAME_DARK_THRESHOLD,
+    FRAME_CONTRAST_THRESHOLD,
+    FRAME_DEDUP_DISTANCE,
+)
+from app.services.vision_utils import decode_b64_image, decode_image
+
+FACE_SIZE = (224, 224)
+
+
+def _ms(started):
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+# ========== QUALITY METRICS ==========
+# Immerkaer's fast noise estimator: responds to pixel noise, not to smooth gradients
+_NOISE_KERNEL = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+
+
+def frame_metrics(img):
+    """
+    Cheap quality estimates of a (downscaled) BGR frame, all on its grey copy:
+    brightness (mean), contrast (std), blur (variance of the Laplacian,
+    low = blurry) and noise (estimated sigma in grey levels).
+    """
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    h, w = gray.shape
+    noise = 0.0
+    if h > 2 and w > 2:
+        response = cv2.filter2D(gray.astype(np.float32), -1, _NOISE_KERNEL)[1:-1, 1:-1]
+        noise = float(np.abs(response).sum()) * math.sqrt(math.pi / 2) / (6 * (w - 2) * (h - 2))
+    return {
+        "brightness": round(float(gray.mean()), 2),
+        "contrast": round(float(gray.std()), 2),
+        "blur": round(float(cv2.Laplacian(gray, cv2.CV_64F).var()), 2),
+        "noise": round(noise, 2),
+    }
+
+
+# ========== PREPROCESSING STAGES ==========
+def _downscale(img):
+    h, w = img.shape[:2]
+    factor = FRAME_PREP_MAX_SIDE / float(max(h, w))
+    size = (max(1, int(round(w * factor))), max(1, int(round(h * factor))))
+    return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+
+def _equalize(img):
+    # Histogram equalization of the luma channel for better contrast
+    img_yuv = cv2.cvtColor(img, cv2.COLOR_BGR2YUV)
+    img_yuv[:,:,0] = cv2.equalizeHist(img_yuv[:,:,0])
+    return cv2.cvtColor(img_yuv, cv2.COLOR_YUV2BGR)
+
+
+def _denoise(img):
+    return cv2.fastNlMeansDenoisingColored(img, None, 10, 10, 7, 21)
+
+
+_SHARPEN_KERNEL = np.array([[-1,-1,-1],
+                            [-1, 9,-1],
+                            [-1,-1,-1]])
+
+
+def _sharpen(img):
+    return cv2.filter2D(img, -1, _SHARPEN_KERNEL)
+
+
+def _enhance(img):
+    # Brightness (x1.2) and contrast (x1.3 around the mean grey level),
+    # same as PIL's ImageEnhance
+    img_f = img.astype(np.float32) * 1.2
+    np.clip(img_f, 0, 255, out=img_f)
+    mean = float(cv2.cvtColor(img_f.astype(np.uint8), cv2.COLOR_BGR2GRAY).mean())
+    img_f = (img_f - mean) * 1.3 + mean
+    return np.clip(img_f, 0, 255).astype(np.uint8)
+
+
+def _resize(img):
+    # Optimal size for DeepFace
+    return cv2.resize(img, FACE_SIZE, interpolation=cv2.INTER_LANCZOS4)
+
+
+# name -> (needed(img, metrics), run(img)); metrics are measured once, after
+# downscaling, right before the first stage that needs them
+PREP_STAGES = {
+    "downscale": (lambda img, m: max(img.shape[:2]) > FRAME_PREP_MAX_SIDE, _downscale),
+    "equalize": (lambda img, m: m["contrast"] < FRAME_CONTRAST_THRESHOLD, _equalize),
+    "denoise": (lambda img, m: m["noise"] > FRAME_NOISE_THRESHOLD, _denoise),
+    "sharpen": (lambda img, m: m["blur"] < FRAME_BLUR_THRESHOLD, _sharpen),
+    "enhance": (lambda img, m: m["brightness"] < FRAME_DARK_THRESHOLD
+                or m["contrast"] < FRAME_CONTRAST_THRESHOLD, _enhance),
+    "resize": (None, _resize),
+}
+# Geometry stages: run whenever enabled (downscale when the frame is larger)
+_ALWAYS_CHECKED = ("downscale", "resize")
+
+
+def run_preprocessing(img, stages=None, adaptive=FRAME_PREP_ADAPTIVE):
+    """
+    Run the configured stage pipeline on a BGR frame.
+    Returns (img, report) with the quality metrics, the stages applied and
+    skipped, and the time spent per stage (ms).
+    """
+    report = {"metrics": None, "applied": [], "skipped": [], "timings_ms": {}}
+    for name in stages or FRAME_PREP_STAGES:
+        if name not in PREP_STAGES:
+            continue
+        needed, run = PREP_STAGES[name]
+        if name not in _ALWAYS_CHECKED and report["metrics"] is None:
+            t = time.perf_counter()
+            report["metrics"] = frame_metrics(img)
+            report["timings_ms"]["metrics"] = _ms(t)
+        check = needed is not None and (adaptive or name in _ALWAYS_CHECKED)
+        if check and not needed(img, report["metrics"]):
+            report["skipped"].append(name)
+            continue
+        t = time.perf_counter()
+        img = run(img)
+        report["timings_ms"][name] = _ms(t)
+        report["applied"].append(name)
+    return img, report
+
+
+def preprocess_face(img, with_report=False):
+    """
+    Enhanced preprocessing for better gender detection.
+    Works on the decoded BGR array in memory and returns a 224x224 BGR array
+    (plus the stage report when with_report is set).
+    """
+    try:
+        img, report = run_preprocessing(img)
+    except Exception as e:
+        print(f"Preprocessing error: {e}")
+        # Fallback to simple resize
+        img, report = _resize(img), {"error": str(e), "applied": ["resize"]}
+    return (img, report) if with_report else img
+
+
+def prepare_frame(frame):
+    """
+    Decode a frame (encoded image bytes, or a base64 string) and preprocess
+    it. Returns (img, timing); img is None when the data is not a readable
+    image.
+    """
+    timing = {}
+    t = time.perf_counter()
+    if isinstance(frame, (bytes, bytearray, memoryview)):
+        try:
+            img = decode_image(frame)
+        except ValueError:
+            img = None
+    else:
+        img = decode_b64_image(frame) if frame is not None else None
+    timing["decode_ms"] = _ms(t)
+    if img is None:
+        timing["error"] = "Invalid image data"
+        return None, timing
+
+    t = time.perf_counter()
+    img, timing["preprocessing"] = preprocess_face(img, with_report=True)
+    timing["preprocess_ms"] = _ms(t)
+    return img, timing
+
+
+# ========== NEAR-DUPLICATE FRAMES ==========
+def dhash(data, hash_size=8):
+    """
+    64-bit difference hash of encoded image bytes. JPEGs are decoded at 1/8
+    scale straight to grey, so this costs a fraction of a full decode.
+    None when the bytes are not an image.
+    """
+    buffer = np.frombuffer(data or b"", dtype=np.uint8)
+    gray = cv2.imdecode(buffer, cv2.IMREAD_REDUCED_GRAYSCALE_8) if buffer.size else None
+    if gray is None:
+        return None
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int("".join("1" if bit else "0" for bit in bits), 2)
+
+
+class FrameDeduper:
+    """
+    Incremental near-duplicate check: match() returns the index of the
+    first accepted frame within `max_distance` bits (Hamming) of the new
+    one, or None after accepting it. Unreadable frames are always accepted.
+    """
+
+    def __init__(self, max_distance=FRAME_DEDUP_DISTANCE):
+        self.max_distance = max_distance
+        self._accepted = []  # (index, hash)
+
+    def match(self, idx, data):
+        value = dhash(data) if data is not None else None
+        if value is None:
+            return None
+        for rep_idx, rep_value in self._accepted:
+            if bin(value ^ rep_value).count("1") <= self.max_distance:
+                return rep_idx
+        self._accepted.append((idx, value))
+        return None
+
+
+def dedup_frames(payloads, max_distance=FRAME_DEDUP_DISTANCE):
+    """Representative index of every frame (itself when it was accepted)"""
+    deduper = FrameDeduper(max_distance)
+    representative = []
+    for idx, data in enumerate(payloads):
+        rep = deduper.match(idx, data)
+        representative.append(idx if rep is None else rep)
+    return representative
+
+
+def _init_worker():
+    # One OpenCV thread per worker process; the pool provides the parallelism
+    cv2.setNumThreads(1)
+
+
+class FramePool:
+    """
+    Bounded pool for frame preparation, created on first use.
+
+      thread  - OpenCV's heavy stages (denoise, filter2D, resize) release
+                the GIL, so threads already use several cores
+      process - spawned workers (never forked from the threaded server);
+                only the 224x224 results are sent back. Workers re-import
+                the main module; app.main skips model warm-up and job
+                resume there (__name__ == "__mp_main__")
+
+    map() returns results in input order.
+    """
+
+    def __init__(self, kind=FRAME_POOL_KIND, workers=FRAME_WORKERS):
+        self.kind = kind if kind in ("thread", "process") else "thread"
+        self.workers = max(1, workers)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.workers,
+                            mp_context=multiprocessing.get_context("spawn"),
+                            initializer=_init_worker,
+                        )
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.workers, thread_name_prefix="frame-prep"
+                        )
+        return self._executor
+
+    def map(self, fn, *iterables):
+        return self._get_executor().map(fn, *iterables)
+
+    def submit(self, fn, *args):
+        return self._get_executor().submit(fn, *args)
+
+
+frame_prep_pool = FramePool()
@@ -0,0 +1,70 @@
+# backend/app/services/frame_stream.py
+# Incremental readers for binary frame uploads: each yields one encoded
+# image (bytes) as soon as it has fully arrived, holding at most one frame.
+import struct
+
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+
+from app.config import FRAME_STREAM_MAX_FRAME_BYTES, FRAME_STREAM_READ_SIZE
+
+# Body of concatenated [4-byte big-endian length][image bytes] records
+LENGTH_PREFIXED_MIMETYPES = ("application/octet-stream", "application/x-frame-stream")
+
+
+def _read_exact(stream, size, read_size=FRAME_STREAM_READ_SIZE):
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = stream.read(min(size - len(buf), read_size))
+        if not chunk:
+            break
+        buf += chunk
+    return bytes(buf)
+
+
+def iter_length_prefixed_frames(stream, max_frame_bytes=FRAME_STREAM_MAX_FRAME_BYTES):
+    """Frames of a length-prefixed body; raises ValueError on bad input"""
+    while True:
+        header = _read_exact(stream, 4)
+        if not header:
+            return
+        if len(header) < 4:
+            raise ValueError("Truncated frame header")
+        (size,) = struct.unpack(">I", header)
+        if size > max_frame_bytes:
+            raise ValueError(f"Frame larger than {max_frame_bytes} bytes")
+        data = _read_exact(stream, size)
+        if len(data) < size:
+            raise ValueError("Truncated frame")
+        yield data
+
+
+def iter_multipart_frames(stream, boundary, max_frame_bytes=FRAME_STREAM_MAX_FRAME_BYTES,
+                          read_size=FRAME_STREAM_READ_SIZE):
+    """
+    File parts of a multipart/form-data body, parsed while it is read
+    (nothing is spooled to disk). Non-file fields are ignored.
+    """
+    decoder = MultipartDecoder(boundary.encode("latin-1"))
+    current = None
+    while True:
+        chunk = stream.read(read_size)
+        decoder.receive_data(chunk or None)
+        while True:
+            event = decoder.next_event()
+            if isinstance(event, NeedData):
+                break
+            if isinstance(event, Epilogue):
+                return
+            if isinstance(event, File):
+                current = bytearray()
+            elif isinstance(event, Field):
+                current = None
+            elif isinstance(event, Data) and current is not None:
+                current += event.data
+                if len(current) > max_frame_bytes:
+                    raise ValueError(f"Frame larger than {max_frame_bytes} bytes")
+                if not event.more_data:
+                    yield bytes(current)
+                    current = None
+        if not chunk:
+            raise ValueError("Multipart body ended before the closing boundary")
@@ -0,0 +1,196 @@
+# backend/app/services/inference_cache.py
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from app.config import (
+    INFERENCE_CACHE_MAX_ENTRIES,
+    INFERENCE_CACHE_TTL,
+    INFERENCE_CACHE_PERSIST,
+)
+from app.extensions import mongo
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    """Canonical form used for hashing: NFKC, collapsed whitespace, trimmed"""
+    text = unicodedata.normalize("NFKC", text or "")
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class InferenceCache:
+    """
+    Content-addressed cache for model outputs.
+
+    Keys are a SHA-256 of model name + version + normalized input, so the
+    same text or image always maps to the same entry and a model upgrade
+    never serves stale predictions.
+
+    Tier 1 is an in-process LRU with a size limit and TTL.
+    Tier 2 (optional) is mongo.db.inference_cache, shared by all workers.
+    """
+
+    def __init__(self, max_entries=INFERENCE_CACHE_MAX_ENTRIES, ttl_seconds=INFERENCE_CACHE_TTL,
+                 persistent=INFERENCE_CACHE_PERSIST, collection_name="inference_cache"):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl_seconds
+        self.persistent = persistent
+        self.collection_name = collection_name
+
+        self._entries = OrderedDict()  # key -> (value, expires_at, model, version)
+        self._lock = threading.Lock()
+        self._counters = {
+            "memory_hits": 0,
+            "persistent_hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "evictions": 0,
+            "expired": 0,
+        }
+
+    # ---------- keys ----------
+    @staticmethod
+    def text_key(text, model, version):
+        payload = f"{model}\x00{version}\x00{normalize_text(text)}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    @staticmethod
+    def bytes_key(data, model, version):
+        digest = hashlib.sha256()
+        digest.update(f"{model}\x00{version}\x00".encode("utf-8"))
+        digest.update(data)
+        return digest.hexdigest()
+
+    # ---------- lookups ----------
+    def get(self, key):
+        """Return the cached value or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at, _, _ = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return value
+                del self._entries[key]
+                self._counters["expired"] += 1
+
+        if self.persistent:
+            doc = self._persistent_get(key)
+            if doc is not None:
+                stored = doc.get("expires_at")
+                # Mongo hands back naive UTC datetimes
+                expires_at = stored.replace(tzinfo=timezone.utc).timestamp() if stored else now + self.ttl
+                self._remember(key, doc["value"], expires_at, doc.get("model"), doc.get("version"))
+                with self._lock:
+                    self._counters["persistent_hits"] += 1
+                return doc["value"]
+
+        with self._lock:
+            self._counters["misses"] += 1
+        return None
+
+    def set(self, key, value, model=None, version=None):
+        expires_at = time.time() + self.ttl
+        self._remember(key, value, expires_at, model, version)
+        with self._lock:
+            self._counters["sets"] += 1
+
+        if self.persistent:
+            try:
+                mongo.db[self.collection_name].replace_one(
+                    {"_id": key},
+                    {
+                        "_id": key,
+                        "model": model,
+                        "version": version,
+                        "value": value,
+                        "expires_at": datetime.utcfromtimestamp(expires_at),
+                    },
+                    upsert=True,
+                )
+            except Exception as e:
+                print("⚠️ Inference cache write failed:", e)
+
+    def invalidate(self, model=None, version=None):
+        """
+        Drop cached results. With no arguments everything is cleared;
+        otherwise only entries for `model` (and `version`, if given).
+        A version also matches its "+"-suffixed variants, so "1" drops
+        "1+pytorch" and "1+onnx" as well.
+        Returns how many entries were removed from each tier.
+        """
+        def matches(entry_model, entry_version):
+            if model is not None and entry_model != model:
+                return False
+            if version is not None and entry_version != version \
+                    and not str(entry_version or "").startswith(f"{version}+"):
+                return False
+            return True
+
+        with self._lock:
+            stale = [k for k, (_, _, m, v) in self._entries.items() if matches(m, v)]
+            for key in stale:
+                del self._entries[key]
+
+        removed_persistent = 0
+        if self.persistent:
+            query = {}
+            if model is not None:
+                query["model"] = model
+            if version is not None:
+                query["version"] = {"$regex": f"^{re.escape(str(version))}(\\+|$)"}
+            try:
+                removed_persistent = mongo.db[self.collection_name].delete_many(query).deleted_count
+            except Exception as e:
+                print("⚠️ Inference cache invalidation failed:", e)
+
+        return {"memory": len(stale), "persistent": removed_persistent}
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._entries)
+        hits = counters["memory_hits"] + counters["persistent_hits"]
+        lookups = hits + counters["misses"]
+        return {
+            **counters,
+            "hits": hits,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0,
+            "entries": size,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "persistent": self.persistent,
+        }
+
+    # ---------- internals ----------
+    def _remember(self, key, value, expires_at, model, version):
+        with self._lock:
+            self._entries[key] = (value, expires_at, model, version)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def _persistent_get(self, key):
+        try:
+            doc = mongo.db[self.collection_name].find_one({"_id": key})
+        except Exception as e:
+            print("⚠️ Inference cache read failed:", e)
+            return None
+        if doc is None:
+            return None
+        expires_at = doc.get("expires_at")
+        if expires_at is not None and expires_at < datetime.utcnow():
+            return None
+        return doc
+
+
+# Shared by text and image analysis
+inference_cache = InferenceCache()
@@ -0,0 +1,271 @@
+# backend/app/services/media_sync.py
+import queue
+import threading
+from datetime import datetime
+
+from app.config import (
+    INSTAGRAM_MEDIA_PAGE_SIZE,
+    INSTAGRAM_MEDIA_MAX_PAGES,
+    INSTAGRAM_MEDIA_PREFETCH,
+)
+from app.extensions import mongo
+from app.services.api_utils import upstream_http
+
+GRAPH_MEDIA_URL = "https://graph.instagram.com/me/media"
+MEDIA_FIELDS = "id,caption,media_type,media_url,timestamp,permalink"
+
+SAMPLE_CAPTIONS = 10
+
+_DONE = object()
+
+
+def parse_timestamp(value):
+    """Graph API timestamps look like 2026-01-04T10:00:00+0000"""
+    try:
+        return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S%z")
+    except (TypeError, ValueError):
+        return None
+
+
+class MediaSync:
+    """
+    Streams a connected account's /me/media pages into the scorer.
+
+    A producer thread follows the paging cursors and keeps at most
+    `prefetch` pages queued ahead of the consumer, so memory stays flat
+    however many posts the account has. Cursor pagination is inherently
+    sequential; the concurrency is fetching the next page while the
+    current one is being scored.
+
+    Progress lives in mongo.db.instagram_sync_state:
+      newest_timestamp  newest media seen; later syncs stop there
+      resume_cursor     "after" cursor where a sync ran out of pages
+                        before reaching newest_timestamp; the next sync
+                        continues the gap from there
+      pending_newest    newest media of that unfinished gap, which becomes
+                        newest_timestamp once the gap is closed
+      backfill_cursor   "after" cursor of the oldest page not yet fetched
+                        (set when a first sync hits `max_pages`)
+      sample_captions   newest captions seen so far, so a sync with no
+                        new media still has samples to show
+    Cursors are stored instead of paging.next URLs, which embed the token.
+    The state is only saved after the consumer has taken every page, so
+    media still queued when scoring fails are fetched again next time.
+    """
+
+    def __init__(self, client=upstream_http, collection="instagram_sync_state",
+                 page_size=INSTAGRAM_MEDIA_PAGE_SIZE, max_pages=INSTAGRAM_MEDIA_MAX_PAGES,
+                 prefetch=INSTAGRAM_MEDIA_PREFETCH):
+        self.client = client
+        self.collection = collection
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.prefetch = max(1, prefetch)
+
+    def sync(self, access_token, account):
+        """
+        Returns (chunks, report). `chunks` yields one [(media_id, caption)]
+        list per page; `report` is filled in as the pages are consumed and
+        the sync state is saved once the stream is exhausted.
+        """
+        state_id = f"instagram_graph:{str(account).lower()}"
+        state = self._load_state(state_id)
+        report = {
+            "pages": 0,
+            "media_fetched": 0,
+            "sample_captions": [],
+            "complete": False,
+            "since": state.get("newest_timestamp"),
+            "error": None,
+        }
+        return self._consume(access_token, state_id, state, report), report
+
+    # ---------- consumer ----------
+    def _consume(self, access_token, state_id, state, report):
+        pages = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+        producer = threading.Thread(
+            target=self._produce,
+            args=(access_token, state, report, pages, stop),
+            name="instagram-media-sync",
+            daemon=True,
+        )
+        producer.start()
+        try:
+            while True:
+                item = pages.get()
+                if isinstance(item, tuple) and item[0] is _DONE:
+                    # Every chunk has been yielded and scored by now
+                    self._save_state(state_id, item[1])
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                chunk = []
+                for media in item:
+                    caption = media.get("caption", "")
+                    if caption and caption.strip():
+                        chunk.append((media.get("id"), caption))
+                report["media_fetched"] += len(item)
+                yield chunk
+        finally:
+            stop.set()
+
+    # ---------- producer ----------
+    def _produce(self, access_token, state, report, pages, stop):
+        def put(item):
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        try:
+            new_state = self._walk(access_token, state, report, put)
+        except Exception as e:
+            put(e)
+            return
+        if new_state is not None:
+            # Saved by the consumer once it has taken every page before this
+            put((_DONE, new_state))
+
+    def _walk(self, access_token, state, report, put):
+        """
+        Newest media first (or the rest of an unfinished gap from
+        resume_cursor), down to the last sync's newest_timestamp, then
+        older media from the saved backfill cursor. Returns the new state,
+        or None if the consumer went away.
+        """
+        boundary = parse_timestamp(state.get("newest_timestamp"))
+        resume_cursor = state.get("resume_cursor") if boundary is not None else None
+        newest = boundary
+        if resume_cursor:
+            pending = parse_timestamp(state.get("pending_newest"))
+            if pending is not None and (newest is None or pending > newest):
+                newest = pending
+        backfill_cursor = state.get("backfill_cursor")
+        # Newest first: new media, then the last sync's samples, then backfill
+        # (a resumed gap is older than the last sync's samples)
+        fresh_captions, older_captions = [], []
+
+        # Phase 1: media newer than the last sync (everything on a first sync)
+        after, reached_boundary = resume_cursor, False
+        while report["pages"] < self.max_pages:
+            page = self._fetch_page(access_token, after, report)
+            if page is None:
+                break
+            items = page.get("data", [])
+            fresh = []
+            for media in items:
+                ts = parse_timestamp(media.get("timestamp"))
+                if boundary is not None and ts is not None and ts <= boundary:
+                    reached_boundary = True
+                    continue
+                if ts is not None and (newest is None or ts > newest):
+                    newest = ts
+                fresh.append(media)
+            self._add_captions(older_captions if resume_cursor else fresh_captions, fresh)
+            if fresh and not put(fresh):
+                return None
+            after = self._next_cursor(page)
+            if reached_boundary or after is None:
+                reached_boundary = True
+                after = None
+                break
+
+        if boundary is None:
+            # First sync: whatever is left is backfill
+            backfill_cursor = after
+        elif not reached_boundary:
+            # Ran out of pages before reaching known media: keep the old
+            # boundary and continue the gap from here next time
+            report["sample_captions"] = self._samples(fresh_captions, state, older_captions)
+            return {
+                "newest_timestamp": state.get("newest_timestamp"),
+                "resume_cursor": after,
+                "pending_newest": self._format(newest),
+                "backfill_cursor": backfill_cursor,
+                "sample_captions": report["sample_captions"],
+            }
+
+        # Phase 2: continue an unfinished backfill
+        while boundary is not None and backfill_cursor and report["pages"] < self.max_pages:
+            page = self._fetch_page(access_token, backfill_cursor, report)
+            if page is None:
+                break
+            self._add_captions(older_captions, page.get("data", []))
+            if page.get("data") and not put(page["data"]):
+                return None
+            backfill_cursor = self._next_cursor(page)
+
+        report["complete"] = report["error"] is None and not backfill_cursor
+        report["sample_captions"] = self._samples(fresh_captions, state, older_captions)
+        return {
+            "newest_timestamp": self._format(newest),
+            "resume_cursor": None,
+            "pending_newest": None,
+            "backfill_cursor": backfill_cursor,
+            "sample_captions": report["sample_captions"],
+        }
+
+    @staticmethod
+    def _format(timestamp):
+        return timestamp.strftime("%Y-%m-%dT%H:%M:%S%z") if timestamp else None
+
+    @staticmethod
+    def _add_captions(captions, items):
+        for media in items:
+            caption = (media.get("caption") or "").strip()
+            if caption and len(captions) < SAMPLE_CAPTIONS:
+                captions.append(caption)
+
+    @staticmethod
+    def _samples(fresh_captions, state, older_captions):
+        return (fresh_captions + list(state.get("sample_captions") or []) + older_captions)[:SAMPLE_CAPTIONS]
+
+    def _fetch_page(self, access_token, after, report):
+        params = {"fields": MEDIA_FIELDS, "limit": self.page_size, "access_token": access_token}
+        if after:
+            params["after"] = after
+        try:
+            response = self.client.get(GRAPH_MEDIA_URL, params=params)
+            if response.status_code != 200:
+                raise RuntimeError(f"/me/media returned {response.status_code}: {response.text[:200]}")
+            page = response.json()
+        except Exception as e:
+            if report["pages"] == 0:
+                raise
+            # Keep what was ingested; the next sync picks up from the saved state
+            report["error"] = str(e)
+            return None
+        report["pages"] += 1
+        return page
+
+    @staticmethod
+    def _next_cursor(page):
+        paging = page.get("paging") or {}
+        if not paging.get("next"):
+            return None
+        return (paging.get("cursors") or {}).get("after")
+
+    # ---------- state ----------
+    def _load_state(self, state_id):
+        try:
+            return mongo.db[self.collection].find_one({"_id": state_id}) or {}
+        except Exception as e:
+            print(f"⚠️ Media sync state unavailable ({e}); doing a full sync")
+            return {}
+
+    def _save_state(self, state_id, new_state):
+        try:
+            mongo.db[self.collection].update_one(
+                {"_id": state_id},
+                {"$set": {**new_state, "updated_at": datetime.utcnow()}},
+                upsert=True,
+            )
+        except Exception as e:
+            print(f"⚠️ Could not save media sync state: {e}")
+
+
+media_sync = MediaSync()
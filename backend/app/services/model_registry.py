@@ -0,0 +1,114 @@
+# backend/app/services/model_registry.py
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# ========== STARTUP TIMING ==========
+_BOOT_STARTED = time.perf_counter()
+startup_timings = OrderedDict()  # step -> seconds
+_timings_lock = threading.Lock()
+
+
+@contextmanager
+def timed_startup(step):
+    """Record how long an import / init / model load step takes"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _timings_lock:
+            startup_timings[step] = round(time.perf_counter() - started, 3)
+
+
+def startup_report():
+    """Snapshot of every timed step plus time since this module was imported"""
+    with _timings_lock:
+        steps = dict(startup_timings)
+    return {
+        "uptime_seconds": round(time.perf_counter() - _BOOT_STARTED, 3),
+        "steps": steps,
+    }
+
+
+# ========== MODEL REGISTRY ==========
+class ModelRegistry:
+    """
+    Loads heavy models on first use (or in a background warm-up thread)
+    instead of at import time, so the app can serve auth/dashboard
+    traffic while transformers and DeepFace are still loading.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._locks = {}
+        self._status = {}
+        self._registry_lock = threading.Lock()
+
+    def register(self, name, loader):
+        """`loader` is a zero-argument callable that returns the ready model"""
+        with self._registry_lock:
+            self._loaders[name] = loader
+            self._locks.setdefault(name, threading.Lock())
+            self._status.setdefault(name, {"state": "not_loaded"})
+
+    def get(self, name):
+        """Return the model, loading it now if nobody has yet"""
+        if name in self._models:
+            return self._models[name]
+        if name not in self._loaders:
+            raise KeyError(f"Unknown model: {name}")
+
+        with self._locks[name]:
+            # Another thread may have finished loading while we waited
+            if name in self._models:
+                return self._models[name]
+
+            self._status[name] = {"state": "loading"}
+            started = time.perf_counter()
+            try:
+                with timed_startup(f"model:{name}"):
+                    model = self._loaders[name]()
+            except Exception as e:
+                self._status[name] = {
+                    "state": "failed",
+                    "error": str(e),
+                    "load_seconds": round(time.perf_counter() - started, 3),
+                }
+                print(f"❌ Failed to load model '{name}': {e}")
+                raise
+
+            self._models[name] = model
+            self._status[name] = {
+                "state": "loaded",
+                "load_seconds": round(time.perf_counter() - started, 3),
+            }
+            print(f"✅ Model '{name}' loaded in {self._status[name]['load_seconds']}s")
+            return model
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def warm_up(self, names=None):
+        """Load the given models (default: all) in a background daemon thread"""
+        names = [n for n in (names or list(self._loaders)) if n in self._loaders]
+
+        def run():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception:
+                    # Already recorded in status; first real use will retry
+                    pass
+
+        thread = threading.Thread(target=run, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self):
+        with self._registry_lock:
+            return {name: dict(info) for name, info in self._status.items()}
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,350 @@
+# backend/app/services/nlp_utils.py
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future
+
+from app.config import (
+    SENTIMENT_BATCH_SIZE,
+    SENTIMENT_BATCH_WAIT_MS,
+    SENTIMENT_REQUEST_TIMEOUT,
+    SENTIMENT_MODEL_NAME,
+    SENTIMENT_MODEL_VERSION,
+    SENTIMENT_BACKEND,
+    SENTIMENT_CHUNK_TOKENS,
+)
+from app.services.inference_cache import inference_cache
+from app.services.model_registry import model_registry
+from app.services.sentiment_backends import load_configured_pipeline
+
+
+# ========== SENTIMENT → TRAITS ==========
+def sentiment_to_traits(label, score):
+    """Map a POSITIVE/NEGATIVE sentiment result onto Big Five trait scores"""
+    return {
+        "openness": round(0.5 + score * 0.2, 2) if label == "POSITIVE" else round(0.4 - score * 0.2, 2),
+        "conscientiousness": round(0.6 + score * 0.1, 2),
+        "extraversion": round(0.5 + score * 0.25, 2) if label == "POSITIVE" else round(0.4, 2),
+        "agreeableness": round(score, 2) if label == "POSITIVE" else round(1 - score, 2),
+        "neuroticism": round(1 - score, 2) if label == "POSITIVE" else round(score, 2),
+    }
+
+
+def iter_length_buckets(texts, bucket_size):
+    """
+    Yield lists of indices into `texts`, grouped so that each bucket holds
+    texts of similar length. Padding inside a batch is then minimal.
+    """
+    bucket_size = max(1, int(bucket_size))
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    for start in range(0, len(order), bucket_size):
+        yield order[start:start + bucket_size]
+
+
+# ========== DYNAMIC MICRO-BATCHING ==========
+class SentimentBatcher:
+    """
+    Collects sentiment requests that arrive close together and runs them
+    through the pipeline as one padded batch.
+
+    A single background worker owns the model, so request threads only
+    enqueue their text and wait on a Future for their own result.
+    `model_loader` is called on the worker thread, which lets the model
+    load lazily on the first request.
+    """
+
+    def __init__(self, model_loader, max_batch_size=SENTIMENT_BATCH_SIZE,
+                 max_wait_ms=SENTIMENT_BATCH_WAIT_MS):
+        self.model_loader = model_loader
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._errors = 0
+        self._batch_sizes = {}
+        self._total_batch_ms = 0.0
+        self._total_wait_ms = 0.0
+        self._last_batch_ms = 0.0
+
+    # ---------- public API ----------
+    def submit(self, text):
+        """Queue one text and return a Future resolving to the pipeline result dict."""
+        self._ensure_worker()
+        future = Future()
+        self._queue.put((text, future, time.perf_counter()))
+        return future
+
+    def predict(self, text, timeout=SENTIMENT_REQUEST_TIMEOUT):
+        """Blocking helper: returns {"label": ..., "score": ...} for one text."""
+        return self.submit(text).result(timeout=timeout)
+
+    def predict_many(self, texts, timeout=SENTIMENT_REQUEST_TIMEOUT):
+        """Queue several texts at once so they land in the same batch(es)."""
+        futures = [self.submit(text) for text in texts]
+        return [f.result(timeout=timeout) for f in futures]
+
+    def metrics(self):
+        """Queue depth and batch-size counters for monitoring."""
+        with self._stats_lock:
+            batches = self._batches
+            return {
+                "backend": sentiment_backend(),
+                "configured_backend": SENTIMENT_BACKEND,
+                "queue_depth": self._queue.qsize(),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": round(self.max_wait * 1000, 2),
+                "batches_run": batches,
+                "items_processed": self._items,
+                "errors": self._errors,
+                "avg_batch_size": round(self._items / batches, 2) if batches else 0,
+                "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+                "avg_batch_ms": round(self._total_batch_ms / batches, 2) if batches else 0,
+                "last_batch_ms": round(self._last_batch_ms, 2),
+                "avg_queue_wait_ms": round(self._total_wait_ms / self._items, 2) if self._items else 0,
+            }
+
+    # ---------- worker ----------
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run, name="sentiment-batcher", daemon=True
+                )
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+
+            # Keep collecting until the batch is full or the wait window closes
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                try:
+                    if remaining > 0:
+                        batch.append(self._queue.get(timeout=remaining))
+                    else:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        texts = [text for text, _, _ in batch]
+        started = time.perf_counter()
+        try:
+            model = self.model_loader()
+            outputs = model(texts, batch_size=len(texts), truncation=True)
+            error = None
+        except Exception as e:
+            print("⚠️ Sentiment batch failed:", e)
+            outputs, error = None, e
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        for idx, (_, future, enqueued_at) in enumerate(batch):
+            if error is not None:
+                future.set_exception(error)
+                continue
+            result = outputs[idx]
+            # Some pipeline versions wrap each result in a list
+            if isinstance(result, list):
+                result = result[0]
+            future.set_result(result)
+
+        with self._stats_lock:
+            size = len(batch)
+            self._batches += 1
+            self._items += size
+            self._errors += size if error is not None else 0
+            self._batch_sizes[size] = self._batch_sizes.get(size, 0) + 1
+            self._total_batch_ms += elapsed_ms
+            self._last_batch_ms = elapsed_ms
+            self._total_wait_ms += sum(
+                (started - enqueued_at) * 1000 for _, _, enqueued_at in batch
+            )
+
+
+# ========== SHARED SENTIMENT MODEL ==========
+# Builds SENTIMENT_BACKEND (pytorch / onnx / int8), importing transformers lazily
+model_registry.register("sentiment", load_configured_pipeline)
+
+# Concurrent requests are grouped into padded batches by a single worker
+sentiment_batcher = SentimentBatcher(lambda: model_registry.get("sentiment"))
+
+
+def sentiment_backend():
+    """
+    Backend the sentiment model actually runs on: pytorch when the configured
+    one failed its parity check. SENTIMENT_BACKEND until the model is loaded.
+    """
+    if not model_registry.is_loaded("sentiment"):
+        return SENTIMENT_BACKEND
+    return getattr(model_registry.get("sentiment"), "sentiment_backend", SENTIMENT_BACKEND)
+
+
+def sentiment_cache_version():
+    # The backend is part of the cache version: int8/ONNX scores differ slightly
+    return f"{SENTIMENT_MODEL_VERSION}+{sentiment_backend()}"
+
+
+def submit_sentiment(text):
+    """
+    Start scoring `text`. Returns (future, uncached_text): uncached_text is
+    None when the result was served from the inference cache and the model
+    never ran.
+    """
+    key = inference_cache.text_key(text, SENTIMENT_MODEL_NAME, sentiment_cache_version())
+    cached = inference_cache.get(key)
+    if cached is not None:
+        future = Future()
+        future.set_result(cached)
+        return future, None
+    return sentiment_batcher.submit(text), text
+
+
+def sentiment_result(future, uncached_text, timeout=SENTIMENT_REQUEST_TIMEOUT):
+    """Wait for a submit_sentiment() future and remember fresh results"""
+    result = future.result(timeout=timeout)
+    if uncached_text is not None:
+        # Keyed once the model has run, under the backend that produced it
+        version = sentiment_cache_version()
+        inference_cache.set(
+            inference_cache.text_key(uncached_text, SENTIMENT_MODEL_NAME, version),
+            {"label": result.get("label"), "score": float(result.get("score", 0.0))},
+            model=SENTIMENT_MODEL_NAME,
+            version=version,
+        )
+    return result
+
+
+# ========== LONG TEXT CHUNKING ==========
+# Sentence ends and line breaks (tweets in a timeline are joined with "\n")
+_SEGMENT_BOUNDARY = re.compile(r"(?<=[.!?…])\s+|\s*\n+\s*")
+_WORD = re.compile(r"\S+")
+
+
+def _token_counter():
+    """Token-length function using the model's own tokenizer when available"""
+    try:
+        tokenizer = model_registry.get("sentiment").tokenizer
+    except Exception:
+        tokenizer = None
+
+    if tokenizer is None:
+        # Rough WordPiece estimate when the tokenizer can't be loaded
+        return lambda pieces: [max(1, round(len(p.split()) * 1.3)) for p in pieces]
+
+    def count(pieces):
+        if not pieces:
+            return []
+        encoded = tokenizer(list(pieces), add_special_tokens=False)["input_ids"]
+        return [len(ids) for ids in encoded]
+    return count
+
+
+def _segment_spans(text):
+    """(start, end) spans of sentences / lines, separators excluded"""
+    start = 0
+    for match in _SEGMENT_BOUNDARY.finditer(text):
+        if match.start() > start:
+            yield start, match.start()
+        start = match.end()
+    if start < len(text):
+        yield start, len(text)
+
+
+def split_into_windows(text, max_tokens=SENTIMENT_CHUNK_TOKENS, count_tokens=None):
+    """
+    Split `text` into (start, end, n_tokens) windows of at most `max_tokens`.
+    Windows are packed from whole sentences / lines; a single sentence that
+    is longer than the budget is split between words. Every non-whitespace
+    character of `text` ends up in exactly one window.
+    """
+    count_tokens = count_tokens or _token_counter()
+    spans = list(_segment_spans(text))
+    lengths = count_tokens([text[s:e] for s, e in spans])
+
+    windows = []
+    current_start, current_end, current_tokens = None, None, 0
+
+    def flush():
+        nonlocal current_start, current_end, current_tokens
+        if current_start is not None:
+            windows.append((current_start, current_end, current_tokens))
+        current_start, current_end, current_tokens = None, None, 0
+
+    for (start, end), n_tokens in zip(spans, lengths):
+        if n_tokens > max_tokens:
+            # Oversized sentence: fall back to packing individual words
+            flush()
+            words = [(m.start() + start, m.end() + start) for m in _WORD.finditer(text[start:end])]
+            word_tokens = count_tokens([text[s:e] for s, e in words])
+            for (w_start, w_end), w_tokens in zip(words, word_tokens):
+                if current_start is not None and current_tokens + w_tokens > max_tokens:
+                    flush()
+                if current_start is None:
+                    current_start = w_start
+                current_end = w_end
+                current_tokens += w_tokens
+            flush()
+            continue
+
+        if current_start is not None and current_tokens + n_tokens > max_tokens:
+            flush()
+        if current_start is None:
+            current_start = start
+        current_end = end
+        current_tokens += n_tokens
+    flush()
+
+    return windows
+
+
+def combine_window_scores(results, weights):
+    """
+    Length-weighted average of P(positive) over all windows.
+    Returns (label, score) in the same shape a single pipeline call gives.
+    """
+    total = float(sum(weights)) or 1.0
+    p_positive = 0.0
+    for result, weight in zip(results, weights):
+        score = float(result.get("score", 0.0))
+        p = score if result.get("label") == "POSITIVE" else 1.0 - score
+        p_positive += p * weight / total
+    if p_positive >= 0.5:
+        return "POSITIVE", p_positive
+    return "NEGATIVE", 1.0 - p_positive
+
+
+def analyze_long_text(text, max_tokens=SENTIMENT_CHUNK_TOKENS):
+    """
+    Sentiment for text of any length.
+    All windows are queued together so they share batches; scores are
+    combined with token-length weighting. Returns (label, score, chunks).
+    """
+    windows = split_into_windows(text, max_tokens=max_tokens) or [(0, len(text), 1)]
+    submitted = [submit_sentiment(text[start:end]) for start, end, _ in windows]
+    results = [sentiment_result(*pending) for pending in submitted]
+
+    label, score = combine_window_scores(results, [n for _, _, n in windows])
+    chunks = [
+        {
+            "start": start,
+            "end": end,
+            "tokens": n_tokens,
+            "sentiment": result.get("label", "NEUTRAL"),
+            "confidence": round(float(result.get("score", 0.0)), 2),
+        }
+        for (start, end, n_tokens), result in zip(windows, results)
+    ]
+    return label, score, chunks
@@ -0,0 +1,185 @@
+# backend/app/services/post_store.py
+import hashlib
+from collections import Counter, OrderedDict
+from datetime import datetime
+
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+
+from app.extensions import mongo
+from app.utils.lexicon import lexicon_scorer
+
+
+def post_key(post_id, caption):
+    """Stable id for a post; captions without an upstream id are content-hashed"""
+    if post_id:
+        return str(post_id)
+    return "sha1:" + hashlib.sha1((caption or "").encode("utf-8")).hexdigest()[:20]
+
+
+class IncrementalProfileScorer:
+    """
+    Keeps per-post lexicon vectors and a running profile aggregate in Mongo
+    so re-analysing a profile only scores posts it has not seen before.
+
+      mongo.db.post_vectors        one doc per post: matched term ids plus
+                                   the post's own sentiment / trait scores
+      mongo.db.profile_aggregates  one doc per profile: post_count and
+                                   term_df (how many posts contain each term)
+
+    Profile scores only depend on which terms occur anywhere in the
+    profile, so term_df > 0 reproduces scoring the combined caption text.
+    Aggregates are rebuilt when the lexicon version changes.
+    """
+
+    def __init__(self, posts_collection="post_vectors", profiles_collection="profile_aggregates"):
+        self.posts_collection = posts_collection
+        self.profiles_collection = profiles_collection
+
+    def score(self, platform, account, posts, bio=""):
+        """
+        `posts` is a list of (post_id, caption).
+        Returns {"sentiment", "personality_traits", "incremental": {...}}.
+        Falls back to scoring the given posts from scratch if Mongo fails.
+        """
+        return self.score_stream(platform, account, [posts], bio)
+
+    def score_stream(self, platform, account, chunks, bio=""):
+        """
+        Like score(), but `chunks` is an iterable of (post_id, caption) lists
+        that is consumed one chunk at a time, so an account's full history
+        can be ingested without holding all of it in memory.
+        """
+        profile_id = f"{platform}:{str(account).lower()}"
+        version = lexicon_scorer.version
+        counts = {"new_posts": 0, "known_posts": 0}
+
+        try:
+            aggregate = self._load_aggregate(profile_id, platform, account, version)
+        except Exception as e:
+            print(f"⚠️ Incremental scoring unavailable ({e}); scoring posts from scratch")
+            aggregate = None
+
+        # Without Mongo, only the distinct term ids and a post count are kept
+        local_terms = set()
+        local_count = 0
+
+        for chunk in chunks:
+            if aggregate is not None:
+                try:
+                    new, known, aggregate = self._ingest(profile_id, version, chunk, aggregate)
+                    counts["new_posts"] += new
+                    counts["known_posts"] += known
+                    continue
+                except Exception as e:
+                    print(f"⚠️ Incremental scoring unavailable ({e}); scoring remaining posts from scratch")
+                    local_terms = {int(t) for t, c in (aggregate.get("term_df") or {}).items() if c > 0}
+                    local_count = aggregate.get("post_count", 0)
+                    aggregate = None
+
+            captions = [caption for _, caption in chunk if caption and caption.strip()]
+            if captions:
+                for terms, _, _ in lexicon_scorer.score_posts(captions, with_terms=True):
+                    local_terms.update(terms)
+                local_count += len(captions)
+                counts["new_posts"] += len(captions)
+
+        if aggregate is not None:
+            present = {int(term) for term, count in (aggregate.get("term_df") or {}).items() if count > 0}
+            post_count = aggregate.get("post_count", 0)
+        else:
+            present, post_count = local_terms, local_count
+        if bio and bio.strip():
+            present |= lexicon_scorer.matcher.matched_terms(bio.lower())
+
+        sentiment, traits = lexicon_scorer.score_term_ids(
+            present, post_count, empty=(post_count == 0 and not (bio or "").strip())
+        )
+        return {
+            "sentiment": sentiment,
+            "personality_traits": traits,
+            "incremental": {
+                "enabled": aggregate is not None,
+                "new_posts": counts["new_posts"],
+                "known_posts": counts["known_posts"],
+                "total_posts": post_count,
+            },
+        }
+
+    # ---------- internals ----------
+    def _load_aggregate(self, profile_id, platform, account, version):
+        db = mongo.db
+        aggregate = db[self.profiles_collection].find_one({"_id": profile_id})
+        if aggregate is None or aggregate.get("lexicon_version") != version:
+            if aggregate is not None:
+                # Stored term ids refer to the old lexicon
+                db[self.posts_collection].delete_many({"profile": profile_id})
+            aggregate = {
+                "_id": profile_id,
+                "platform": platform,
+                "account": str(account).lower(),
+                "lexicon_version": version,
+                "term_df": {},
+                "post_count": 0,
+                "updated_at": datetime.utcnow(),
+            }
+            db[self.profiles_collection].replace_one({"_id": profile_id}, aggregate, upsert=True)
+        return aggregate
+
+    def _ingest(self, profile_id, version, posts, aggregate):
+        """Store vectors for posts not seen before; returns (new, known, aggregate)"""
+        db = mongo.db
+        unique = OrderedDict()
+        for post_id, caption in posts:
+            if caption and caption.strip():
+                unique.setdefault(f"{profile_id}:{post_key(post_id, caption)}", caption.strip())
+
+        known = {
+            doc["_id"] for doc in db[self.posts_collection].find(
+                {"_id": {"$in": list(unique)}}, {"_id": 1}
+            )
+        } if unique else set()
+        new = [(key, caption) for key, caption in unique.items() if key not in known]
+
+        if new:
+            scored = lexicon_scorer.score_posts([caption for _, caption in new], with_terms=True)
+            now = datetime.utcnow()
+            docs = [
+                {
+                    "_id": key,
+                    "profile": profile_id,
+                    "lexicon_version": version,
+                    "terms": terms,
+                    "sentiment": sentiment,
+                    "personality_traits": traits,
+                    "created_at": now,
+                }
+                for (key, _), (terms, sentiment, traits) in zip(new, scored)
+            ]
+            inserted = self._insert_new(docs)
+
+            if inserted:
+                term_df = Counter(term for doc in inserted for term in doc["terms"])
+                increments = {f"term_df.{term}": count for term, count in term_df.items()}
+                increments["post_count"] = len(inserted)
+                updated = db[self.profiles_collection].find_one_and_update(
+                    {"_id": profile_id, "lexicon_version": version},
+                    {"$inc": increments, "$set": {"updated_at": now}},
+                    return_document=ReturnDocument.AFTER,
+                )
+                aggregate = updated or aggregate
+
+        return len(new), len(known), aggregate
+
+    def _insert_new(self, docs):
+        """Insert post vectors; returns the ones this call actually added"""
+        try:
+            mongo.db[self.posts_collection].insert_many(docs, ordered=False)
+            return docs
+        except BulkWriteError as e:
+            # Another worker stored some of these first — don't count them twice
+            failed = {err["index"] for err in e.details.get("writeErrors", [])}
+            return [doc for idx, doc in enumerate(docs) if idx not in failed]
+
+
+profile_scorer = IncrementalProfileScorer()
@@ -0,0 +1,197 @@
+# backend/app/services/rate_limit.py
+import threading
+import time
+from datetime import datetime, timezone
+
+from app.config import UPSTREAM_RATE_LIMITS
+from app.extensions import mongo
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens per second, at most `burst` saved up.
+    acquire() blocks the calling (background) thread until enough tokens
+    are available; try_acquire() never blocks.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._counters = {"acquired": 0, "waits": 0, "waited_seconds": 0.0}
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                self._counters["acquired"] += tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1, stop=None):
+        """Wait for `tokens`; returns False if `stop` (an Event) is set first"""
+        tokens = min(tokens, self.burst)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    self._counters["acquired"] += tokens
+                    if waited:
+                        self._counters["waits"] += 1
+                        self._counters["waited_seconds"] += waited
+                    return True
+                delay = (tokens - self._tokens) / self.rate
+            delay = min(delay, 1.0)
+            if stop is not None:
+                if stop.wait(delay):
+                    return False
+            else:
+                time.sleep(delay)
+            waited += delay
+
+    def stats(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                **self._counters,
+                "waited_seconds": round(self._counters["waited_seconds"], 3),
+                "available": round(self._tokens, 2),
+                "rate_per_second": self.rate,
+                "burst": self.burst,
+            }
+
+
+# One bucket per provider, sized to its quota and shared by every caller
+provider_buckets = {
+    provider: TokenBucket(rate, burst) for provider, (rate, burst) in UPSTREAM_RATE_LIMITS.items()
+}
+
+
+class RateLimitWindow:
+    """
+    Last known state of an upstream quota window, learnt from its
+    x-rate-limit-remaining / x-rate-limit-reset headers and 429 answers.
+
+    Shared by every thread of the process; when the window runs out the
+    reset time is also written to mongo.db.rate_limit_windows so other
+    workers stop calling upstream too.
+    """
+
+    # Seconds between checks of the shared (Mongo) view
+    SHARED_CHECK_INTERVAL = 5.0
+
+    def __init__(self, name, persistent=True, collection_name="rate_limit_windows"):
+        self.name = name
+        self.persistent = persistent
+        self.collection_name = collection_name
+        self._remaining = None
+        self._limit = None
+        self._reset_at = 0.0
+        self._checked_shared = 0.0
+        self._lock = threading.Lock()
+        self._counters = {"exhausted_events": 0, "rejected_calls": 0}
+
+    def update_from_headers(self, headers):
+        remaining = headers.get("x-rate-limit-remaining")
+        reset = headers.get("x-rate-limit-reset")
+        limit = headers.get("x-rate-limit-limit")
+        try:
+            remaining = int(remaining) if remaining is not None else None
+            reset = float(reset) if reset is not None else None
+            limit = int(limit) if limit is not None else None
+        except ValueError:
+            return
+        with self._lock:
+            if limit is not None:
+                self._limit = limit
+            if remaining is not None:
+                self._remaining = remaining
+            if reset is not None:
+                self._reset_at = reset
+        if remaining == 0 and reset:
+            self.mark_exhausted(reset)
+
+    def mark_exhausted(self, reset_at=None, retry_after=None):
+        """Upstream said no more calls until `reset_at` (epoch seconds)"""
+        if reset_at is None:
+            reset_at = time.time() + (retry_after or 60)
+        with self._lock:
+            self._remaining = 0
+            self._reset_at = max(self._reset_at, float(reset_at))
+            self._counters["exhausted_events"] += 1
+            reset_at = self._reset_at
+        if self.persistent:
+            try:
+                mongo.db[self.collection_name].update_one(
+                    {"_id": self.name},
+                    {"$max": {"reset_at": datetime.utcfromtimestamp(reset_at)}},
+                    upsert=True,
+                )
+            except Exception as e:
+                print(f"⚠️ Could not share {self.name} rate-limit window: {e}")
+
+    def exhausted(self):
+        now = time.time()
+        with self._lock:
+            if self._remaining == 0 and now < self._reset_at:
+                return True
+            check_shared = self.persistent and now - self._checked_shared >= self.SHARED_CHECK_INTERVAL
+            if check_shared:
+                self._checked_shared = now
+        if check_shared:
+            try:
+                doc = mongo.db[self.collection_name].find_one({"_id": self.name})
+            except Exception:
+                doc = None
+            if doc and doc.get("reset_at"):
+                reset_at = doc["reset_at"].replace(tzinfo=timezone.utc).timestamp()
+                if reset_at > now:
+                    with self._lock:
+                        self._remaining = 0
+                        self._reset_at = max(self._reset_at, reset_at)
+                    return True
+        return False
+
+    def seconds_until_reset(self):
+        with self._lock:
+            return max(0.0, self._reset_at - time.time())
+
+    def reject(self):
+        """Count a call that was not made because the window is exhausted"""
+        with self._lock:
+            self._counters["rejected_calls"] += 1
+
+    def wait(self, stop=None):
+        """Block the calling background thread until the window resets"""
+        while self.exhausted():
+            delay = min(max(self.seconds_until_reset(), 0.5), 5.0)
+            if stop is not None:
+                if stop.wait(delay):
+                    return False
+            else:
+                time.sleep(delay)
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._counters,
+                "limit": self._limit,
+                "remaining": self._remaining,
+                "reset_at": self._reset_at or None,
+                "reset_in_seconds": round(max(0.0, self._reset_at - time.time()), 1),
+            }
+
+
+# Quota windows reported by upstream, shared by request threads and background jobs
+rate_windows = {"twitter": RateLimitWindow("twitter")}
@@ -0,0 +1,171 @@
+# backend/app/services/sentiment_backends.py
+"""
+CPU inference backends for the text sentiment model.
+
+  pytorch - stock transformers pipeline (reference)
+  onnx    - model exported to ONNX Runtime via optimum (pip install optimum[onnxruntime])
+  int8    - PyTorch dynamic int8 quantization of the Linear layers
+
+All backends return a regular transformers pipeline, so callers (the
+sentiment batcher, /analyze/text) do not change.
+
+Parity check against the reference backend:
+    python -m app.services.sentiment_backends onnx
+"""
+import os
+import sys
+import time
+
+from app.config import (
+    SENTIMENT_BACKEND,
+    SENTIMENT_MODEL_NAME,
+    SENTIMENT_ONNX_DIR,
+    SENTIMENT_PARITY_CHECK,
+    SENTIMENT_PARITY_TOLERANCE,
+)
+
+SENTIMENT_BACKENDS = ("pytorch", "onnx", "int8")
+
+# Short, mixed-polarity texts used to compare a backend with the reference
+PARITY_FIXTURES = [
+    "I absolutely love this, best day ever!",
+    "This is the worst experience I have had in years.",
+    "The package arrived on Tuesday.",
+    "Not bad at all, honestly better than I expected.",
+    "I'm so tired of waiting for this to get fixed.",
+    "Grateful for my friends and family ❤️",
+    "The movie was long and the ending made no sense.",
+    "Training hard for the next match! Victory is earned through dedication 💪",
+    "I guess it works, but I wouldn't buy it again.",
+    "What a beautiful sunset tonight 🌅",
+    "Customer support never answered my emails.",
+    "New project launching soon, can't wait to share it!",
+]
+
+
+# ========== BACKEND BUILDERS ==========
+def _build_pytorch(model_name):
+    from transformers import pipeline
+    return pipeline("sentiment-analysis", model=model_name)
+
+
+def _build_int8(model_name):
+    import torch
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer, pipeline
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    model.eval()
+    quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return pipeline("sentiment-analysis", model=quantized, tokenizer=tokenizer)
+
+
+def _build_onnx(model_name):
+    try:
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+    except ImportError as e:
+        raise RuntimeError(
+            "SENTIMENT_BACKEND=onnx needs optimum + onnxruntime "
+            "(pip install optimum[onnxruntime])"
+        ) from e
+    from transformers import AutoTokenizer, pipeline
+
+    export_dir = os.path.join(SENTIMENT_ONNX_DIR, model_name.replace("/", "__"))
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if os.path.exists(os.path.join(export_dir, "model.onnx")):
+        model = ORTModelForSequenceClassification.from_pretrained(export_dir)
+    else:
+        print(f"📦 Exporting {model_name} to ONNX in {export_dir} ...")
+        model = ORTModelForSequenceClassification.from_pretrained(model_name, export=True)
+        model.save_pretrained(export_dir)
+        tokenizer.save_pretrained(export_dir)
+    return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+
+
+_BUILDERS = {
+    "pytorch": _build_pytorch,
+    "onnx": _build_onnx,
+    "int8": _build_int8,
+}
+
+
+def build_sentiment_pipeline(backend=SENTIMENT_BACKEND, model_name=SENTIMENT_MODEL_NAME):
+    """Build the sentiment pipeline for the requested backend"""
+    if backend not in _BUILDERS:
+        raise ValueError(
+            f"Unknown SENTIMENT_BACKEND '{backend}' (expected one of {', '.join(SENTIMENT_BACKENDS)})"
+        )
+    return _BUILDERS[backend](model_name)
+
+
+# ========== PARITY CHECK ==========
+def check_parity(candidate, reference, texts=PARITY_FIXTURES, score_tolerance=SENTIMENT_PARITY_TOLERANCE):
+    """
+    Run both pipelines on `texts` and compare labels and scores.
+    Passes only when every label matches and no score differs by more
+    than `score_tolerance`.
+    """
+    timings = {}
+    outputs = {}
+    for name, pipe in (("reference", reference), ("candidate", candidate)):
+        pipe(texts[:1], truncation=True)  # warm-up, not timed
+        started = time.perf_counter()
+        outputs[name] = [pipe(text, truncation=True)[0] for text in texts]
+        timings[name] = round((time.perf_counter() - started) * 1000 / len(texts), 2)
+
+    mismatches = []
+    max_diff = 0.0
+    for text, ref, cand in zip(texts, outputs["reference"], outputs["candidate"]):
+        diff = abs(float(ref["score"]) - float(cand["score"]))
+        max_diff = max(max_diff, diff)
+        if ref["label"] != cand["label"] or diff > score_tolerance:
+            mismatches.append({
+                "text": text,
+                "reference": {"label": ref["label"], "score": round(float(ref["score"]), 4)},
+                "candidate": {"label": cand["label"], "score": round(float(cand["score"]), 4)},
+            })
+
+    agreement = sum(
+        1 for ref, cand in zip(outputs["reference"], outputs["candidate"]) if ref["label"] == cand["label"]
+    ) / len(texts)
+
+    return {
+        "samples": len(texts),
+        "label_agreement": round(agreement, 4),
+        "max_score_diff": round(max_diff, 4),
+        "score_tolerance": score_tolerance,
+        "avg_latency_ms": timings,
+        "speedup": round(timings["reference"] / timings["candidate"], 2) if timings["candidate"] else None,
+        "passed": not mismatches,
+        "mismatches": mismatches,
+    }
+
+
+def load_configured_pipeline():
+    """
+    Registry loader: builds SENTIMENT_BACKEND and, when SENTIMENT_PARITY_CHECK
+    is on, verifies it against PyTorch and falls back to PyTorch on failure.
+    The returned pipeline's `sentiment_backend` names the backend it runs.
+    """
+    pipe = build_sentiment_pipeline(SENTIMENT_BACKEND)
+    pipe.sentiment_backend = SENTIMENT_BACKEND
+    if SENTIMENT_BACKEND == "pytorch" or not SENTIMENT_PARITY_CHECK:
+        return pipe
+
+    reference = build_sentiment_pipeline("pytorch")
+    reference.sentiment_backend = "pytorch"
+    report = check_parity(pipe, reference)
+    print(f"🔬 Sentiment parity ({SENTIMENT_BACKEND} vs pytorch):", report)
+    if not report["passed"]:
+        print(f"⚠️ {SENTIMENT_BACKEND} backend failed parity check — using pytorch")
+        return reference
+    return pipe
+
+
+if __name__ == "__main__":
+    backend = sys.argv[1] if len(sys.argv) > 1 else SENTIMENT_BACKEND
+    result = check_parity(build_sentiment_pipeline(backend), build_sentiment_pipeline("pytorch"))
+    print(f"Backend: {backend}")
+    for key, value in result.items():
+        print(f"  {key}: {value}")
+    sys.exit(0 if result["passed"] else 1)
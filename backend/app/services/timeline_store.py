@@ -0,0 +1,216 @@
+# backend/app/services/timeline_store.py
+import threading
+import time
+from datetime import datetime, timezone
+
+from pymongo import DESCENDING
+from pymongo.errors import BulkWriteError
+
+from app.config import (
+    TWITTER_TIMELINE_SIZE,
+    TWITTER_SYNC_MAX_PAGES,
+    TWITTER_USER_ID_TTL,
+)
+from app.extensions import mongo
+
+
+def tweet_doc(user_id, tweet):
+    """Stored form of a normalized tweet dict"""
+    created = tweet.get("created_at")
+    return {
+        "_id": int(tweet["id"]),
+        "account": str(user_id),
+        "text": tweet.get("text", ""),
+        "created_at": datetime.fromisoformat(created) if created else None,
+        "retweet_count": tweet.get("retweet_count", 0),
+        "like_count": tweet.get("like_count", 0),
+        "reply_count": tweet.get("reply_count", 0),
+        "fetched_at": datetime.utcnow(),
+    }
+
+
+def tweet_from_doc(doc):
+    created = doc.get("created_at")
+    return {
+        "id": str(doc["_id"]),
+        "text": doc.get("text", ""),
+        "created_at": created.replace(tzinfo=timezone.utc).isoformat() if created else None,
+        "retweet_count": doc.get("retweet_count", 0),
+        "like_count": doc.get("like_count", 0),
+        "reply_count": doc.get("reply_count", 0),
+    }
+
+
+class TimelineStore:
+    """
+    Per-account tweet store with since_id checkpoints.
+
+      mongo.db.twitter_accounts  username -> user_id, since_id (highest
+                                 stored tweet id), synced_at
+      mongo.db.twitter_tweets    one doc per tweet, _id = tweet id
+
+    A sync asks the source only for tweets newer than since_id and pages
+    back until it reaches them, so re-analysing an active account costs
+    one small delta fetch. since_id only moves once the delta (or at least
+    the newest `timeline_size` tweets of it) is stored; an interrupted
+    sync is simply repeated (duplicates are ignored).
+
+    If fewer than `count` tweets are stored (e.g. the first sync asked for
+    fewer), older history is backfilled with until_id until there are
+    enough or the account has no more.
+
+    `source` is any object with
+      lookup_user_id(username) -> str            (may raise UpstreamNotFound)
+      fetch_page(user_id, count, since_id=None, until_id=None, cursor=None)
+          -> (tweets, next_cursor)
+    where since_id / until_id are exclusive bounds and tweets are dicts
+    with id, text, created_at (ISO), retweet_count, like_count,
+    reply_count, newest first. A page shorter than the requested count
+    (capped at the source's MAX_COUNT) is the last one.
+    """
+
+    def __init__(self, accounts_collection="twitter_accounts", tweets_collection="twitter_tweets",
+                 timeline_size=TWITTER_TIMELINE_SIZE, max_pages=TWITTER_SYNC_MAX_PAGES,
+                 user_id_ttl=TWITTER_USER_ID_TTL):
+        self.accounts_collection = accounts_collection
+        self.tweets_collection = tweets_collection
+        self.timeline_size = timeline_size
+        self.max_pages = max_pages
+        self.user_id_ttl = user_id_ttl
+        self._user_ids = {}  # username -> (user_id, resolved_at)
+        self._lock = threading.Lock()
+
+    # ---------- username -> id ----------
+    def resolve_user_id(self, username, source):
+        key = str(username).strip().lstrip("@").lower()
+        now = time.time()
+        with self._lock:
+            cached = self._user_ids.get(key)
+        if cached and now - cached[1] < self.user_id_ttl:
+            return cached[0]
+
+        try:
+            doc = mongo.db[self.accounts_collection].find_one({"_id": key}, {"user_id": 1, "resolved_at": 1})
+        except Exception:
+            doc = None
+        if doc and doc.get("user_id") and doc.get("resolved_at"):
+            resolved_at = doc["resolved_at"].replace(tzinfo=timezone.utc).timestamp()
+            if now - resolved_at < self.user_id_ttl:
+                with self._lock:
+                    self._user_ids[key] = (doc["user_id"], resolved_at)
+                return doc["user_id"]
+
+        user_id = str(source.lookup_user_id(username))
+        with self._lock:
+            self._user_ids[key] = (user_id, now)
+        try:
+            mongo.db[self.accounts_collection].update_one(
+                {"_id": key},
+                {"$set": {"user_id": user_id, "resolved_at": datetime.utcfromtimestamp(now)}},
+                upsert=True,
+            )
+        except Exception as e:
+            print(f"⚠️ Could not cache Twitter user id for @{key}: {e}")
+        return user_id
+
+    # ---------- sync ----------
+    def sync(self, username, source, count=None):
+        """
+        Fetch tweets newer than the account's checkpoint, store them and
+        return {"user_id", "tweets" (newest `count`), "new_tweets", "pages", "since_id"}.
+        Without Mongo the newest page is fetched and returned directly.
+        """
+        count = count or self.timeline_size
+        key = str(username).strip().lstrip("@").lower()
+        user_id = self.resolve_user_id(username, source)
+
+        try:
+            account = mongo.db[self.accounts_collection].find_one({"_id": key}) or {}
+        except Exception as e:
+            print(f"⚠️ Timeline store unavailable ({e}); fetching latest tweets directly")
+            tweets, _ = source.fetch_page(user_id, count)
+            return {"user_id": user_id, "tweets": tweets[:count], "new_tweets": len(tweets),
+                    "pages": 1, "since_id": None, "stored": False}
+
+        if account.get("user_id") != user_id:
+            # New account, or the handle now belongs to someone else
+            account = {}
+        since_id = account.get("since_id")
+        newest = int(since_id) if since_id else None
+        cursor, pages, fetched, new_tweets = None, 0, 0, 0
+        complete = False
+        page_size = min(count, getattr(source, "MAX_COUNT", count))
+
+        # Delta: everything newer than the checkpoint (first sync: one page of `count`)
+        while pages < self.max_pages:
+            tweets, cursor = source.fetch_page(user_id, count, since_id=since_id, cursor=cursor)
+            pages += 1
+            if tweets:
+                fetched += len(tweets)
+                new_tweets += self._insert(user_id, tweets)
+                top = max(int(t["id"]) for t in tweets)
+                newest = top if newest is None else max(newest, top)
+            # since_id is exclusive, so a short page means the gap is closed
+            # (the first sync only wants one page of `count`)
+            if since_id is None or not cursor or len(tweets) < page_size:
+                complete = True
+                break
+
+        update = {"user_id": user_id, "synced_at": datetime.utcnow()}
+        # Only advance the checkpoint once the whole delta is stored, or once
+        # the newest `count` tweets are (an older gap never gets analyzed)
+        if newest is not None and (complete or fetched >= count):
+            update["since_id"] = str(newest)
+
+        # Backfill: older history when fewer than `count` tweets are stored
+        history_complete = account.get("history_complete", False)
+        stored = mongo.db[self.tweets_collection].count_documents({"account": user_id})
+        cursor = None
+        while stored < count and not history_complete and pages < self.max_pages:
+            oldest = mongo.db[self.tweets_collection].find_one({"account": user_id}, sort=[("_id", 1)])
+            if oldest is None:
+                history_complete = True
+                break
+            tweets, cursor = source.fetch_page(user_id, count - stored, until_id=str(oldest["_id"]))
+            pages += 1
+            added = self._insert(user_id, tweets) if tweets else 0
+            if not added:
+                # Nothing older left (or nothing we did not already have)
+                history_complete = True
+                break
+            new_tweets += added
+            stored += added
+        update["history_complete"] = history_complete
+
+        mongo.db[self.accounts_collection].update_one({"_id": key}, {"$set": update}, upsert=True)
+
+        return {
+            "user_id": user_id,
+            "tweets": self.recent(user_id, count),
+            "new_tweets": new_tweets,
+            "pages": pages,
+            "since_id": update.get("since_id", since_id),
+            "stored": True,
+        }
+
+    def recent(self, user_id, count=None):
+        """Newest stored tweets of an account, newest first"""
+        cursor = (
+            mongo.db[self.tweets_collection]
+            .find({"account": str(user_id)})
+            .sort("_id", DESCENDING)
+            .limit(count or self.timeline_size)
+        )
+        return [tweet_from_doc(doc) for doc in cursor]
+
+    def _insert(self, user_id, tweets):
+        docs = [tweet_doc(user_id, tweet) for tweet in tweets]
+        try:
+            mongo.db[self.tweets_collection].insert_many(docs, ordered=False)
+            return len(docs)
+        except BulkWriteError as e:
+            # Tweets stored by an earlier, interrupted sync
+            return len(docs) - len(e.details.get("writeErrors", []))
+
+
+timeline_store = TimelineStore()
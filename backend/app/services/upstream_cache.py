@@ -0,0 +1,357 @@
+# backend/app/services/upstream_cache.py
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import DuplicateKeyError
+
+from app.config import (
+    UPSTREAM_CACHE_TTL,
+    UPSTREAM_CACHE_STALE_TTL,
+    UPSTREAM_CACHE_NEGATIVE_TTL,
+    UPSTREAM_CACHE_MAX_ENTRIES,
+    UPSTREAM_CACHE_PERSIST,
+)
+from app.extensions import mongo
+from app.services.api_utils import UpstreamNotFound
+
+# How long one worker may hold the refresh lease for a key
+REFRESH_LEASE_SECONDS = 30
+# How often a worker re-reads the invalidation markers other workers wrote
+INVALIDATION_POLL_SECONDS = 5
+
+
+def _utc(value):
+    """Mongo hands back naive UTC datetimes"""
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+class UpstreamCache:
+    """
+    Cache of upstream profile lookups keyed by "<platform>:<username>".
+
+      fresh    (age < ttl)             served as is
+      stale    (age < ttl + stale_ttl) served as is while ONE background
+                                       refresh runs for the key
+      expired                          fetched inline; concurrent misses
+                                       for the same key share one fetch
+
+    A loader raising UpstreamNotFound is cached as a negative entry for
+    `negative_ttl`, so lookups of missing accounts don't reach upstream.
+    Any other loader error is not cached.
+
+    Tier 1 is an in-process LRU. Tier 2 (optional) is mongo.db.upstream_cache,
+    shared by all workers; it also holds a short refresh lease so only one
+    worker refreshes a stale key.
+
+    invalidate() also records a marker ("*", "<platform>" or the key) in
+    mongo.db.upstream_cache_invalidations. Every worker re-reads the markers
+    at most every INVALIDATION_POLL_SECONDS and drops entries fetched
+    before them, so an invalidation reaches the other workers' LRUs within
+    that delay. Without the persistent tier it only clears this process.
+    """
+
+    def __init__(self, max_entries=UPSTREAM_CACHE_MAX_ENTRIES, ttl_seconds=UPSTREAM_CACHE_TTL,
+                 stale_seconds=UPSTREAM_CACHE_STALE_TTL, negative_ttl=UPSTREAM_CACHE_NEGATIVE_TTL,
+                 persistent=UPSTREAM_CACHE_PERSIST, collection_name="upstream_cache"):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl_seconds
+        self.stale_ttl = stale_seconds
+        self.negative_ttl = negative_ttl
+        self.persistent = persistent
+        self.collection_name = collection_name
+
+        self._entries = OrderedDict()  # key -> {"value", "negative", "fetched_at"}
+        self._inflight = {}            # key -> Future of an inline fetch
+        self._refreshing = set()
+        self._invalidations = {}       # marker -> invalidated_at (epoch seconds)
+        self._invalidations_read = 0.0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="upstream-refresh")
+        self._counters = {
+            "hits": 0,
+            "stale_hits": 0,
+            "negative_hits": 0,
+            "persistent_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "refreshes": 0,
+            "refresh_failures": 0,
+            "evictions": 0,
+        }
+
+    @staticmethod
+    def key(platform, username):
+        return f"{platform}:{str(username).strip().lstrip('@').lower()}"
+
+    def fetch(self, platform, username, loader):
+        """
+        Return (value, status) with status one of "hit", "stale", "miss".
+        Raises UpstreamNotFound for known-missing accounts and propagates
+        loader errors on a miss.
+        """
+        cached = self.peek(platform, username, loader)
+        if cached is not None:
+            return cached
+
+        self._count("misses")
+        return self._load(self.key(platform, username), loader), "miss"
+
+    def peek(self, platform, username, loader=None):
+        """
+        Cached (value, "hit" | "stale") without fetching on a miss; None
+        when nothing usable is cached. A stale entry schedules a background
+        refresh with `loader` (if given).
+        """
+        key = self.key(platform, username)
+        entry = self._lookup(key)
+        if entry is not None:
+            age = time.time() - entry["fetched_at"]
+            if entry["negative"]:
+                if age < self.negative_ttl:
+                    self._count("negative_hits")
+                    raise UpstreamNotFound(f"{key} not found (cached)")
+            elif age < self.ttl:
+                self._count("hits")
+                return entry["value"], "hit"
+            elif age < self.ttl + self.stale_ttl:
+                self._count("stale_hits")
+                if loader is not None:
+                    self._refresh_async(key, loader)
+                return entry["value"], "stale"
+        return None
+
+    def invalidate(self, platform=None, username=None):
+        """Drop one key, one platform, or (no arguments) everything"""
+        if username is not None:
+            prefix = marker = self.key(platform, username)
+            matches = lambda k: k == prefix
+            query = {"_id": prefix}
+        elif platform is not None:
+            marker = platform
+            matches = lambda k: k.startswith(f"{platform}:")
+            query = {"_id": {"$regex": f"^{re.escape(platform)}:"}}
+        else:
+            marker = "*"
+            matches = lambda k: True
+            query = {}
+
+        now = time.time()
+        with self._lock:
+            stale = [k for k in self._entries if matches(k)]
+            for key in stale:
+                del self._entries[key]
+            self._invalidations[marker] = max(self._invalidations.get(marker, 0), now)
+
+        removed_persistent = 0
+        if self.persistent:
+            try:
+                # Written first: the other workers' LRUs are the part a delete can't reach
+                mongo.db[f"{self.collection_name}_invalidations"].update_one(
+                    {"_id": marker},
+                    {"$max": {"invalidated_at": datetime.utcfromtimestamp(now)}},
+                    upsert=True,
+                )
+                removed_persistent = mongo.db[self.collection_name].delete_many(query).deleted_count
+            except Exception as e:
+                print("⚠️ Upstream cache invalidation failed:", e)
+        return {"memory": len(stale), "persistent": removed_persistent}
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._entries)
+            refreshing = len(self._refreshing)
+        served = counters["hits"] + counters["stale_hits"] + counters["negative_hits"]
+        lookups = served + counters["misses"]
+        return {
+            **counters,
+            "hit_rate": round(served / lookups, 4) if lookups else 0,
+            "entries": size,
+            "refreshing": refreshing,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "stale_seconds": self.stale_ttl,
+            "negative_ttl_seconds": self.negative_ttl,
+            "persistent": self.persistent,
+        }
+
+    # ---------- internals ----------
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._counters[name] += amount
+
+    def _is_fresh(self, entry):
+        limit = self.negative_ttl if entry["negative"] else self.ttl
+        return time.time() - entry["fetched_at"] < limit
+
+    def _invalidated_at(self, key):
+        """Latest invalidation covering `key`, from any worker"""
+        now = time.time()
+        refresh = False
+        with self._lock:
+            if self.persistent and now - self._invalidations_read >= INVALIDATION_POLL_SECONDS:
+                self._invalidations_read = now
+                refresh = True
+        if refresh:
+            # Markers older than the longest entry lifetime can't match anything
+            horizon = max(self.ttl + self.stale_ttl, self.negative_ttl) + INVALIDATION_POLL_SECONDS
+            try:
+                docs = mongo.db[f"{self.collection_name}_invalidations"].find(
+                    {"invalidated_at": {"$gte": datetime.utcfromtimestamp(now - horizon)}}
+                )
+                markers = {doc["_id"]: _utc(doc["invalidated_at"]) for doc in docs}
+            except Exception as e:
+                print("⚠️ Upstream cache invalidation markers unavailable:", e)
+            else:
+                with self._lock:
+                    self._invalidations = {
+                        m: at for m, at in self._invalidations.items() if at >= now - horizon
+                    }
+                    for marker, at in markers.items():
+                        self._invalidations[marker] = max(self._invalidations.get(marker, 0), at)
+
+        platform = key.split(":", 1)[0]
+        with self._lock:
+            return max(self._invalidations.get(m, 0) for m in ("*", platform, key))
+
+    def _lookup(self, key):
+        invalidated_at = self._invalidated_at(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry["fetched_at"] <= invalidated_at:
+                    del self._entries[key]
+                    entry = None
+                else:
+                    self._entries.move_to_end(key)
+        if entry is not None and (not self.persistent or self._is_fresh(entry)):
+            return entry
+
+        # Not in memory, or stale here: another worker may have refreshed it
+        if not self.persistent:
+            return None
+        try:
+            doc = mongo.db[self.collection_name].find_one({"_id": key})
+        except Exception as e:
+            print("⚠️ Upstream cache read failed:", e)
+            return entry
+        if doc is None or doc.get("fetched_at") is None:
+            return entry
+        stored = {"value": doc.get("value"), "negative": doc.get("negative", False),
+                  "fetched_at": _utc(doc["fetched_at"])}
+        if stored["fetched_at"] <= invalidated_at:
+            return entry
+        if entry is not None and entry["fetched_at"] >= stored["fetched_at"]:
+            return entry
+        self._remember(key, stored)
+        self._count("persistent_hits")
+        return stored
+
+    def _load(self, key, loader):
+        """Run `loader` once per key; concurrent callers wait for the same result"""
+        with self._lock:
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+            else:
+                self._counters["coalesced"] += 1
+        if not owner:
+            return future.result()
+
+        try:
+            try:
+                value = loader()
+            except UpstreamNotFound:
+                self._store(key, None, negative=True)
+                raise
+            self._store(key, value, negative=False)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _refresh_async(self, key, loader):
+        with self._lock:
+            if key in self._refreshing or key in self._inflight:
+                return
+            self._refreshing.add(key)
+        if not self._acquire_lease(key):
+            with self._lock:
+                self._refreshing.discard(key)
+            return
+        self._executor.submit(self._refresh, key, loader)
+
+    def _refresh(self, key, loader):
+        try:
+            self._load(key, loader)
+            self._count("refreshes")
+        except UpstreamNotFound:
+            self._count("refreshes")
+        except Exception as e:
+            # Keep serving the stale copy; the next stale hit retries
+            self._count("refresh_failures")
+            print(f"⚠️ Background refresh of {key} failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _acquire_lease(self, key):
+        """Only one worker process refreshes a stale key at a time"""
+        if not self.persistent:
+            return True
+        now = datetime.utcnow()
+        try:
+            doc = mongo.db[self.collection_name].find_one_and_update(
+                {"_id": key, "$or": [{"refresh_lease": {"$exists": False}}, {"refresh_lease": {"$lt": now}}]},
+                {"$set": {"refresh_lease": now + timedelta(seconds=REFRESH_LEASE_SECONDS)}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # The key exists and another worker holds the lease
+            return False
+        except Exception:
+            # Persistent tier unavailable: fall back to per-process dedup
+            return True
+        return True
+
+    def _store(self, key, value, negative):
+        fetched_at = time.time()
+        self._remember(key, {"value": value, "negative": negative, "fetched_at": fetched_at})
+        if not self.persistent:
+            return
+        try:
+            keep = self.negative_ttl if negative else self.ttl + self.stale_ttl
+            mongo.db[self.collection_name].replace_one(
+                {"_id": key},
+                {
+                    "_id": key,
+                    "value": value,
+                    "negative": negative,
+                    "fetched_at": datetime.utcfromtimestamp(fetched_at),
+                    "expires_at": datetime.utcfromtimestamp(fetched_at + keep),
+                },
+                upsert=True,
+            )
+        except Exception as e:
+            print("⚠️ Upstream cache write failed:", e)
+
+    def _remember(self, key, entry):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._counters["evictions"] += 1
+
+
+# Shared by the Instagram and Twitter routes
+upstream_cache = UpstreamCache()
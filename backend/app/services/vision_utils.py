@@ -0,0 +1,267 @@
+# backend/app/services/vision_utils.py
+from app.config import FACE_DETECTORS, FACE_ALIGN, FACE_BATCH_SIZE
+from app.services.model_registry import model_registry
+
+
+# ========== DEEPFACE LOADING ==========
+def load_deepface():
+    """
+    Import DeepFace and build the attribute models we use, so the first
+    request does not pay for TensorFlow start-up and weight loading.
+    """
+    from deepface import DeepFace
+
+    for model_name in ("Emotion", "Gender", "Age"):
+        try:
+            try:
+                DeepFace.build_model(model_name, task="facial_attribute")
+            except TypeError:
+                # Older DeepFace releases take the model name only
+                DeepFace.build_model(model_name)
+        except Exception as e:
+            print(f"⚠️ Could not pre-build DeepFace {model_name} model: {e}")
+    return DeepFace
+
+
+model_registry.register("deepface", load_deepface)
+
+
+def get_deepface():
+    """DeepFace entry point, loaded on first use"""
+    return model_registry.get("deepface")
+
+
+# ========== IN-MEMORY IMAGE DECODING ==========
+def decode_image(data):
+    """
+    Decode encoded image bytes (JPEG/PNG/...) straight into a BGR uint8
+    array, the layout DeepFace expects for in-memory input. Raises
+    ValueError when the bytes are not a readable image.
+    """
+    import cv2
+    import numpy as np
+
+    buffer = np.frombuffer(data or b"", dtype=np.uint8)
+    img = cv2.imdecode(buffer, cv2.IMREAD_COLOR) if buffer.size else None
+    if img is None:
+        raise ValueError("Invalid image data")
+    return img
+
+
+def b64_to_bytes(b64str):
+    """Raw bytes of a (data-URL or bare) base64 image; None if not valid base64"""
+    import base64
+    import binascii
+
+    try:
+        _, data = b64str.split(",", 1) if "," in b64str else (None, b64str)
+        return base64.b64decode(data)
+    except (ValueError, TypeError, AttributeError, binascii.Error) as e:
+        print(f"Error decoding base64: {e}")
+        return None
+
+
+def decode_b64_image(b64str):
+    """Decode a (data-URL or bare) base64 image into a BGR array; None if invalid"""
+    data = b64_to_bytes(b64str)
+    if data is None:
+        return None
+    try:
+        return decode_image(data)
+    except ValueError as e:
+        print(f"Error decoding image: {e}")
+        return None
+
+
+# ========== DETECT ONCE, CLASSIFY PER FACE ==========
+def face_to_bgr(face):
+    """
+    extract_faces() returns RGB crops, float in [0, 1] by default; analyze()
+    takes in-memory input as BGR uint8 like cv2.imread.
+    """
+    import numpy as np
+
+    face = np.asarray(face)
+    if face.dtype != np.uint8:
+        scale = 255.0 if face.max() <= 1.0 else 1.0
+        face = np.clip(face * scale, 0, 255).astype(np.uint8)
+    return np.ascontiguousarray(face[:, :, ::-1])
+
+
+def detect_faces(img, detectors=None, align=FACE_ALIGN):
+    """
+    Run the detector cascade on a BGR frame. Detectors are tried in order
+    and the next one only runs when the previous one found no face (or
+    failed to load). Returns (faces, detector); faces are dicts with the
+    aligned BGR crop, its region and the detector confidence, most
+    confident first.
+    """
+    deepface = get_deepface()
+    for detector in detectors or FACE_DETECTORS:
+        try:
+            found = deepface.extract_faces(
+                img_path=img,
+                detector_backend=detector,
+                enforce_detection=True,
+                align=align,
+            )
+        except ValueError as e:
+            # No face detected with this detector
+            print(f"No face detected with {detector}: {e}")
+            continue
+        except Exception as e:
+            print(f"Error with detector {detector}: {e}")
+            continue
+
+        faces = [
+            {
+                "crop": face_to_bgr(item["face"]),
+                "region": item.get("facial_area") or {},
+                "confidence": float(item["confidence"]) if item.get("confidence") is not None else 1.0,
+                "detector": detector,
+            }
+            for item in found
+        ]
+        if faces:
+            faces.sort(key=lambda f: f["confidence"], reverse=True)
+            return faces, detector
+    return [], None
+
+
+class FrameFaces:
+    """
+    Faces of one frame, detected once and shared by every action.
+
+    classify() only runs the attribute models that have not run yet for a
+    face, on its cached crop with detector_backend="skip", so detection
+    and alignment never happen twice for the same frame.
+    """
+
+    def __init__(self, img, detectors=None, max_faces=None):
+        self.img = img
+        self.detectors = detectors
+        self.max_faces = max_faces
+        self.detector = None
+        self._faces = None
+
+    @property
+    def faces(self):
+        if self._faces is None:
+            faces, self.detector = detect_faces(self.img, self.detectors)
+            self._faces = faces[:self.max_faces] if self.max_faces else faces
+            for face in self._faces:
+                face["attributes"] = {}
+        return self._faces
+
+    def classify(self, actions):
+        """Run `actions` (e.g. ["gender", "age"]) once per detected face"""
+        return classify_faces(self.faces, actions)
+
+
+# ========== BATCHED ATTRIBUTE MODELS ==========
+# Output order of DeepFace's Gender model
+GENDER_LABELS = ("Woman", "Man")
+ATTRIBUTE_INPUT_SIZE = (224, 224)
+BATCHABLE_ACTIONS = ("gender", "age")
+
+
+def _attribute_model(action):
+    """Keras model behind DeepFace's Gender / Age client"""
+    deepface = get_deepface()
+    name = action.capitalize()
+    try:
+        client = deepface.build_model(name, task="facial_attribute")
+    except TypeError:
+        # Older DeepFace releases take the model name only
+        client = deepface.build_model(name)
+    return getattr(client, "model", client)
+
+
+def attribute_input(crop, target_size=ATTRIBUTE_INPUT_SIZE):
+    """
+    BGR crop -> float32 model input the way DeepFace prepares it: resized
+    to fit, zero-padded to target_size, scaled to [0, 1].
+    """
+    import cv2
+    import numpy as np
+
+    target_h, target_w = target_size
+    factor = min(target_h / crop.shape[0], target_w / crop.shape[1])
+    size = (max(1, int(crop.shape[1] * factor)), max(1, int(crop.shape[0] * factor)))
+    resized = cv2.resize(crop, size)
+    pad_h, pad_w = target_h - resized.shape[0], target_w - resized.shape[1]
+    padded = np.pad(
+        resized,
+        ((pad_h // 2, pad_h - pad_h // 2), (pad_w // 2, pad_w - pad_w // 2), (0, 0)),
+        mode="constant",
+    )
+    return padded.astype(np.float32) / 255.0
+
+
+def predict_attributes(crops, actions, batch_size=FACE_BATCH_SIZE):
+    """
+    Gender / age for many crops with one forward pass per model (per
+    `batch_size` crops). Returns one {action: value} dict per crop, shaped
+    like DeepFace.analyze output.
+    """
+    import numpy as np
+
+    batch = np.stack([attribute_input(crop) for crop in crops])
+    results = [{} for _ in crops]
+    for action in actions:
+        model = _attribute_model(action)
+        outputs = []
+        for start in range(0, len(batch), max(1, batch_size)):
+            chunk = batch[start:start + batch_size]
+            outputs.append(np.asarray(model(chunk, training=False)))
+        predictions = np.concatenate(outputs)
+
+        for result, pred in zip(results, predictions):
+            if action == "gender":
+                scores = {label: float(p) * 100 for label, p in zip(GENDER_LABELS, pred)}
+                result["gender"] = scores
+                result["dominant_gender"] = max(scores, key=scores.get)
+            else:
+                # Apparent age: expectation over the 0..100 age classes
+                result["age"] = float(np.sum(pred * np.arange(len(pred))))
+    return results
+
+
+def classify_faces(faces, actions):
+    """
+    Fill face["attributes"] for every face that is missing one of `actions`.
+    Gender and age run batched over all crops; other actions, or any
+    failure of the batched path, fall back to one DeepFace.analyze per face.
+    """
+    pending = [face for face in faces if any(a not in face["attributes"] for a in actions)]
+    if not pending:
+        return faces
+
+    batched = [a for a in actions if a in BATCHABLE_ACTIONS]
+    if batched:
+        try:
+            predictions = predict_attributes([face["crop"] for face in pending], batched)
+            for face, attributes in zip(pending, predictions):
+                face["attributes"].update(attributes)
+        except Exception as e:
+            print(f"⚠️ Batched face classification failed, analyzing faces one by one: {e}")
+
+    for face in pending:
+        missing = [action for action in actions if action not in face["attributes"]]
+        if not missing:
+            continue
+        analysis = get_deepface().analyze(
+            img_path=face["crop"],
+            actions=missing,
+            detector_backend="skip",
+            enforce_detection=False,
+            silent=True,
+        )
+        if isinstance(analysis, list):
+            analysis = analysis[0]
+        for action in missing:
+            face["attributes"][action] = analysis.get(action)
+            dominant = analysis.get(f"dominant_{action}")
+            if dominant is not None:
+                face["attributes"][f"dominant_{action}"] = dominant
+    return faces
@@ -0,0 +1,366 @@
+# backend/app/utils/lexicon.py
+"""
+Word/emoji lexicons for the Instagram sentiment and Big Five scoring.
+
+Terms and scoring constants live in a versioned data file
+(app/utils/data/lexicon_v<N>.json, see LEXICON_PATH). They are compiled
+once at import into a single matcher plus a term x class weight matrix,
+so any number of posts/profiles is scored with one vectorized step.
+
+Two match modes (LEXICON_MATCH_MODE):
+  compat - substring matching, same scores as the original per-word
+           `word in text` scan ("hard" also matches "hardware")
+  token  - whole-token matching via one tokenizer pass + hash lookup
+"""
+import json
+import re
+
+import numpy as np
+
+from app.config import LEXICON_MATCH_MODE, LEXICON_PATH
+
+# Words, or a single symbol/emoji with its optional variation selector
+_TOKEN = re.compile(r"[^\W_]+|[^\w\s]\ufe0f?")
+
+SENTIMENT_CLASSES = ["positive", "negative"]
+TRAIT_CLASSES = ["openness", "conscientiousness", "extraversion", "agreeableness", "neuroticism"]
+
+
+# ========== COMPILED MATCHER ==========
+class LexiconMatcher:
+    """
+    Multi-pattern matcher over every lexicon term.
+
+    Substring mode uses an Aho-Corasick automaton, so the text is walked
+    once no matter how many terms there are, and overlapping terms
+    ("fail" / "failure") are all reported. Token mode splits the text once
+    and looks each distinct token up in a term table.
+    """
+
+    def __init__(self, lexicons):
+        self.terms = []
+        self.term_classes = []
+        index = {}
+        for class_name, terms in lexicons.items():
+            for term in terms:
+                term = term.lower()
+                if term not in index:
+                    index[term] = len(self.terms)
+                    self.terms.append(term)
+                    self.term_classes.append([])
+                self.term_classes[index[term]].append(class_name)
+        self.classes = list(lexicons)
+
+        self._build_automaton()
+        self._alphabet = frozenset(ch for term in self.terms for ch in term)
+        self._no_whitespace_terms = not any(ch.isspace() for term in self.terms for ch in term)
+
+        # Token lookup table; terms that are not a single token fall back to substring search
+        self._token_terms = {}
+        self._multi_token_terms = []
+        for term_id, term in enumerate(self.terms):
+            tokens = _TOKEN.findall(term)
+            if len(tokens) == 1 and tokens[0] == term:
+                self._token_terms[term] = term_id
+            else:
+                self._multi_token_terms.append(term_id)
+
+    def _build_automaton(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+        for term_id, term in enumerate(self.terms):
+            state = 0
+            for ch in term:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append(term_id)
+
+        # Breadth-first failure links; outputs inherit their suffix matches
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def matched_terms(self, text, mode=LEXICON_MATCH_MODE):
+        """Set of term ids present in `text` (already lower-cased)"""
+        # No term spans whitespace, so each distinct chunk only needs scanning once
+        chunks = set(text.split()) if self._no_whitespace_terms else {text}
+
+        if mode == "token":
+            token_terms = self._token_terms
+            found = set()
+            for chunk in chunks:
+                term_id = token_terms.get(chunk)
+                if term_id is not None:
+                    found.add(term_id)
+                elif not chunk.isalnum():
+                    # Punctuation / emoji glued to words: split this chunk only
+                    found.update(token_terms[tok] for tok in _TOKEN.findall(chunk) if tok in token_terms)
+            found.update(t for t in self._multi_token_terms if self.terms[t] in text)
+            return found
+
+        goto, fail, out, alphabet = self._goto, self._fail, self._out, self._alphabet
+        found = set()
+        state = 0
+        for ch in "\n".join(chunks):
+            if ch not in alphabet:
+                # Character that appears in no term: every partial match dies here
+                state = 0
+                continue
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+    def matched_terms_many(self, texts, mode=LEXICON_MATCH_MODE):
+        """
+        matched_terms() for many lower-cased texts. Chunks repeat heavily
+        across posts and profiles, so each distinct chunk is matched once.
+        """
+        if not self._no_whitespace_terms:
+            return [self.matched_terms(text, mode) for text in texts]
+
+        memo = {}
+        results = []
+        for text in texts:
+            found = set()
+            for chunk in set(text.split()):
+                ids = memo.get(chunk)
+                if ids is None:
+                    ids = memo[chunk] = self.matched_terms(chunk, mode)
+                found |= ids
+            results.append(found)
+        return results
+
+    def class_counts(self, text, mode=LEXICON_MATCH_MODE):
+        """Number of distinct terms of each class found in `text`"""
+        counts = dict.fromkeys(self.classes, 0)
+        for term_id in self.matched_terms(text.lower(), mode):
+            for class_name in self.term_classes[term_id]:
+                counts[class_name] += 1
+        return counts
+
+
+# ========== VECTORIZED SCORING ==========
+class LexiconScorer:
+    """
+    Scores many documents at once.
+
+    Documents become a sparse (row, term) presence matrix, which is
+    multiplied by the term x class weight matrix to give class counts for
+    every row. The sentiment and trait formulas then run as array math.
+    A profile's counts use the distinct terms across all of its documents,
+    which matches scanning the profile's combined text.
+    """
+
+    def __init__(self, path=LEXICON_PATH):
+        with open(path, encoding="utf-8") as fh:
+            data = json.load(fh)
+
+        self.version = str(data.get("version", "unknown"))
+        self.sentiment_params = data["sentiment"]["scoring"]
+        self.trait_params = {name: data["traits"][name] for name in TRAIT_CLASSES}
+        self.classes = SENTIMENT_CLASSES + TRAIT_CLASSES
+
+        # Entries are either a list of terms (weight 1) or a {term: weight} map
+        weighted = {}
+        for section, names in (("sentiment", SENTIMENT_CLASSES), ("traits", TRAIT_CLASSES)):
+            for name in names:
+                terms = data[section][name]["terms"]
+                if isinstance(terms, dict):
+                    weighted[name] = {t.lower(): float(w) for t, w in terms.items()}
+                else:
+                    weighted[name] = {t.lower(): 1.0 for t in terms}
+
+        self.matcher = LexiconMatcher({name: list(terms) for name, terms in weighted.items()})
+
+        class_index = {name: i for i, name in enumerate(self.classes)}
+        self.weights = np.zeros((len(self.matcher.terms), len(self.classes)))
+        for term_id, term in enumerate(self.matcher.terms):
+            for name in self.matcher.term_classes[term_id]:
+                self.weights[term_id, class_index[name]] = weighted[name][term]
+
+        self.term_count = len(self.matcher.terms)
+        self._trait_weight = np.array([self.trait_params[n]["weight"] for n in TRAIT_CLASSES])
+        self._trait_base = np.array([self.trait_params[n]["base"] for n in TRAIT_CLASSES])
+        self._trait_cap = np.array([self.trait_params[n]["cap"] for n in TRAIT_CLASSES])
+
+    # ---------- matrices ----------
+    def presence(self, docs, mode=LEXICON_MATCH_MODE):
+        """Sparse presence matrix of `docs` as (rows, term_ids) coordinate arrays"""
+        rows, cols = [], []
+        matched = self.matcher.matched_terms_many([(doc or "").lower() for doc in docs], mode)
+        for row, found in enumerate(matched):
+            rows.extend([row] * len(found))
+            cols.extend(found)
+        return np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)
+
+    def class_counts(self, rows, cols, n_rows):
+        """(n_rows x classes) = presence @ weights, computed from the coordinates"""
+        counts = np.zeros((n_rows, len(self.classes)))
+        if len(rows):
+            np.add.at(counts, rows, self.weights[cols])
+        return counts
+
+    # ---------- formulas ----------
+    def sentiment_vectors(self, counts):
+        """(n x 3) positive / negative / neutral from class counts"""
+        p = self.sentiment_params
+        positive_count = counts[:, 0]
+        negative_count = counts[:, 1]
+
+        total = np.maximum(positive_count + negative_count, 1)
+        positive = (positive_count / total) * p["positive_weight"] + p["positive_base"]
+        negative = (negative_count / total) * p["negative_weight"]
+        neutral = np.maximum(1 - positive - negative, p["neutral_floor"])
+
+        total_score = positive + negative + neutral
+        return np.stack([positive, negative, neutral], axis=1) / total_score[:, None]
+
+    def trait_vectors(self, counts, post_counts):
+        """(n x 5) Big Five scores from class counts and posts per row"""
+        raw = counts[:, 2:] * self._trait_weight
+
+        # Extraversion gets a boost for frequent posting
+        e = TRAIT_CLASSES.index("extraversion")
+        boost = np.zeros(len(counts))
+        for threshold, amount in reversed(self.trait_params["extraversion"].get("post_count_boost", [])):
+            boost = np.where(post_counts > threshold, amount, boost)
+        raw[:, e] = raw[:, e] + boost
+
+        return np.minimum(raw + self._trait_base, self._trait_cap)
+
+    # ---------- public API ----------
+    def _to_dicts(self, sentiment, traits, empty):
+        results = []
+        for s_row, t_row, is_empty in zip(sentiment.tolist(), traits.tolist(), empty):
+            if is_empty:
+                results.append((dict(NEUTRAL_SENTIMENT), dict(NEUTRAL_TRAITS)))
+                continue
+            results.append((
+                {name: round(v, 2) for name, v in zip(("positive", "negative", "neutral"), s_row)},
+                {name: round(v, 2) for name, v in zip(TRAIT_CLASSES, t_row)},
+            ))
+        return results
+
+    def score_posts(self, posts, mode=LEXICON_MATCH_MODE, with_terms=False):
+        """
+        Per-post (sentiment, traits) for every post, in one vectorized step.
+        With `with_terms`, each entry is (term_ids, sentiment, traits).
+        """
+        rows, cols = self.presence(posts, mode)
+        counts = self.class_counts(rows, cols, len(posts))
+        ones = np.ones(len(posts))
+        empty = [not (p and p.strip()) for p in posts]
+        scored = self._to_dicts(self.sentiment_vectors(counts), self.trait_vectors(counts, ones), empty)
+        if not with_terms:
+            return scored
+
+        terms = [[] for _ in posts]
+        for row, col in zip(rows.tolist(), cols.tolist()):
+            terms[row].append(col)
+        return [(t, s, tr) for t, (s, tr) in zip(terms, scored)]
+
+    def score_term_ids(self, term_ids, post_count, empty=False):
+        """(sentiment, traits) for a profile already reduced to its distinct term ids"""
+        cols = np.asarray(sorted(set(term_ids)), dtype=np.int64)
+        counts = self.class_counts(np.zeros(len(cols), dtype=np.int64), cols, 1)
+        return self._to_dicts(
+            self.sentiment_vectors(counts),
+            self.trait_vectors(counts, np.asarray([post_count], dtype=float)),
+            [empty],
+        )[0]
+
+    def score_profiles(self, profiles, mode=LEXICON_MATCH_MODE, with_posts=False):
+        """
+        `profiles` is a list of (bio, posts). Returns one dict per profile with
+        "sentiment" and "personality_traits" (plus "post_scores" if asked).
+        All posts of all profiles are matched and scored in the same pass.
+        """
+        docs, owner = [], []
+        for p_idx, (bio, posts) in enumerate(profiles):
+            for doc in [bio or ""] + list(posts):
+                docs.append(doc)
+                owner.append(p_idx)
+        owner = np.asarray(owner, dtype=np.int64)
+
+        rows, cols = self.presence(docs, mode)
+
+        # Profile presence = distinct terms across the profile's documents
+        pairs = np.unique(owner[rows] * self.term_count + cols) if len(rows) else np.zeros(0, dtype=np.int64)
+        profile_counts = self.class_counts(pairs // self.term_count, pairs % self.term_count, len(profiles))
+        post_counts = np.asarray([len(posts) for _, posts in profiles], dtype=float)
+        empty = [
+            not ((bio or "").strip() or any(p and p.strip() for p in posts))
+            for bio, posts in profiles
+        ]
+        scored = self._to_dicts(
+            self.sentiment_vectors(profile_counts),
+            self.trait_vectors(profile_counts, post_counts),
+            empty,
+        )
+
+        results = [{"sentiment": s, "personality_traits": t} for s, t in scored]
+
+        if with_posts:
+            doc_counts = self.class_counts(rows, cols, len(docs))
+            doc_scores = self._to_dicts(
+                self.sentiment_vectors(doc_counts),
+                self.trait_vectors(doc_counts, np.ones(len(docs))),
+                [not (d and d.strip()) for d in docs],
+            )
+            start = 0
+            for result, (_, posts) in zip(results, profiles):
+                # Skip the bio row; keep one entry per post
+                result["post_scores"] = [
+                    {"sentiment": s, "personality_traits": t}
+                    for s, t in doc_scores[start + 1:start + 1 + len(posts)]
+                ]
+                start += 1 + len(posts)
+        return results
+
+
+lexicon_scorer = LexiconScorer()
+lexicon_matcher = lexicon_scorer.matcher
+
+
+NEUTRAL_SENTIMENT = {"positive": 0.33, "negative": 0.33, "neutral": 0.34}
+NEUTRAL_TRAITS = {
+    "openness": 0.5,
+    "conscientiousness": 0.5,
+    "extraversion": 0.5,
+    "agreeableness": 0.5,
+    "neuroticism": 0.5
+}
+
+
+def score_profile(bio, posts, mode=LEXICON_MATCH_MODE):
+    """Sentiment and Big Five traits for one profile. Returns (sentiment, personality_traits)."""
+    result = lexicon_scorer.score_profiles([(bio, posts)], mode)[0]
+    return result["sentiment"], result["personality_traits"]
+
+
+def score_text(text, posts, mode=LEXICON_MATCH_MODE):
+    """
+    Sentiment and Big Five traits for already-combined text.
+    `posts` is only used for the posting-frequency boost.
+    Returns (sentiment, personality_traits).
+    """
+    result = lexicon_scorer.score_profiles([(text, [""] * len(posts))], mode)[0]
+    return result["sentiment"], result["personality_traits"]
@@ -1,11 +1,108 @@
 # backend/app/utils/personality_utils.py
+import math
+from datetime import datetime
+
+from app.config import TWEET_RECENCY_HALF_LIFE_DAYS, TWEET_ENGAGEMENT_WEIGHT
+from app.services.nlp_utils import (
+    analyze_long_text,
+    sentiment_result,
+    sentiment_to_traits,
+    submit_sentiment,
+)
+
+TRAITS = ("openness", "conscientiousness", "extraversion", "agreeableness", "neuroticism")
+
 
 def analyze_text(text):
-    # Dummy implementation - replace this with real personality logic
+    """Big Five trait scores for one piece of text (chunked when long)"""
+    label, score, _ = analyze_long_text(text)
+    return sentiment_to_traits(label, score)
+
+
+def _parse_time(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def tweet_weight(tweet, newest, half_life_days=TWEET_RECENCY_HALF_LIFE_DAYS,
+                 engagement_weight=TWEET_ENGAGEMENT_WEIGHT):
+    """
+    Recency x engagement weight of one tweet. Age is measured from the
+    newest tweet of the timeline (not from now), so a cached timeline
+    always scores the same.
+    """
+    weight = 1.0
+    created = _parse_time(tweet.get("created_at"))
+    if newest is not None and created is not None and half_life_days > 0:
+        age_days = max(0.0, (newest - created).total_seconds() / 86400.0)
+        weight *= 0.5 ** (age_days / half_life_days)
+
+    engagement = (
+        (tweet.get("like_count") or 0)
+        + 2 * (tweet.get("retweet_count") or 0)
+        + (tweet.get("reply_count") or 0)
+    )
+    return weight * (1.0 + engagement_weight * math.log1p(max(0, engagement)))
+
+
+def analyze_tweets(tweets):
+    """
+    Score every tweet on its own and aggregate the trait scores with
+    recency and engagement weighting.
+
+    `tweets` are dicts with text, id, created_at (ISO) and counts, or plain
+    strings. All tweets are queued shortest first, so the sentiment batcher
+    packs similar lengths together; cached tweets never reach the model.
+    Returns the trait scores plus "sentiment" and a per-tweet "tweets" array.
+    """
+    items = [t if isinstance(t, dict) else {"text": t} for t in tweets]
+    items = [t for t in items if (t.get("text") or "").strip()]
+    if not items:
+        return {**{trait: 0.5 for trait in TRAITS}, "sentiment": None, "tweet_count": 0, "tweets": []}
+
+    order = sorted(range(len(items)), key=lambda i: len(items[i]["text"]))
+    submitted = {i: submit_sentiment(items[i]["text"]) for i in order}
+    results = [sentiment_result(*submitted[i]) for i in range(len(items))]
+
+    times = [_parse_time(t.get("created_at")) for t in items]
+    known = [t for t in times if t is not None]
+    newest = max(known) if known else None
+
+    totals = dict.fromkeys(TRAITS, 0.0)
+    p_positive = 0.0
+    weight_sum = 0.0
+    per_tweet = []
+    for tweet, result in zip(items, results):
+        label = result.get("label", "NEUTRAL")
+        score = float(result.get("score", 0.0))
+        weight = tweet_weight(tweet, newest)
+        traits = sentiment_to_traits(label, score)
+
+        weight_sum += weight
+        p_positive += weight * (score if label == "POSITIVE" else 1.0 - score)
+        for trait in TRAITS:
+            totals[trait] += weight * traits[trait]
+
+        per_tweet.append({
+            "id": tweet.get("id"),
+            "created_at": tweet.get("created_at"),
+            "text": tweet["text"],
+            "sentiment": label,
+            "confidence": round(score, 2),
+            "weight": round(weight, 4),
+        })
+
+    p_positive /= weight_sum
     return {
-        "openness": 0.85,
-        "conscientiousness": 0.76,
-        "extraversion": 0.64,
-        "agreeableness": 0.92,
-        "neuroticism": 0.48
+        **{trait: round(totals[trait] / weight_sum, 2) for trait in TRAITS},
+        "sentiment": {
+            "label": "POSITIVE" if p_positive >= 0.5 else "NEGATIVE",
+            "score": round(max(p_positive, 1.0 - p_positive), 4),
+        },
+        "tweet_count": len(items),
+        "tweets": per_tweet,
     }
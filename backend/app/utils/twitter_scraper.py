@@ -1,15 +1,54 @@
 import tweepy
 
+from app.services.api_utils import install_upstream_adapter, UpstreamNotFound
+from app.services.timeline_store import timeline_store
+
 bearer_token = "AAAAAAAAAAAAAAAAAAAAAAHN3QEAAAAAhtsx7RnSxuc5JqMXxPMe4Gcii%2FE%3DXLoj7vNiJ6q43Wb1Zkxad47a5IMnCT5WQp37obdwAkqA7oTazq"  # 🔐 Replace this
 
 client = tweepy.Client(bearer_token=bearer_token)
+install_upstream_adapter(client.session)
+
+
+class V2TimelineSource:
+    """tweepy.Client (v2) calls in the shape timeline_store expects"""
+
+    MAX_COUNT = 100
+
+    def __init__(self, client):
+        self.client = client
+
+    def lookup_user_id(self, username):
+        user = self.client.get_user(username=username)
+        if user.data is None:
+            raise UpstreamNotFound(f"twitter:{username}")
+        return user.data.id
+
+    def fetch_page(self, user_id, count, since_id=None, until_id=None, cursor=None):
+        response = self.client.get_users_tweets(
+            id=user_id,
+            max_results=min(max(count, 5), self.MAX_COUNT),
+            since_id=since_id,
+            until_id=until_id,
+            pagination_token=cursor,
+            tweet_fields=["created_at", "public_metrics"],
+        )
+        items = []
+        for tweet in response.data or []:
+            metrics = tweet.public_metrics or {}
+            items.append({
+                "id": str(tweet.id),
+                "text": tweet.text,
+                "created_at": tweet.created_at.isoformat() if tweet.created_at else None,
+                "retweet_count": metrics.get("retweet_count", 0),
+                "like_count": metrics.get("like_count", 0),
+                "reply_count": metrics.get("reply_count", 0),
+            })
+        return items, (response.meta or {}).get("next_token")
+
 
 def fetch_user_tweets(username, max_results=10):
     try:
-        user = client.get_user(username=username)
-        user_id = user.data.id
-
-        tweets = client.get_users_tweets(id=user_id, max_results=max_results)
-        return [tweet.text for tweet in tweets.data] if tweets.data else []
+        synced = timeline_store.sync(username, V2TimelineSource(client), max_results)
+        return [tweet["text"] for tweet in synced["tweets"]]
     except Exception as e:
         return {"error": str(e)}